@@ -1,8 +1,24 @@
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
-from typing import List
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional, Tuple
 
-from models import TimeRange
+from agent_calendar.async_io import iterate_blocking, run_blocking
+from agent_calendar.free_busy import FreeBusyView
+from agent_calendar.metrics import timed
+from models import AgentCalendarEvent, TimeRange
+
+
+def _timed_call(operation: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    with timed(operation):
+        return func(*args, **kwargs)
+
+
+class CalendarConflictError(Exception):
+    """Raised when a booking overlaps another event, falls outside working hours or reuses an event's uid."""
+
+
+class EventNotFoundError(LookupError):
+    """Raised when a change refers to an event the agent's calendar does not have."""
 
 
 class AgentCalendar(ABC):
@@ -35,6 +51,78 @@ class AgentCalendar(ABC):
         """
         pass
 
+    def iter_available_slots(self, time_ranges: List[TimeRange], duration: timedelta, count: int) -> Iterator[datetime]:
+        """
+        Yields the start times of find_available_slots one at a time as they are found.
+
+        The iterator searches a snapshot of the agent's busy time taken when it is created, so it can be consumed
+        slowly, e.g. while streaming a response, without holding up changes to the calendar.
+
+        Args:
+            time_ranges (List[TimeRange]): A list of time ranges to check for availability.
+            duration (timedelta): The duration needed for the appointment.
+            count (int): The maximum number of start times to yield.
+
+        Returns:
+            Iterator[datetime]: The available start times.
+        """
+        return iter(self.find_available_slots(time_ranges, duration, count))
+
+    def iter_work_recommendations(self) -> Iterator[str]:
+        """
+        Yields the suggestions of recommend_work_from_todo one at a time as they are found.
+
+        Returns:
+            Iterator[str]: The suggestions.
+        """
+        return iter(self.recommend_work_from_todo())
+
+    def check_availability_batch(self, time_ranges: List[TimeRange]) -> List[bool]:
+        """
+        Checks if the agent is available in each of the given time ranges.
+
+        Args:
+            time_ranges (List[TimeRange]): The time ranges to check.
+
+        Returns:
+            List[bool]: Whether the agent is available, in the same order as time_ranges.
+        """
+        return [self.is_time_available(start_time=time_range.start, end_time=time_range.end) for time_range in time_ranges]
+
+    def find_available_slots_batch(self, queries: List[Tuple[List[TimeRange], timedelta, int]]) -> List[List[datetime]]:
+        """
+        Runs several find_available_slots searches against this calendar.
+
+        Args:
+            queries (List[Tuple[List[TimeRange], timedelta, int]]): (time_ranges, duration, count) for each search.
+
+        Returns:
+            List[List[datetime]]: The available start times of each search, in the same order as queries.
+        """
+        return [self.find_available_slots(time_ranges, duration, count) for time_ranges, duration, count in queries]
+
+    def free_busy(self) -> FreeBusyView:
+        """
+        Returns the agent's busy blocks and free working time from today to the end of the free/busy horizon.
+
+        Returns:
+            FreeBusyView: The busy blocks, including fully booked days, and the free intervals of the working hours.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support free/busy lookups")
+
+    def free_busy_between(self, start_time: datetime, end_time: datetime) -> FreeBusyView:
+        """
+        Returns the agent's busy blocks and free working time covering at least [start_time, end_time).
+
+        Args:
+            start_time (datetime): The start of the window.
+            end_time (datetime): The end of the window.
+
+        Returns:
+            FreeBusyView: The busy blocks, including fully booked days, and the free intervals of the working hours.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support free/busy lookups")
+
     @abstractmethod
     def recommend_work_from_todo(self) -> bool:
         """
@@ -44,3 +132,108 @@ class AgentCalendar(ABC):
             bool: True if the agent can accept more work, False otherwise.
         """
         pass
+
+    def create_event(self, event: AgentCalendarEvent) -> AgentCalendarEvent:
+        """
+        Books an event in the agent's calendar if the agent is available for it.
+
+        Args:
+            event (AgentCalendarEvent): The event to book.
+
+        Returns:
+            AgentCalendarEvent: The booked event.
+
+        Raises:
+            CalendarConflictError: If the agent is not available or an event with the same uid exists.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support booking events")
+
+    def update_event(
+        self, uid: str, start_time: datetime, end_time: datetime, summary: Optional[str] = None, description: Optional[str] = None, location: Optional[str] = None
+    ) -> AgentCalendarEvent:
+        """
+        Moves an event to a new time, and optionally changes its details, if the agent is available then.
+
+        Args:
+            uid (str): The uid of the event.
+            start_time (datetime): The new start of the event.
+            end_time (datetime): The new end of the event.
+            summary (Optional[str]): The new summary, unchanged when None.
+            description (Optional[str]): The new description, unchanged when None.
+            location (Optional[str]): The new location, unchanged when None.
+
+        Returns:
+            AgentCalendarEvent: The updated event.
+
+        Raises:
+            EventNotFoundError: If the agent has no event with uid.
+            CalendarConflictError: If the agent is not available at the new time.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support updating events")
+
+    def cancel_event(self, uid: str) -> AgentCalendarEvent:
+        """
+        Removes an event from the agent's calendar.
+
+        Args:
+            uid (str): The uid of the event.
+
+        Returns:
+            AgentCalendarEvent: The cancelled event.
+
+        Raises:
+            EventNotFoundError: If the agent has no event with uid.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support cancelling events")
+
+    # The async variants are what the service calls, they also record how long each method takes in the metrics.
+
+    async def is_time_available_async(self, start_time: datetime, end_time: datetime) -> bool:
+        """Async variant of is_time_available that runs the check on the calendar I/O thread pool."""
+        return await run_blocking(_timed_call, "is_time_available", self.is_time_available, start_time, end_time)
+
+    async def find_available_slots_async(self, time_ranges: List[TimeRange], duration: timedelta, count: int) -> list:
+        """Async variant of find_available_slots that runs the search on the calendar I/O thread pool."""
+        return await run_blocking(_timed_call, "find_available_slots", self.find_available_slots, time_ranges, duration, count)
+
+    async def recommend_work_from_todo_async(self) -> List[str]:
+        """Async variant of recommend_work_from_todo that runs on the calendar I/O thread pool."""
+        return await run_blocking(_timed_call, "recommend_work_from_todo", self.recommend_work_from_todo)
+
+    async def iter_available_slots_async(self, time_ranges: List[TimeRange], duration: timedelta, count: int) -> AsyncIterator[List[datetime]]:
+        """Async variant of iter_available_slots that searches on the calendar I/O thread pool, yielding chunks of start times."""
+        iterator = await run_blocking(_timed_call, "iter_available_slots", self.iter_available_slots, time_ranges, duration, count)
+        async for chunk in iterate_blocking(iterator):
+            yield chunk
+
+    async def iter_work_recommendations_async(self) -> AsyncIterator[List[str]]:
+        """Async variant of iter_work_recommendations that runs on the calendar I/O thread pool, yielding chunks of suggestions."""
+        iterator = await run_blocking(_timed_call, "iter_work_recommendations", self.iter_work_recommendations)
+        async for chunk in iterate_blocking(iterator):
+            yield chunk
+
+    async def check_availability_batch_async(self, time_ranges: List[TimeRange]) -> List[bool]:
+        """Async variant of check_availability_batch that runs on the calendar I/O thread pool."""
+        return await run_blocking(_timed_call, "check_availability_batch", self.check_availability_batch, time_ranges)
+
+    async def find_available_slots_batch_async(self, queries: List[Tuple[List[TimeRange], timedelta, int]]) -> List[List[datetime]]:
+        """Async variant of find_available_slots_batch that runs on the calendar I/O thread pool."""
+        return await run_blocking(_timed_call, "find_available_slots_batch", self.find_available_slots_batch, queries)
+
+    async def free_busy_async(self) -> FreeBusyView:
+        """Async variant of free_busy that runs on the calendar I/O thread pool."""
+        return await run_blocking(_timed_call, "free_busy", self.free_busy)
+
+    async def create_event_async(self, event: AgentCalendarEvent) -> AgentCalendarEvent:
+        """Async variant of create_event that runs on the calendar I/O thread pool."""
+        return await run_blocking(_timed_call, "create_event", self.create_event, event)
+
+    async def update_event_async(
+        self, uid: str, start_time: datetime, end_time: datetime, summary: Optional[str] = None, description: Optional[str] = None, location: Optional[str] = None
+    ) -> AgentCalendarEvent:
+        """Async variant of update_event that runs on the calendar I/O thread pool."""
+        return await run_blocking(_timed_call, "update_event", self.update_event, uid, start_time, end_time, summary=summary, description=description, location=location)
+
+    async def cancel_event_async(self, uid: str) -> AgentCalendarEvent:
+        """Async variant of cancel_event that runs on the calendar I/O thread pool."""
+        return await run_blocking(_timed_call, "cancel_event", self.cancel_event, uid)
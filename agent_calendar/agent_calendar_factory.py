@@ -5,9 +5,41 @@
 # from agent_calendar.google_calendar import GoogleAgentCalendar
 # from agent_calendar.outlook_calendar import OutlookAgentCalendar
 
+import os
+from typing import Dict, Optional
+
 from agent_calendar.agent_calendar import AgentCalendar
 from agent_calendar.agent_calendar_settings import get_agent_calendar_settings
+from agent_calendar.async_io import MAX_CONCURRENT_LOADS, RequestCoalescer
+from agent_calendar.calendar_cache import calendar_cache, file_stamp
+from agent_calendar.calendar_snapshot import CalendarSnapshot, get_snapshot
+from agent_calendar.calendar_writer import WRITER_SOCKET
 from agent_calendar.json_agent_calendar import JSONAgentCalendar
+from agent_calendar.metrics import timed
+from agent_calendar.sqlite_agent_calendar import SQLiteAgentCalendar
+from models import AgentCalendarSettings
+
+DATA_DIR = os.environ.get("HW_SCHEDULING_DATA_DIR", "data")
+CALENDAR_JSON_FILE = os.path.join(DATA_DIR, "ics_data.json")
+TODO_JSON_FILE = os.path.join(DATA_DIR, "todo.json")
+SQLITE_DB_FILE = os.path.join(DATA_DIR, "calendar.db")
+
+# concurrent async loads of the same agent share one in-flight load
+_calendar_loads = RequestCoalescer(max_concurrency=MAX_CONCURRENT_LOADS)
+
+
+def _load_json_calendar(client_id: int, agent_id: int, calendar_settings: AgentCalendarSettings, snapshot: Optional[CalendarSnapshot] = None) -> JSONAgentCalendar:
+    # only runs on a cache miss, so the timer measures actual loads
+    with timed("calendar_load"):
+        return JSONAgentCalendar(
+            calendar_json_file=CALENDAR_JSON_FILE,
+            todo_json_file=TODO_JSON_FILE,
+            client_id=client_id,
+            agent_id=agent_id,
+            calendar_settings=calendar_settings,
+            snapshot=snapshot,
+            writer_socket=WRITER_SOCKET if snapshot is not None else None,
+        )
 
 
 class AgentCalendarFactory:
@@ -15,6 +47,7 @@ class AgentCalendarFactory:
     def create_calendar(client_id: int, agent_id: int) -> AgentCalendar:
         """
         Factory method to create an instance of an AgentCalendar concrete class based on the agent_calendar_settings.
+        Calendars are cached per agent and only rebuilt when their settings or backing files change.
 
         Args:
           client_id (int): The client ID.
@@ -27,13 +60,44 @@ class AgentCalendarFactory:
           ValueError: If calendar_type is not recognized.
         """
         # get agent_calendar_settings
-        agent_calendar_settings = get_agent_calendar_settings(client_id, agent_id)
+        with timed("settings_lookup"):
+            agent_calendar_settings = get_agent_calendar_settings(client_id, agent_id)
         calendar_type = agent_calendar_settings.calendar_type.lower()
 
         if calendar_type == "json":
-            # Create a JSON-based calendar
-            return JSONAgentCalendar(
-                calendar_json_file="data/ics_data.json", todo_json_file="data/todo.json", client_id=client_id, agent_id=agent_id, calendar_settings=agent_calendar_settings
-            )
+            # Create a JSON-based calendar, reusing the cached one while the backing files are unchanged
+            # worker processes started by the launcher read the events from the shared snapshot of the calendar file
+            snapshot = get_snapshot()
+            calendar_stamp = snapshot.stamp if snapshot is not None else file_stamp(CALENDAR_JSON_FILE)
+            stamp = (agent_calendar_settings, calendar_stamp, file_stamp(TODO_JSON_FILE))
+            return calendar_cache.get_or_load((client_id, agent_id), stamp, lambda: _load_json_calendar(client_id, agent_id, agent_calendar_settings, snapshot))
+        elif calendar_type == "sqlite":
+            # SQLite calendars query only the events they need, there is nothing to load up front
+            return SQLiteAgentCalendar(db_path=SQLITE_DB_FILE, client_id=client_id, agent_id=agent_id, calendar_settings=agent_calendar_settings)
         else:
             raise ValueError(f"Unknown calendar type: {calendar_type}")
+
+    @staticmethod
+    async def create_calendar_async(client_id: int, agent_id: int) -> AgentCalendar:
+        """
+        Async variant of create_calendar for use on the event loop.
+
+        The load runs on the calendar I/O thread pool with at most HW_SCHEDULING_MAX_CONCURRENT_LOADS loads at a time,
+        and concurrent requests for the same agent wait on the same load.
+
+        Args:
+          client_id (int): The client ID.
+          agent_id (int): The agent ID.
+
+        Returns:
+          An instance of a concrete AgentCalendar class.
+
+        Raises:
+          ValueError: If calendar_type is not recognized.
+        """
+        return await _calendar_loads.run((client_id, agent_id), AgentCalendarFactory.create_calendar, client_id, agent_id)
+
+    @staticmethod
+    def cache_stats() -> Dict[str, int]:
+        """Returns the hit, miss and eviction counters of the shared calendar cache."""
+        return calendar_cache.stats()
@@ -1,12 +1,23 @@
 import json
+import logging
 import os
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
 
+from agent_calendar.parsed_cache import load_parsed
 from models import AgentCalendarSettings
 
+logger = logging.getLogger(__name__)
 
-def load_agent_calendar_settings():
-    # Construct the file path relative to the current file
-    file_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'agent_calendar_settings.json')
+# Construct the file path relative to the current file, unless another data directory is configured
+DATA_DIR = os.environ.get("HW_SCHEDULING_DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data'))
+SETTINGS_FILE = os.path.join(DATA_DIR, 'agent_calendar_settings.json')
+# how often, at most, the settings file is checked for changes
+RELOAD_CHECK_INTERVAL_SECONDS = float(os.environ.get("HW_SCHEDULING_SETTINGS_RELOAD_INTERVAL_SECONDS", "1"))
+
+
+def _read_settings(file_path: str) -> List[dict]:
     # Open and load the JSON data into memory
     with open(file_path, 'r', encoding='utf-8') as file:
         settings = json.load(file)
@@ -14,16 +25,97 @@ def load_agent_calendar_settings():
     return settings
 
 
+def load_agent_calendar_settings(file_path: str = SETTINGS_FILE) -> List[dict]:
+    # read from the parsed cache of the file when it is enabled
+    return load_parsed(file_path, _read_settings)
+
+
+class AgentCalendarSettingsIndex:
+    """
+    Agent calendar settings keyed by (client_id, agent_id).
+
+    The index and the set of duplicated keys are built once when the settings are loaded. Settings are validated into
+    AgentCalendarSettings on first lookup and the validated models are cached, so callers must not mutate them.
+    """
+
+    def __init__(self, settings: List[dict], stamp: Optional[Tuple[int, int]] = None):
+        self.stamp: Optional[Tuple[int, int]] = stamp
+        self._settings: Dict[Tuple[int, int], dict] = {}
+        self._duplicates: Set[Tuple[int, int]] = set()
+        self._validated: Dict[Tuple[int, int], AgentCalendarSettings] = {}
+        for setting in settings:
+            key = (setting['client_id'], setting['agent_id'])
+            if key in self._settings:
+                self._duplicates.add(key)
+            self._settings[key] = setting
+        for client_id, agent_id in self._duplicates:
+            logger.warning(f"Multiple settings found for client_id {client_id} and agent_id {agent_id}")
+
+    def __len__(self) -> int:
+        return len(self._settings)
+
+    def get(self, client_id: int, agent_id: int) -> AgentCalendarSettings:
+        key = (client_id, agent_id)
+        if key in self._duplicates:
+            raise ValueError(f"Multiple settings found for client_id {client_id} and agent_id {agent_id}")
+        settings = self._validated.get(key)
+        if settings is None:
+            setting = self._settings.get(key)
+            if setting is None:
+                raise ValueError(f"No settings found for client_id {client_id} and agent_id {agent_id}")
+            settings = AgentCalendarSettings(**setting)
+            self._validated[key] = settings
+        return settings
+
+
+def _file_stamp(file_path: str) -> Tuple[int, int]:
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def reload_agent_calendar_settings(file_path: str = SETTINGS_FILE) -> AgentCalendarSettingsIndex:
+    """
+    Loads the settings file into a new index and swaps it in for subsequent lookups.
+
+    Lookups in flight keep using the index they started with, so a reload never exposes a partially built index.
+    """
+    global _settings_index, _settings_file
+    stamp = _file_stamp(file_path)
+    index = AgentCalendarSettingsIndex(load_agent_calendar_settings(file_path), stamp=stamp)
+    # a single assignment, readers see either the old or the new index
+    _settings_index, _settings_file = index, file_path
+    return index
+
+
+def _current_settings_index() -> AgentCalendarSettingsIndex:
+    global _last_reload_check
+    now = time.monotonic()
+    index = _settings_index
+    if index is not None and now - _last_reload_check < RELOAD_CHECK_INTERVAL_SECONDS:
+        return index
+    with _reload_lock:
+        if _settings_index is None:
+            # the first lookup loads the settings, importing the module does not
+            _last_reload_check = now
+            return reload_agent_calendar_settings(_settings_file)
+        if now - _last_reload_check >= RELOAD_CHECK_INTERVAL_SECONDS:
+            _last_reload_check = now
+            try:
+                if _file_stamp(_settings_file) != _settings_index.stamp:
+                    logger.info(f"Reloading agent calendar settings from {_settings_file}")
+                    reload_agent_calendar_settings(_settings_file)
+            except Exception as e:
+                # keep serving the last good settings if the file is missing, being rewritten or malformed
+                logger.error(f"Error reloading agent calendar settings: {e}", exc_info=True)
+    return _settings_index
+
+
 def get_agent_calendar_settings(client_id: int, agent_id: int) -> AgentCalendarSettings:
-    settings = [setting for setting in all_agent_calendar_settings if setting['client_id'] == client_id and setting['agent_id'] == agent_id]
-    if len(settings) == 0:
-        raise ValueError(f"No settings found for client_id {client_id} and agent_id {agent_id}")
-    if len(settings) > 1:
-        raise ValueError(f"Multiple settings found for client_id {client_id} and agent_id {agent_id}")
-    # Assuming we want the first match
-    settings = settings[0]
-    return AgentCalendarSettings(**settings)
-
-
-# loading on import for ease of use as an example datasource
-all_agent_calendar_settings = load_agent_calendar_settings()
+    return _current_settings_index().get(client_id, agent_id)
+
+
+_reload_lock = threading.Lock()
+_last_reload_check = time.monotonic()
+_settings_file = SETTINGS_FILE
+# loaded on first lookup
+_settings_index: Optional[AgentCalendarSettingsIndex] = None
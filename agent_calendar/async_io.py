@@ -0,0 +1,116 @@
+# This module keeps blocking calendar work off the event loop.
+# Calendar loads read and parse files and availability searches are CPU bound, so the async code paths run them on a
+# bounded thread pool instead of directly on the uvicorn event loop.
+
+import asyncio
+import functools
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Iterator, List, Tuple
+
+IO_WORKERS = int(os.environ.get("HW_SCHEDULING_IO_WORKERS", "8"))
+MAX_CONCURRENT_LOADS = int(os.environ.get("HW_SCHEDULING_MAX_CONCURRENT_LOADS", str(IO_WORKERS)))
+# items pulled from a streamed iterator per trip to the thread pool, and how long a partial chunk may wait for more
+STREAM_CHUNK_SIZE = int(os.environ.get("HW_SCHEDULING_STREAM_CHUNK_SIZE", "100"))
+STREAM_FLUSH_SECONDS = float(os.environ.get("HW_SCHEDULING_STREAM_FLUSH_MS", "50")) / 1000
+
+_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="calendar-io")
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Runs func(*args, **kwargs) on the shared calendar I/O thread pool and waits for the result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+async def iterate_blocking(iterator: Iterator[Any], chunk_size: int = STREAM_CHUNK_SIZE, flush_seconds: float = STREAM_FLUSH_SECONDS) -> AsyncIterator[List[Any]]:
+    """
+    Advances a blocking iterator on the calendar I/O thread pool, yielding its items in chunks.
+
+    The first chunk holds a single item so the first result is sent as soon as it is found. Later chunks hold up to
+    chunk_size items, or what arrived within flush_seconds. When the consumer stops early, e.g. because the client
+    disconnected, the iterator is closed on the pool so the work behind it stops as well.
+    """
+    end = object()
+    stopped = threading.Event()
+    # the iterator runs on one pool thread at a time, closing it waits for a pull still in progress
+    lock = threading.Lock()
+
+    def pull(size: int) -> Tuple[List[Any], bool]:
+        chunk = []
+        deadline = time.perf_counter() + flush_seconds
+        with lock:
+            while not stopped.is_set():
+                item = next(iterator, end)
+                if item is end:
+                    return chunk, True
+                chunk.append(item)
+                if len(chunk) >= size or time.perf_counter() >= deadline:
+                    break
+        return chunk, stopped.is_set()
+
+    def close() -> None:
+        with lock:
+            close_iterator = getattr(iterator, "close", None)
+            if close_iterator is not None:
+                close_iterator()
+
+    size = 1
+    try:
+        while True:
+            chunk, exhausted = await run_blocking(pull, size)
+            if chunk:
+                yield chunk
+            if exhausted:
+                return
+            size = chunk_size
+    finally:
+        stopped.set()
+        _executor.submit(close)
+
+
+class RequestCoalescer:
+    """
+    Runs blocking calls on the I/O thread pool with a limit on how many run at once.
+
+    Concurrent calls with the same key share a single in-flight call, so e.g. many requests for an agent whose
+    calendar is not loaded yet trigger only one load. A caller that is cancelled does not cancel the shared call.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency: int = max_concurrency
+        # asyncio primitives are bound to a loop, keep separate state for each running loop
+        self._states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[asyncio.Semaphore, Dict[Hashable, asyncio.Future]]]" = weakref.WeakKeyDictionary()
+
+    async def run(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Runs func(*args, **kwargs) on the I/O thread pool, or joins the call already in flight for key.
+
+        Args:
+            key (Hashable): Identifies calls that can share a result, e.g. (client_id, agent_id).
+            func (Callable[..., Any]): The blocking function to run.
+
+        Returns:
+            Any: The result of the shared call.
+        """
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            state = (asyncio.Semaphore(self.max_concurrency), {})
+            self._states[loop] = state
+        semaphore, in_flight = state
+
+        task = in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run_limited(semaphore, func, *args, **kwargs))
+            in_flight[key] = task
+            task.add_done_callback(lambda _: in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    @staticmethod
+    async def _run_limited(semaphore: asyncio.Semaphore, func: Callable[..., Any], *args, **kwargs) -> Any:
+        async with semaphore:
+            return await run_blocking(func, *args, **kwargs)
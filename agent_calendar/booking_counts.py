@@ -0,0 +1,62 @@
+# This module counts an agent's bookings per day so the max_bookings_per_day cap costs a dict lookup per check.
+# A booking counts towards the day it starts on in the agent's timezone, numbered like the days of WorkingWindows.
+
+from collections import Counter
+from itertools import chain
+from typing import Iterable, Iterator, Tuple
+
+from agent_calendar.interval_index import IntervalIndex
+from agent_calendar.working_windows import WorkingWindows
+
+
+class DailyBookingCounts:
+    """The number of events starting on each day, kept up to date as events are booked and cancelled."""
+
+    __slots__ = ("working_windows", "_counts")
+
+    def __init__(self, working_windows: WorkingWindows, starts: Iterable[int] = ()):
+        self.working_windows: WorkingWindows = working_windows
+        self._counts: Counter = Counter(working_windows.day_of(start) for start in starts)
+
+    def count(self, day: int) -> int:
+        return self._counts.get(day, 0)
+
+    def add(self, start: int) -> None:
+        self._counts[self.working_windows.day_of(start)] += 1
+
+    def remove(self, start: int) -> None:
+        day = self.working_windows.day_of(start)
+        self._counts[day] -= 1
+        if self._counts[day] <= 0:
+            del self._counts[day]
+
+    def full_days(self, start: int, end: int, limit: int, extra_starts: Iterable[int] = ()) -> Iterator[Tuple[int, int]]:
+        """
+        Yields the [start, end) epoch microsecond bounds of the days overlapping [start, end) that have limit bookings.
+
+        extra_starts are counted as bookings too, e.g. the occurrences of recurring events in the window.
+        """
+        first_day, last_day = self.working_windows.day_of(start), self.working_windows.day_of(end - 1)
+        counts = self._counts
+        extra = Counter(self.working_windows.day_of(extra_start) for extra_start in extra_starts)
+        if extra:
+            counts = Counter({day: count for day, count in counts.items() if first_day <= day <= last_day})
+            counts.update(extra)
+        if last_day - first_day + 1 <= len(counts):
+            days = (day for day in range(first_day, last_day + 1) if counts.get(day, 0) >= limit)
+        else:
+            days = sorted(day for day, count in counts.items() if first_day <= day <= last_day and count >= limit)
+        return (self.working_windows.day_bounds(day) for day in days)
+
+
+def block_full_days(busy_index: IntervalIndex, full_days: Iterable[Tuple[int, int]], start: int, end: int) -> IntervalIndex:
+    """
+    Returns the busy blocks between start and end with the given full days blocked out entirely.
+
+    The slot searches then skip full days like any other busy block. busy_index itself is returned, without a copy,
+    when there are no full days.
+    """
+    full_days = list(full_days)
+    if not full_days:
+        return busy_index
+    return IntervalIndex(chain(busy_index.window(start, end).blocks(), full_days))
@@ -0,0 +1,130 @@
+# This module provides a process-wide cache of loaded AgentCalendar instances.
+# Loading a calendar parses the backing data files, so the factory keeps recently used calendars around and only
+# reloads them when the data they were built from changes.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from agent_calendar.agent_calendar import AgentCalendar
+from agent_calendar.metrics import GaugeCallback, register
+
+
+class CalendarCache:
+    """
+    Bounded LRU cache of AgentCalendar instances keyed by (client_id, agent_id).
+
+    Every entry remembers the stamp it was loaded with (e.g. backing file mtimes and settings) and the cache version.
+    An entry is treated as a miss and reloaded when the stamp changes, the version is bumped, or it is older than
+    ttl_seconds. Once more than max_size entries are held, the least recently used entry is evicted.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        if max_size <= 0:
+            raise ValueError("max_size must be greater than 0")
+        self.max_size: int = max_size
+        self.ttl_seconds: float = ttl_seconds
+        self.version: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (calendar, stamp, version, loaded_at)
+        self._entries: "OrderedDict[Hashable, Tuple[AgentCalendar, Any, int, float]]" = OrderedDict()
+
+    def get_or_load(self, key: Hashable, stamp: Any, loader: Callable[[], AgentCalendar]) -> AgentCalendar:
+        """
+        Returns the cached calendar for key, loading it with loader on a miss.
+
+        Args:
+            key (Hashable): The cache key, usually (client_id, agent_id).
+            stamp (Any): A comparable value describing the data the calendar is built from.
+            loader (Callable[[], AgentCalendar]): Called to build the calendar when the cached one is missing or stale.
+
+        Returns:
+            AgentCalendar: The cached or freshly loaded calendar.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                calendar, cached_stamp, version, loaded_at = entry
+                if cached_stamp == stamp and version == self.version and not self._expired(loaded_at):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return calendar
+                # stale entry, drop it so it is not served while we reload
+                del self._entries[key]
+            self.misses += 1
+            version = self.version
+
+        # load outside the lock so a slow load does not block lookups for other agents
+        calendar = loader()
+
+        with self._lock:
+            self._entries[key] = (calendar, stamp, version, self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return calendar
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drops the entry for key, or every entry when no key is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def bump_version(self) -> int:
+        """Marks every cached entry as stale, e.g. after the backing data was changed out of band."""
+        with self._lock:
+            self.version += 1
+            return self.version
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the hit, miss and eviction counters along with the current size of the cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+            }
+
+    def _expired(self, loaded_at: float) -> bool:
+        return self.ttl_seconds > 0 and self._clock() - loaded_at > self.ttl_seconds
+
+
+def file_stamp(file_path: str) -> Optional[int]:
+    """Returns the modification time of file_path in nanoseconds, or None if it does not exist."""
+    try:
+        return os.stat(file_path).st_mtime_ns
+    except OSError:
+        return None
+
+
+# shared by every request handled by this process
+calendar_cache = CalendarCache(
+    max_size=int(os.environ.get("HW_SCHEDULING_CALENDAR_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.environ.get("HW_SCHEDULING_CALENDAR_CACHE_TTL_SECONDS", "300")),
+)
+
+
+def _calendar_cache_metrics() -> Dict[Tuple[str, ...], float]:
+    stats = calendar_cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    return {
+        ("calendar", "hits"): stats["hits"],
+        ("calendar", "misses"): stats["misses"],
+        ("calendar", "evictions"): stats["evictions"],
+        ("calendar", "size"): stats["size"],
+        ("calendar", "hit_ratio"): stats["hits"] / lookups if lookups else 0.0,
+    }
+
+
+register(GaugeCallback("hw_scheduling_cache", "Hits, misses, evictions, size and hit ratio of the calendar cache.", ["cache", "stat"], _calendar_cache_metrics))
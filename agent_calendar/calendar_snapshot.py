@@ -0,0 +1,263 @@
+# This module shares pre-indexed calendar data between worker processes.
+# The launcher builds a snapshot of the calendar JSON file, with its write-ahead log applied, into one binary file:
+# every agent's events sorted by start as epoch microsecond arrays, the merged busy blocks and the event records. Worker
+# processes map the file read-only and wrap the arrays in place, so N workers share one copy of the data and loading
+# a calendar neither parses JSON nor sorts or merges events.
+#
+# A new snapshot is written next to the old one and renamed over it. Workers notice the new file on their next lookup
+# and move to it, calendars still using the old mapping keep it alive until they are dropped.
+#
+# Layout, all integers native int64 so every section can be cast to an array in place, the file is built on the host
+# that serves it:
+#     header         magic, agent count, event count, recurring event count, block count, record bytes
+#     agents         client_id, agent_id, first event, event count, first block, block count, first recurring event,
+#                    recurring event count per agent
+#     event starts, event ends, record offsets (event count + recurring event count + 1), block starts, block ends
+#     records        the JSON encoded event records, then the recurring event records
+#
+# Recurring events are stored as their records only, workers expand them lazily like calendars loaded from the file.
+
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from collections.abc import Sequence
+from typing import Dict, List, Optional, Tuple
+
+from agent_calendar.event_log import EventLog, apply_entries_to_events
+from agent_calendar.event_store import EventStore
+from agent_calendar.interval_index import IntervalIndex
+from agent_calendar.json_record_index import get_record_index
+from agent_calendar.recurrence import split_recurring
+
+logger = logging.getLogger(__name__)
+
+# set by the multi-process launcher, calendars are served from this snapshot when it is set
+SNAPSHOT_FILE = os.environ.get("HW_SCHEDULING_SNAPSHOT_FILE", "")
+# how often the launcher checks the calendar file for changes to publish
+PUBLISH_INTERVAL_SECONDS = float(os.environ.get("HW_SCHEDULING_SNAPSHOT_INTERVAL_SECONDS", "5"))
+
+MAGIC = b"HWSNAP02"
+_HEADER = struct.Struct("=8sqqqqq")
+_AGENT_FIELDS = 8
+_INT64 = 8
+
+AgentKey = Tuple[int, int]
+_NO_AGENT = (0, 0, 0, 0, 0, 0)
+Stamp = Tuple[int, int, int]
+
+
+class SnapshotRecords(Sequence):
+    """An agent's event records in a snapshot, decoded from JSON on access."""
+
+    def __init__(self, data: memoryview, offsets: memoryview):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[index] for index in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        return json.loads(self._data[self._offsets[position]:self._offsets[position + 1]].tobytes())
+
+
+class CalendarSnapshot:
+    """
+    A read-only memory mapping of a snapshot file.
+
+    Event stores and busy indexes handed out by the snapshot are views into the mapping and must not be changed.
+    """
+
+    def __init__(self, path: str):
+        self.path: str = path
+        with open(path, "rb") as f:
+            self.stamp: Stamp = _stamp(os.fstat(f.fileno()))
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        magic, agent_count, event_count, recurring_count, block_count, record_bytes = _HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a calendar snapshot")
+
+        offset = _HEADER.size
+
+        def section(count: int) -> memoryview:
+            nonlocal offset
+            view = buffer[offset:offset + count * _INT64].cast("q")
+            offset += count * _INT64
+            return view
+
+        agents = section(agent_count * _AGENT_FIELDS)
+        self._event_starts = section(event_count)
+        self._event_ends = section(event_count)
+        self._record_offsets = section(event_count + recurring_count + 1)
+        self._event_count = event_count
+        self._block_starts = section(block_count)
+        self._block_ends = section(block_count)
+        self._records = buffer[offset:offset + record_bytes]
+        # (client_id, agent_id) -> (first event, event count, first block, block count, first recurring event, recurring event count)
+        self._agents: Dict[AgentKey, Tuple[int, int, int, int, int, int]] = {}
+        for position in range(0, len(agents), _AGENT_FIELDS):
+            client_id, agent_id, *row = agents[position:position + _AGENT_FIELDS]
+            self._agents[(client_id, agent_id)] = tuple(row)
+
+    def keys(self) -> List[AgentKey]:
+        """Returns the (client_id, agent_id) pairs in the snapshot."""
+        return list(self._agents)
+
+    def event_store(self, client_id: int, agent_id: int) -> EventStore:
+        """Returns the agent's events, an empty store for agents without any."""
+        first_event, events, _, _, _, _ = self._agents.get((client_id, agent_id), _NO_AGENT)
+        last_event = first_event + events
+        records = SnapshotRecords(self._records, self._record_offsets[first_event:last_event + 1])
+        return EventStore.from_sorted(self._event_starts[first_event:last_event], self._event_ends[first_event:last_event], records)
+
+    def busy_index(self, client_id: int, agent_id: int) -> IntervalIndex:
+        """Returns the agent's merged busy blocks."""
+        _, _, first_block, blocks, _, _ = self._agents.get((client_id, agent_id), _NO_AGENT)
+        return IntervalIndex.from_blocks(self._block_starts[first_block:first_block + blocks], self._block_ends[first_block:first_block + blocks])
+
+    def recurring_records(self, client_id: int, agent_id: int) -> SnapshotRecords:
+        """Returns the records of the agent's recurring events, which are not part of its event store or busy blocks."""
+        _, _, _, _, first_recurring, recurring = self._agents.get((client_id, agent_id), _NO_AGENT)
+        first_record = self._event_count + first_recurring
+        return SnapshotRecords(self._records, self._record_offsets[first_record:first_record + recurring + 1])
+
+
+def build_snapshot(calendar_json_file: str, snapshot_file: str) -> int:
+    """
+    Writes a snapshot of the calendar JSON file and its logged changes, replacing snapshot_file atomically.
+
+    Returns:
+        int: The number of agents in the snapshot.
+    """
+    record_index = get_record_index(calendar_json_file)
+    # read the log from disk rather than this process's shared log, which only knows the changes made through it
+    event_log = EventLog(calendar_json_file)
+    agents = []
+    for client_id, agent_id in sorted(set(record_index.keys()) | set(event_log.agents())):
+        events = [event for calendar in record_index.records(client_id, agent_id) for event in calendar.get("calendar_events", [])]
+        agents.append(((client_id, agent_id), apply_entries_to_events(events, event_log.entries_since(client_id, agent_id, 0))))
+
+    agent_rows: List[int] = []
+    event_starts: List[int] = []
+    event_ends: List[int] = []
+    record_offsets: List[int] = [0]
+    block_starts: List[int] = []
+    block_ends: List[int] = []
+    records: List[bytes] = []
+    all_recurring: List[dict] = []
+    for (client_id, agent_id), events in agents:
+        events, recurring = split_recurring(events)
+        store = EventStore(events)
+        busy_index = IntervalIndex(store.intervals())
+        agent_rows.extend((client_id, agent_id, len(event_starts), len(store), len(block_starts), len(busy_index), len(all_recurring), len(recurring)))
+        event_starts.extend(store.starts)
+        event_ends.extend(store.ends)
+        for position in range(len(store)):
+            records.append(json.dumps(store.record(position)).encode("utf-8"))
+            record_offsets.append(record_offsets[-1] + len(records[-1]))
+        block_starts.extend(busy_index.starts)
+        block_ends.extend(busy_index.ends)
+        all_recurring.extend(recurring)
+    for record in all_recurring:
+        records.append(json.dumps(record).encode("utf-8"))
+        record_offsets.append(record_offsets[-1] + len(records[-1]))
+
+    temporary_file = f"{snapshot_file}.building"
+    with open(temporary_file, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(agents), len(event_starts), len(all_recurring), len(block_starts), record_offsets[-1]))
+        for values in (agent_rows, event_starts, event_ends, record_offsets, block_starts, block_ends):
+            f.write(struct.pack(f"={len(values)}q", *values))
+        f.writelines(records)
+        f.flush()
+        os.fsync(f.fileno())
+    # workers opening the path see either the old or the new snapshot, never a partial one
+    os.replace(temporary_file, snapshot_file)
+    logger.info(f"Wrote a snapshot of {len(agents)} agents and {len(event_starts)} events to {snapshot_file}")
+    return len(agents)
+
+
+def _stamp(stat: os.stat_result) -> Stamp:
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+_snapshot: Optional[CalendarSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot(snapshot_file: str = SNAPSHOT_FILE) -> Optional[CalendarSnapshot]:
+    """
+    Returns the current snapshot, mapping a new one when the file was replaced, or None when no snapshot is configured.
+
+    Args:
+        snapshot_file (str): The path of the snapshot file, HW_SCHEDULING_SNAPSHOT_FILE by default.
+
+    Returns:
+        Optional[CalendarSnapshot]: The mapped snapshot.
+    """
+    global _snapshot
+    if not snapshot_file:
+        return None
+    stamp = _stamp(os.stat(snapshot_file))
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.path == snapshot_file and snapshot.stamp == stamp:
+        return snapshot
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.path != snapshot_file or _snapshot.stamp != stamp:
+            _snapshot = CalendarSnapshot(snapshot_file)
+        return _snapshot
+
+
+class SnapshotPublisher:
+    """A daemon thread in the launcher rebuilding the snapshot whenever the calendar file or its log changes."""
+
+    def __init__(self, calendar_json_file: str, snapshot_file: str, interval_seconds: float = PUBLISH_INTERVAL_SECONDS):
+        self.calendar_json_file: str = calendar_json_file
+        self.snapshot_file: str = snapshot_file
+        self.interval_seconds: float = interval_seconds
+        self._source_stamp = self._read_source_stamp()
+        self._stopped = threading.Event()
+        self._woken = threading.Event()
+
+    def _read_source_stamp(self) -> Tuple[Optional[Stamp], ...]:
+        stamps = []
+        for path in (self.calendar_json_file, EventLog.log_file_of(self.calendar_json_file)):
+            try:
+                stamps.append(_stamp(os.stat(path)))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def publish(self) -> None:
+        """Builds a snapshot of the current data."""
+        self._source_stamp = self._read_source_stamp()
+        build_snapshot(self.calendar_json_file, self.snapshot_file)
+
+    def start(self) -> None:
+        threading.Thread(target=self._run, name="snapshot-publisher", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._woken.set()
+
+    def wake(self) -> None:
+        """Checks for changes now rather than at the next interval, e.g. after the calendar writer applied one."""
+        self._woken.set()
+
+    def _run(self) -> None:
+        while True:
+            self._woken.wait(self.interval_seconds)
+            self._woken.clear()
+            if self._stopped.is_set():
+                return
+            try:
+                if self._read_source_stamp() != self._source_stamp:
+                    self.publish()
+            except Exception as e:
+                logger.error(f"Error publishing calendar snapshot: {e}", exc_info=True)
@@ -0,0 +1,144 @@
+# This module funnels changes to JSON calendars served from a shared snapshot into one writer process.
+# Worker processes started by the launcher map the snapshot read-only, and the event log is per process, so a booking
+# applied in one worker would never reach the others. Workers send their bookings, updates and cancellations to the
+# CalendarWriter in the launcher instead. It owns the calendar file and its write-ahead log, applies each change with
+# the same checks as a single process server, and wakes the snapshot publisher, which takes the change into the next
+# snapshot.
+#
+# Requests and replies are single JSON lines over a Unix socket, one request per connection.
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+from agent_calendar.agent_calendar import AgentCalendar, CalendarConflictError, EventNotFoundError
+from agent_calendar.agent_calendar_settings import get_agent_calendar_settings
+from models import AgentCalendarEvent, AgentCalendarSettings
+
+logger = logging.getLogger(__name__)
+
+# set by the multi-process launcher, snapshot calendars send their changes to the writer listening here
+WRITER_SOCKET = os.environ.get("HW_SCHEDULING_WRITER_SOCKET", "")
+TIMEOUT_SECONDS = float(os.environ.get("HW_SCHEDULING_WRITER_TIMEOUT_SECONDS", "10"))
+
+CREATE_EVENT = "create"
+UPDATE_EVENT = "update"
+CANCEL_EVENT = "cancel"
+
+
+def send_change(socket_path: str, request: dict) -> AgentCalendarEvent:
+    """
+    Sends a change to the writer and returns the changed event.
+
+    Raises:
+        CalendarConflictError: If the agent is not available or the event already exists.
+        EventNotFoundError: If the event to change does not exist.
+        RuntimeError: If the writer failed to apply the change.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(TIMEOUT_SECONDS)
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with connection.makefile("rb") as reply_file:
+            reply = json.loads(reply_file.readline())
+    error = reply.get("error")
+    if error == "conflict":
+        raise CalendarConflictError(reply["message"])
+    if error == "not_found":
+        raise EventNotFoundError(reply["message"])
+    if error:
+        raise RuntimeError(f"The calendar writer failed to apply the change: {reply['message']}")
+    return AgentCalendarEvent(**reply["event"])
+
+
+class CalendarWriter:
+    """
+    A Unix socket server applying the changes workers send to writable calendars.
+
+    Calendars are loaded once per agent with load_calendar(client_id, agent_id, settings) and kept until the agent's
+    settings change. on_change is called after every applied change.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        load_calendar: Callable[[int, int, AgentCalendarSettings], AgentCalendar],
+        on_change: Callable[[], None] = lambda: None,
+    ):
+        self.socket_path: str = socket_path
+        self.load_calendar = load_calendar
+        self.on_change = on_change
+        self._calendars: Dict[Tuple[int, int], Tuple[AgentCalendarSettings, AgentCalendar]] = {}
+        self._calendars_lock = threading.Lock()
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+
+    def start(self) -> None:
+        if os.path.exists(self.socket_path):
+            # left behind by a launcher that did not shut down cleanly
+            os.unlink(self.socket_path)
+        writer = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                try:
+                    reply = writer.apply(json.loads(self.rfile.readline()))
+                except Exception as e:
+                    logger.error(f"Error reading calendar change: {e}", exc_info=True)
+                    reply = {"error": "internal", "message": str(e)}
+                self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="calendar-writer", daemon=True).start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            os.unlink(self.socket_path)
+
+    def apply(self, request: dict) -> dict:
+        """Applies a change request and returns the reply, the changed event or an error."""
+        try:
+            calendar = self._calendar(request["client_id"], request["agent_id"])
+            op = request["op"]
+            if op == CREATE_EVENT:
+                event = calendar.create_event(AgentCalendarEvent(**request["event"]))
+            elif op == UPDATE_EVENT:
+                event = calendar.update_event(
+                    request["uid"],
+                    datetime.fromisoformat(request["start_time"]),
+                    datetime.fromisoformat(request["end_time"]),
+                    summary=request.get("summary"),
+                    description=request.get("description"),
+                    location=request.get("location"),
+                )
+            elif op == CANCEL_EVENT:
+                event = calendar.cancel_event(request["uid"])
+            else:
+                raise ValueError(f"Unknown calendar change {op!r}")
+        except CalendarConflictError as e:
+            return {"error": "conflict", "message": str(e)}
+        except EventNotFoundError as e:
+            return {"error": "not_found", "message": str(e)}
+        except Exception as e:
+            logger.error(f"Error applying calendar change: {e}", exc_info=True)
+            return {"error": "internal", "message": str(e)}
+        self.on_change()
+        return {"event": event.model_dump(mode="json")}
+
+    def _calendar(self, client_id: int, agent_id: int) -> AgentCalendar:
+        settings = get_agent_calendar_settings(client_id, agent_id)
+        key = (client_id, agent_id)
+        with self._calendars_lock:
+            cached = self._calendars.get(key)
+            if cached is None or cached[0] != settings:
+                cached = (settings, self.load_calendar(client_id, agent_id, settings))
+                self._calendars[key] = cached
+            return cached[1]
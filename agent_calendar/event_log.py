@@ -0,0 +1,237 @@
+# This module persists calendar changes as an append-only write-ahead log next to the calendar JSON file.
+# Booking, moving or cancelling an event appends one line to <calendar file>.wal instead of rewriting the whole file.
+# Calendars replay the log on top of the JSON file when they load, and a background thread periodically compacts the
+# log into the JSON file.
+#
+# Log entries upsert or cancel events by uid, so replaying an entry that is already in the JSON file is harmless.
+
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# the log is compacted into the calendar file once it holds this many entries
+COMPACT_AFTER_ENTRIES = int(os.environ.get("HW_SCHEDULING_EVENT_LOG_COMPACT_ENTRIES", "1000"))
+# and at least this often while it has any entries
+COMPACT_INTERVAL_SECONDS = float(os.environ.get("HW_SCHEDULING_EVENT_LOG_COMPACT_INTERVAL_SECONDS", "300"))
+
+UPSERT = "upsert"
+CANCEL = "cancel"
+
+AgentKey = Tuple[int, int]
+
+
+class EventLog:
+    """
+    The write-ahead log of changes to one calendar JSON file.
+
+    Every entry gets an increasing sequence number. Readers that need the JSON file and the log to agree, such as a
+    calendar load, hold lock while reading both; compaction swaps both under the same lock.
+    """
+
+    def __init__(self, calendar_json_file: str):
+        self.calendar_json_file: str = calendar_json_file
+        self.log_file: str = self.log_file_of(calendar_json_file)
+        self.lock = threading.RLock()
+        # entries up to and including this sequence number have been folded into the calendar file
+        self.compacted_through: int = 0
+        self.last_seq: int = 0
+        self._entries: List[dict] = []
+        self._entries_by_agent: Dict[AgentKey, List[dict]] = defaultdict(list)
+        self._compaction_lock = threading.Lock()
+        self._compaction_wanted = threading.Event()
+        self._compactor: Optional[threading.Thread] = None
+        self._read_log_file()
+
+    @staticmethod
+    def log_file_of(calendar_json_file: str) -> str:
+        """Returns the path of the log of calendar_json_file."""
+        return f"{calendar_json_file}.wal"
+
+    def _read_log_file(self) -> None:
+        if not os.path.exists(self.log_file):
+            return
+        with open(self.log_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # a write interrupted by a crash leaves a partial last line, it was never acknowledged
+                    logger.warning(f"Skipping unreadable entry in {self.log_file}")
+                    continue
+                self._add(entry)
+        # everything before the first remaining entry is already in the calendar file
+        if self._entries:
+            self.compacted_through = self._entries[0]["seq"] - 1
+
+    def _add(self, entry: dict) -> None:
+        self._entries.append(entry)
+        self._entries_by_agent[(entry["client_id"], entry["agent_id"])].append(entry)
+        self.last_seq = max(self.last_seq, entry["seq"])
+
+    def append(self, client_id: int, agent_id: int, op: str, event: dict) -> int:
+        """
+        Durably appends a change to the log.
+
+        Args:
+            client_id (int): The client ID.
+            agent_id (int): The agent ID.
+            op (str): UPSERT to add or replace the event with the same uid, CANCEL to remove it.
+            event (dict): The event record, as stored in the calendar JSON file.
+
+        Returns:
+            int: The sequence number of the entry.
+        """
+        with self.lock:
+            entry = {"seq": self.last_seq + 1, "op": op, "client_id": client_id, "agent_id": agent_id, "event": event}
+            with open(self.log_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._add(entry)
+            pending = len(self._entries)
+        self._start_compactor()
+        if pending >= COMPACT_AFTER_ENTRIES:
+            self._compaction_wanted.set()
+        return entry["seq"]
+
+    def entries_since(self, client_id: int, agent_id: int, seq: int) -> List[dict]:
+        """Returns the agent's entries with a sequence number greater than seq, oldest first."""
+        with self.lock:
+            return [entry for entry in self._entries_by_agent.get((client_id, agent_id), []) if entry["seq"] > seq]
+
+    def agents(self) -> List[AgentKey]:
+        """Returns the (client_id, agent_id) pairs with logged changes."""
+        with self.lock:
+            return list(self._entries_by_agent)
+
+    def compact(self) -> int:
+        """
+        Folds the logged changes into the calendar JSON file and drops them from the log.
+
+        Changes appended while the JSON file is being rewritten stay in the log for the next compaction.
+
+        Returns:
+            int: The number of entries folded into the calendar file.
+        """
+        with self._compaction_lock:
+            with self.lock:
+                entries = list(self._entries)
+            if not entries:
+                return 0
+            through = entries[-1]["seq"]
+
+            with open(self.calendar_json_file, "r", encoding="utf-8") as f:
+                calendars = json.load(f)
+            apply_entries(calendars, entries)
+            temporary_file = f"{self.calendar_json_file}.compacting"
+            with open(temporary_file, "w", encoding="utf-8") as f:
+                json.dump(calendars, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+
+            with self.lock:
+                remaining = [entry for entry in self._entries if entry["seq"] > through]
+                temporary_log = f"{self.log_file}.compacting"
+                with open(temporary_log, "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps(entry) + "\n" for entry in remaining)
+                # replaying the old log on top of the new calendar file gives the same result, so a crash between
+                # the two replaces loses nothing
+                os.replace(temporary_file, self.calendar_json_file)
+                os.replace(temporary_log, self.log_file)
+                self._entries = []
+                self._entries_by_agent = defaultdict(list)
+                for entry in remaining:
+                    self._add(entry)
+                self.compacted_through = through
+            logger.info(f"Compacted {len(entries)} entries into {self.calendar_json_file}")
+            return len(entries)
+
+    def _start_compactor(self) -> None:
+        if self._compactor is not None:
+            return
+        with self.lock:
+            if self._compactor is None:
+                self._compactor = threading.Thread(target=self._compact_in_background, name="event-log-compactor", daemon=True)
+                self._compactor.start()
+
+    def _compact_in_background(self) -> None:
+        while True:
+            self._compaction_wanted.wait(COMPACT_INTERVAL_SECONDS)
+            self._compaction_wanted.clear()
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"Error compacting {self.log_file}: {e}", exc_info=True)
+
+
+def apply_entries(calendars: List[dict], entries: List[dict]) -> None:
+    """Applies log entries to the records of a calendar JSON file in place."""
+    entries_by_agent: Dict[AgentKey, List[dict]] = defaultdict(list)
+    for entry in entries:
+        entries_by_agent[(entry["client_id"], entry["agent_id"])].append(entry)
+
+    calendars_by_agent: Dict[AgentKey, List[dict]] = defaultdict(list)
+    for calendar in calendars:
+        key = (calendar["client_id"], calendar["agent_id"])
+        if key in entries_by_agent:
+            calendars_by_agent[key].append(calendar)
+
+    for key, agent_entries in entries_by_agent.items():
+        agent_calendars = calendars_by_agent.get(key)
+        if not agent_calendars:
+            agent_calendars = [{"client_id": key[0], "agent_id": key[1], "calendar_events": []}]
+            calendars.append(agent_calendars[0])
+        events = [event for calendar in agent_calendars for event in calendar.get("calendar_events", [])]
+        # the agent's events end up in its first calendar record
+        agent_calendars[0]["calendar_events"] = apply_entries_to_events(events, agent_entries)
+        for calendar in agent_calendars[1:]:
+            calendar["calendar_events"] = []
+
+
+def apply_entries_to_events(events: List[dict], entries: List[dict]) -> List[dict]:
+    """Returns an agent's event records with its log entries applied, keeping the order of untouched events."""
+    if not entries:
+        return events
+    by_uid = {event["uid"]: event for event in events}
+    for entry in entries:
+        by_uid.pop(entry["event"]["uid"], None)
+        if entry["op"] == UPSERT:
+            by_uid[entry["event"]["uid"]] = entry["event"]
+    return list(by_uid.values())
+
+
+_logs: Dict[str, EventLog] = {}
+_logs_lock = threading.Lock()
+_agent_locks: Dict[Tuple[str, int, int], threading.RLock] = {}
+
+
+def get_event_log(calendar_json_file: str) -> EventLog:
+    """Returns the shared event log of calendar_json_file."""
+    path = os.path.abspath(calendar_json_file)
+    with _logs_lock:
+        log = _logs.get(path)
+        if log is None:
+            log = EventLog(path)
+            _logs[path] = log
+        return log
+
+
+def agent_lock(calendar_json_file: str, client_id: int, agent_id: int) -> threading.RLock:
+    """
+    Returns the lock serializing reads and changes of one agent's calendar.
+
+    It is shared by every calendar instance of the agent, so a booking's availability check and insert are atomic
+    even while an older cached instance is still in use.
+    """
+    key = (os.path.abspath(calendar_json_file), client_id, agent_id)
+    with _logs_lock:
+        lock = _agent_locks.get(key)
+        if lock is None:
+            lock = threading.RLock()
+            _agent_locks[key] = lock
+        return lock
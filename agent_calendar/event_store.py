@@ -0,0 +1,112 @@
+# This module provides compact storage of an agent's calendar events.
+# Availability only needs each event's start and end, so those are kept as parallel arrays of epoch microseconds and
+# the descriptive fields stay in the source records until an API asks for AgentCalendarEvent models.
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from agent_calendar.interval_index import to_epoch_us
+from models import AgentCalendarEvent
+
+
+class EventStore:
+    """
+    An agent's events sorted by start time.
+
+    starts and ends hold the epoch microsecond bounds of each event. The source records are only turned into
+    AgentCalendarEvent models by event and events, and are not mutated, so they may be shared with a record index.
+    """
+
+    __slots__ = ("starts", "ends", "_records", "_uid_starts")
+
+    def __init__(self, records: Iterable[dict] = (), bounds: Optional[Tuple[Sequence[int], Sequence[int]]] = None):
+        # bounds, the starts and ends of the records when already known, e.g. from a parsed cache, skip parsing them
+        if bounds is not None:
+            bounds = list(zip(*bounds, records))
+        else:
+            bounds = []
+            for record in records:
+                bounds.append((to_epoch_us(datetime.fromisoformat(record["dtstart"])), to_epoch_us(datetime.fromisoformat(record["dtend"])), record))
+        # Sort events by start time, keeping the file order of events that start together
+        bounds.sort(key=lambda bound: bound[0])
+        self.starts: array = array("q", (start for start, _, _ in bounds))
+        self.ends: array = array("q", (end for _, end, _ in bounds))
+        self._records: List[dict] = [record for _, _, record in bounds]
+        # start of each event by uid, only built once the store is first changed
+        self._uid_starts: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_sorted(cls, starts: Sequence[int], ends: Sequence[int], records: Sequence[dict]) -> "EventStore":
+        """Wraps event bounds and records already in start order without copying them, e.g. read-only views into a snapshot."""
+        store = cls.__new__(cls)
+        store.starts = starts
+        store.ends = ends
+        store._records = records
+        store._uid_starts = None
+        return store
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def intervals(self) -> Iterator[Tuple[int, int]]:
+        """Yields the (start, end) epoch microsecond bounds of each event in start order."""
+        return zip(self.starts, self.ends)
+
+    def event(self, position: int) -> AgentCalendarEvent:
+        """Materializes the event at position as an AgentCalendarEvent."""
+        return AgentCalendarEvent(**self._records[position])
+
+    def events(self) -> List[AgentCalendarEvent]:
+        """Materializes every event as an AgentCalendarEvent, in start order."""
+        return [AgentCalendarEvent(**record) for record in self._records]
+
+    def between(self, start: int, end: int) -> Iterator[Tuple[int, int]]:
+        """Yields the (start, end) bounds of the events that start within [start, end]."""
+        first = bisect_left(self.starts, start)
+        last = bisect_right(self.starts, end)
+        return zip(self.starts[first:last], self.ends[first:last])
+
+    def find(self, uid: str) -> int:
+        """Returns the position of the event with uid, or -1 if there is none."""
+        uid_starts = self._uid_index()
+        start = uid_starts.get(uid)
+        if start is None:
+            return -1
+        # events that start together are next to each other, check just those
+        position = bisect_left(self.starts, start)
+        while position < len(self.starts) and self.starts[position] == start:
+            if self._records[position]["uid"] == uid:
+                return position
+            position += 1
+        return -1
+
+    def record(self, position: int) -> dict:
+        """Returns the source record of the event at position."""
+        return self._records[position]
+
+    def insert(self, record: dict) -> Tuple[int, int]:
+        """Inserts an event record in start order and returns its (start, end) epoch microsecond bounds."""
+        start = to_epoch_us(datetime.fromisoformat(record["dtstart"]))
+        end = to_epoch_us(datetime.fromisoformat(record["dtend"]))
+        position = bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self._records.insert(position, record)
+        self._uid_index()[record["uid"]] = start
+        return start, end
+
+    def remove(self, uid: str) -> Optional[Tuple[int, int, dict]]:
+        """Removes the event with uid and returns its (start, end, record), or None if there is no such event."""
+        position = self.find(uid)
+        if position < 0:
+            return None
+        start, end, record = self.starts.pop(position), self.ends.pop(position), self._records.pop(position)
+        del self._uid_starts[uid]
+        return start, end, record
+
+    def _uid_index(self) -> Dict[str, int]:
+        if self._uid_starts is None:
+            self._uid_starts = {record["uid"]: start for start, record in zip(self.starts, self._records)}
+        return self._uid_starts
@@ -0,0 +1,222 @@
+# This module materializes an agent's free/busy time over a rolling horizon.
+# A view holds the merged busy blocks and the free intervals left of the working hours, both as epoch microsecond
+# arrays, for the days from today to HW_SCHEDULING_FREE_BUSY_HORIZON_DAYS ahead. Calendars keep a view up to date in
+# the background, so free/busy lookups read it directly and slot searches within the horizon jump from one free
+# interval to the next instead of checking busy blocks and working hours separately.
+#
+# A view is only used while no event changed since it was built, otherwise callers fall back to the calendar itself.
+
+import logging
+import os
+import queue
+import threading
+import time
+import weakref
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from agent_calendar.interval_index import IntervalIndex, MICROSECOND, from_epoch_us, to_epoch_us
+from agent_calendar.metrics import BUSY_BLOCKS_SCANNED, SLOTS_PROBED, timed
+from agent_calendar.slot_search import next_candidate
+from agent_calendar.working_windows import WorkingWindows
+from models import TimeRange
+
+logger = logging.getLogger(__name__)
+
+# days covered by a view, 0 disables the views
+HORIZON_DAYS = int(os.environ.get("HW_SCHEDULING_FREE_BUSY_HORIZON_DAYS", "14"))
+# how often views are checked for a new day to move their horizon to
+REFRESH_INTERVAL_SECONDS = float(os.environ.get("HW_SCHEDULING_FREE_BUSY_REFRESH_SECONDS", "60"))
+
+
+class FreeBusyView:
+    """
+    An agent's busy blocks and free working time within [start, end), as of one version of its events.
+
+    Free intervals are the parts of each day's working hours not covered by a busy block, so a slot is available
+    exactly when it fits inside one of them.
+    """
+
+    __slots__ = ("start", "end", "version", "busy", "free_starts", "free_ends")
+
+    def __init__(self, busy: IntervalIndex, working_windows: WorkingWindows, start: int, end: int, version: int = 0):
+        self.start: int = start
+        self.end: int = end
+        self.version: int = version
+        self.busy: IntervalIndex = busy.window(start, end)
+        self.free_starts: array = array("q")
+        self.free_ends: array = array("q")
+        first_day, last_day = working_windows.day_of(start), working_windows.day_of(end - 1)
+        for day in range(first_day, last_day + 1):
+            window_start, window_end = working_windows.window(day)
+            for free_start, free_end in self.busy.free_intervals(max(window_start, start), min(window_end, end)):
+                self.free_starts.append(free_start)
+                self.free_ends.append(free_end)
+
+    def covers(self, start_time: datetime, end_time: datetime) -> bool:
+        """Checks if [start_time, end_time] lies within the view's horizon."""
+        return self.start <= to_epoch_us(start_time) and to_epoch_us(end_time) <= self.end
+
+    def busy_blocks(self) -> List[Tuple[int, int]]:
+        """Returns the busy blocks clipped to the horizon, as (start, end) epoch microsecond tuples."""
+        return [(max(start, self.start), min(end, self.end)) for start, end in self.busy.blocks() if start < self.end and end > self.start]
+
+    def free_intervals(self) -> List[Tuple[int, int]]:
+        """Returns the free intervals of the working hours, as (start, end) epoch microsecond tuples."""
+        return list(zip(self.free_starts, self.free_ends))
+
+    def find_available_slots(
+        self, working_windows: WorkingWindows, availability_increment: int, time_ranges: List[TimeRange], duration: timedelta, count: int
+    ) -> List[datetime]:
+        """
+        Finds the same start times as agent_calendar.slot_search.find_available_slots, for time ranges the view covers.
+
+        Each probe is one bisect into the free intervals, which jumps over busy blocks and non-working hours together.
+        """
+        return list(self.iter_available_slots(working_windows, availability_increment, time_ranges, duration, count))
+
+    def iter_available_slots(
+        self, working_windows: WorkingWindows, availability_increment: int, time_ranges: List[TimeRange], duration: timedelta, count: int
+    ) -> Iterator[datetime]:
+        """Yields the start times of find_available_slots one at a time as they are found."""
+        increment = timedelta(minutes=availability_increment) // MICROSECOND
+        duration_us = duration // MICROSECOND
+        if duration_us <= 0:
+            return
+        found = probed = 0
+        try:
+            for interval in time_ranges:
+                tzinfo = interval.start.tzinfo or timezone.utc
+                current = to_epoch_us(interval.start)
+                last_start = to_epoch_us(interval.end) - duration_us
+
+                while current <= last_start and found < count:
+                    probed += 1
+                    day = working_windows.day_of(current)
+                    window_start, window_end = working_windows.window(day)
+                    last_start_of_day = window_end - duration_us
+                    if current > last_start_of_day:
+                        # roll over to the next working day
+                        current = working_windows.window(day + 1)[0]
+                        continue
+
+                    # the first free interval that ends late enough to hold a slot starting at current
+                    position = bisect_left(self.free_ends, current + duration_us)
+                    if position == len(self.free_ends):
+                        break
+                    free_start = self.free_starts[position]
+                    if free_start <= current:
+                        found += 1
+                        yield from_epoch_us(current, tzinfo)
+                        target = current + increment
+                    else:
+                        target = current + -(-(free_start - current) // increment) * increment
+                    current = next_candidate(current, target, increment, last_start_of_day)
+
+                if found >= count:
+                    break
+        finally:
+            SLOTS_PROBED.observe(probed, "free_busy")
+            BUSY_BLOCKS_SCANNED.observe(0, "free_busy")
+
+
+def horizon(working_windows: WorkingWindows, days: int = HORIZON_DAYS) -> Tuple[int, int]:
+    """Returns the epoch microsecond bounds of the next days local days, starting with today."""
+    # free/busy lookups still cover today when the materialized views are disabled
+    days = max(days, 1)
+    today = working_windows.day_of(to_epoch_us(datetime.now(timezone.utc)))
+    return working_windows.day_bounds(today)[0], working_windows.day_bounds(today + days - 1)[1]
+
+
+class MaterializedFreeBusy:
+    """
+    Keeps one calendar's FreeBusyView up to date.
+
+    The calendar calls invalidate after every change to its events, which makes the current view unusable and queues
+    a rebuild on the background refresher. Views are also rebuilt once a new day moves the horizon.
+    """
+
+    def __init__(self, working_windows: WorkingWindows, build: Callable[[int, int, int], FreeBusyView], days: int = HORIZON_DAYS):
+        self.working_windows: WorkingWindows = working_windows
+        self.days: int = days
+        # builds the view of [start, end) for a version, reading the calendar's events consistently
+        self._build = build
+        self.version: int = 0
+        self._view: Optional[FreeBusyView] = None
+        self._queued = False
+        _refresher.schedule(self)
+
+    def view(self) -> Optional[FreeBusyView]:
+        """Returns the current view, or None while it is being rebuilt after a change."""
+        view = self._view
+        if view is None or view.version != self.version:
+            return None
+        return view
+
+    def invalidate(self) -> None:
+        self.version += 1
+        _refresher.schedule(self)
+
+    def refresh(self) -> FreeBusyView:
+        """Rebuilds the view now and returns it."""
+        version = self.version
+        start, end = horizon(self.working_windows, self.days)
+        with timed("free_busy_refresh"):
+            view = self._build(start, end, version)
+        current = self._view
+        if current is None or current.version <= view.version:
+            self._view = view
+        return view
+
+    def needs_new_horizon(self) -> bool:
+        view = self._view
+        return view is not None and horizon(self.working_windows, self.days)[0] != view.start
+
+
+class _Refresher:
+    """A daemon thread rebuilding the queued views, and every view once its horizon has moved."""
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds: float = interval_seconds
+        self._queue: "queue.Queue[MaterializedFreeBusy]" = queue.Queue()
+        self._views: "weakref.WeakSet[MaterializedFreeBusy]" = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, materialized: MaterializedFreeBusy) -> None:
+        with self._lock:
+            self._views.add(materialized)
+            if materialized._queued:
+                return
+            materialized._queued = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="free-busy-refresher", daemon=True)
+                self._thread.start()
+        self._queue.put(materialized)
+
+    def _run(self) -> None:
+        next_horizon_check = time.monotonic() + self.interval_seconds
+        while True:
+            try:
+                materialized = self._queue.get(timeout=max(0.0, next_horizon_check - time.monotonic()))
+            except queue.Empty:
+                next_horizon_check = time.monotonic() + self.interval_seconds
+                with self._lock:
+                    views = list(self._views)
+                for materialized in views:
+                    if materialized.needs_new_horizon():
+                        self.schedule(materialized)
+                continue
+            with self._lock:
+                materialized._queued = False
+            try:
+                materialized.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing free/busy view: {e}", exc_info=True)
+            # drop the reference so unused calendars can be collected
+            del materialized
+
+
+_refresher = _Refresher(REFRESH_INTERVAL_SECONDS)
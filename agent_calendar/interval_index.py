@@ -0,0 +1,127 @@
+# This module provides a compact index of an agent's busy time used to answer availability queries.
+# Events are merged into disjoint busy blocks stored as sorted arrays of epoch microseconds, so an overlap query is a
+# single bisect instead of a scan over every event.
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Sequence, Tuple
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def to_epoch_us(value: datetime) -> int:
+    """Converts a datetime to integer microseconds since the epoch. Naive datetimes are treated as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // MICROSECOND
+
+
+def from_epoch_us(value: int, tzinfo=timezone.utc) -> datetime:
+    """Converts integer microseconds since the epoch back to an aware datetime in tzinfo."""
+    return (EPOCH + timedelta(microseconds=value)).astimezone(tzinfo)
+
+
+class IntervalIndex:
+    """
+    Disjoint, sorted busy blocks built from possibly overlapping [start, end) intervals.
+
+    Overlapping and touching intervals are merged when the index is built, so both the block starts and the block
+    ends are sorted and the first block that can overlap a query is found with one bisect on the ends.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[int, int]] = ()):
+        self.starts: array = array("q")
+        self.ends: array = array("q")
+        for start, end in sorted(interval for interval in intervals if interval[0] <= interval[1]):
+            if self.ends and start <= self.ends[-1]:
+                # overlaps or touches the previous block, extend it
+                if end > self.ends[-1]:
+                    self.ends[-1] = end
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    @classmethod
+    def from_blocks(cls, starts: Sequence[int], ends: Sequence[int]) -> "IntervalIndex":
+        """Wraps blocks that are already disjoint and sorted without copying them, e.g. read-only views into a snapshot."""
+        index = cls()
+        index.starts = starts
+        index.ends = ends
+        return index
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def find_overlap(self, start: int, end: int) -> int:
+        """
+        Finds the busy block overlapping the [start, end) interval given in epoch microseconds.
+
+        Returns:
+            int: The position of the overlapping block, or -1 if the interval is free.
+        """
+        # first block that ends after the interval starts, blocks before it are entirely in the past
+        position = bisect_right(self.ends, start)
+        if position < len(self.starts) and self.starts[position] < end:
+            return position
+        return -1
+
+    def overlaps(self, start_time: datetime, end_time: datetime) -> bool:
+        """Checks if the [start_time, end_time) interval overlaps any busy block."""
+        return self.find_overlap(to_epoch_us(start_time), to_epoch_us(end_time)) >= 0
+
+    def free_intervals(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """Returns the gaps between busy blocks within [start, end), as (start, end) epoch microsecond tuples."""
+        free = []
+        cursor = start
+        position = bisect_right(self.ends, start)
+        while position < len(self.starts) and self.starts[position] < end:
+            if self.starts[position] > cursor:
+                free.append((cursor, self.starts[position]))
+            cursor = max(cursor, self.ends[position])
+            position += 1
+        if cursor < end:
+            free.append((cursor, end))
+        return free
+
+    def add(self, start: int, end: int) -> None:
+        """Adds a [start, end) interval in place, merging it with the blocks it overlaps or touches."""
+        if start > end:
+            return
+        first = bisect_left(self.ends, start)
+        last = bisect_right(self.starts, end)
+        if first < last:
+            start = min(start, self.starts[first])
+            end = max(end, self.ends[last - 1])
+        self.starts[first:last] = array("q", [start])
+        self.ends[first:last] = array("q", [end])
+
+    def block_containing(self, start: int, end: int) -> int:
+        """Returns the position of the block that covers [start, end), or -1 if no block does."""
+        position = bisect_right(self.starts, start) - 1
+        if position >= 0 and self.ends[position] >= end:
+            return position
+        return -1
+
+    def replace_block(self, position: int, intervals: Iterable[Tuple[int, int]]) -> None:
+        """
+        Replaces the block at position with the merged blocks of intervals, e.g. after an event inside it was removed.
+        The intervals must lie within the replaced block.
+        """
+        replacement = IntervalIndex(intervals)
+        self.starts[position:position + 1] = replacement.starts
+        self.ends[position:position + 1] = replacement.ends
+
+    def window(self, start: int, end: int) -> "IntervalIndex":
+        """Returns a copy holding only the blocks that overlap or touch [start, end)."""
+        first = bisect_left(self.ends, start)
+        last = bisect_right(self.starts, end)
+        window = IntervalIndex()
+        window.starts = self.starts[first:last]
+        window.ends = self.ends[first:last]
+        return window
+
+    def blocks(self) -> List[Tuple[int, int]]:
+        """Returns the merged busy blocks as (start, end) epoch microsecond tuples."""
+        return list(zip(self.starts, self.ends))
@@ -1,114 +1,315 @@
-import json
 import logging
+import os
 
-import datetime as dt
-from datetime import datetime, timedelta
-from typing import List
+from bisect import bisect_right
+from datetime import date, datetime, timedelta, timezone
+from itertools import chain
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 from models import AgentCalendarEvent, AgentCalendarSettings, TimeRange, ToDo
-from agent_calendar.agent_calendar import AgentCalendar
+from agent_calendar.agent_calendar import AgentCalendar, CalendarConflictError, EventNotFoundError
+from agent_calendar.booking_counts import DailyBookingCounts, block_full_days
+from agent_calendar.calendar_snapshot import CalendarSnapshot
+from agent_calendar.calendar_writer import CANCEL_EVENT, CREATE_EVENT, UPDATE_EVENT, send_change
+from agent_calendar.event_log import CANCEL, UPSERT, agent_lock, apply_entries_to_events, get_event_log
+from agent_calendar.event_store import EventStore
+from agent_calendar.free_busy import HORIZON_DAYS as FREE_BUSY_HORIZON_DAYS, FreeBusyView, MaterializedFreeBusy, horizon
+from agent_calendar.interval_index import IntervalIndex, to_epoch_us
+from agent_calendar.json_record_index import get_record_index
+from agent_calendar.recommendations import iter_work_recommendations, priority_rank, upcoming_due_date
+from agent_calendar.recurrence import RecurringEvents, is_recurring, split_recurring
+from agent_calendar.slot_search import find_available_slots, iter_available_slots, search_window
+from agent_calendar.vectorized_slot_search import find_available_slots_vectorized, is_supported as vectorized_search_supported
+from agent_calendar.working_windows import WorkingWindows, get_working_windows
 
 logger = logging.getLogger(__name__)
 
+# searches with at least this many candidate start times use the vectorized search when NumPy is available
+VECTORIZED_MIN_CANDIDATES = int(os.environ.get("HW_SCHEDULING_VECTORIZED_MIN_CANDIDATES", "2000"))
+
 
 class JSONAgentCalendar(AgentCalendar):
-    def __init__(self, calendar_json_file: str, todo_json_file: str, client_id: int, agent_id: int, calendar_settings: AgentCalendarSettings):
+    def __init__(
+        self,
+        calendar_json_file: str,
+        todo_json_file: str,
+        client_id: int,
+        agent_id: int,
+        calendar_settings: AgentCalendarSettings,
+        vectorized: Optional[bool] = None,
+        snapshot: Optional[CalendarSnapshot] = None,
+        writer_socket: Optional[str] = None,
+    ):
         self.calendar_json_file: str = calendar_json_file
         self.todo_json_file: str = todo_json_file
         self.client_id: int = client_id
         self.agent_id: int = agent_id
         self.calendar_settings: AgentCalendarSettings = calendar_settings
-        self.events: List[AgentCalendarEvent] = self._load_calendar_events()
+        # the working hours of each day as UTC epoch bounds, in the agent's timezone
+        self.working_windows: WorkingWindows = get_working_windows(calendar_settings.working_hours, calendar_settings.timezone)
+        # None uses the vectorized slot search for wide searches only, True or False force it on or off
+        self.vectorized: Optional[bool] = vectorized
+        # events are read from the shared snapshot of the calendar file instead when given, the calendar is then read-only
+        self.snapshot: Optional[CalendarSnapshot] = snapshot
+        # changes to a snapshot calendar are sent to the calendar writer listening on this socket
+        self.writer_socket: Optional[str] = writer_socket
+        # every instance of the agent's calendar shares the lock, and changes are shared through the event log
+        self._lock = agent_lock(calendar_json_file, client_id, agent_id)
+        self._event_log = get_event_log(calendar_json_file)
+        # sequence number of the last log entry reflected in the events
+        self._log_seq: int = 0
+        # recurring events are kept apart and expanded only within the windows queries look at
+        self.event_store, self.recurring_events = self._load_calendar_events()
         self.todo_tasks: List[ToDo] = self._load_tasks()
+        self._todo_due_dates: List[date] = [task.due_date for task in self.todo_tasks]
+        # merged busy blocks built once so availability checks bisect instead of scanning every event
+        self.busy_index: IntervalIndex = self._load_busy_index()
+        # bookings per day, for the max_bookings_per_day cap
+        self.booking_counts: DailyBookingCounts = DailyBookingCounts(self.working_windows, self.event_store.starts)
+        # free/busy of the next days, rebuilt in the background after every change, None when disabled
+        self.materialized_free_busy: Optional[MaterializedFreeBusy] = (
+            MaterializedFreeBusy(self.working_windows, self._build_free_busy) if FREE_BUSY_HORIZON_DAYS > 0 else None
+        )
 
-    def _load_calendar_events(self):
+    def _load_calendar_events(self) -> Tuple[EventStore, RecurringEvents]:
+        if self.snapshot is not None:
+            # the snapshot was built with the logged changes applied
+            recurring = self.snapshot.recurring_records(self.client_id, self.agent_id)
+            return self.snapshot.event_store(self.client_id, self.agent_id), RecurringEvents(self.working_windows.timezone, recurring)
         try:
-            with open(self.calendar_json_file, 'r') as f:
-                all_events = json.load(f)
-                # Filter events for the specific client and agent: Mock query to a database
-                # In a real-world scenario, this would be a database query
-                agent_calendar = [event for event in all_events if event['client_id'] == self.client_id and event['agent_id'] == self.agent_id]
-                events = []
-                for calendar in agent_calendar:
-                    # Flatten the events list
-                    events.extend(calendar.get("calendar_events", []))
-
-                # Add ids and convert datetime strings to datetime objects
-                for event in events:
-                    event['dtstamp'] = datetime.fromisoformat(event['dtstamp'])
-                    event['dtstart'] = datetime.fromisoformat(event['dtstart'])
-                    event['dtend'] = datetime.fromisoformat(event['dtend'])
-
-                # Sort events by start time
-                events.sort(key=lambda x: x['dtstart'])
-
-                # use list comprehension to cast all events to AgentCalendarEvent
-                events = [AgentCalendarEvent(**event) for event in events]
-
-                return events
+            # Look up the agent's records in the shared per-agent index of the file: Mock query to a database
+            # In a real-world scenario, this would be a database query
+            # the calendar file and the changes logged since it was written are read together, compaction swaps both
+            with self._event_log.lock:
+                record_index = get_record_index(self.calendar_json_file)
+                agent_calendar = record_index.records(self.client_id, self.agent_id)
+                entries = self._event_log.entries_since(self.client_id, self.agent_id, 0)
+                self._log_seq = self._event_log.last_seq
+            events = []
+            for calendar in agent_calendar:
+                # Flatten the events list
+                events.extend(calendar.get("calendar_events", []))
+            events, recurring = split_recurring(apply_entries_to_events(events, entries))
+            # pre-parsed event times only line up with the events while no logged change touched them
+            bounds = record_index.event_bounds(self.client_id, self.agent_id) if not entries else None
+
+            # keep only the event times in compact, sorted arrays, the records are turned into models on demand
+            return EventStore(events, bounds), RecurringEvents(self.working_windows.timezone, recurring)
         except Exception as e:
             logger.error(f"Error loading calendar events: {e}", exc_info=True)
-            return []
+            return EventStore(), RecurringEvents(self.working_windows.timezone)
+
+    def _load_busy_index(self) -> IntervalIndex:
+        if self.snapshot is not None:
+            return self.snapshot.busy_index(self.client_id, self.agent_id)
+        return IntervalIndex(self.event_store.intervals())
+
+    @property
+    def events(self) -> List[AgentCalendarEvent]:
+        """The agent's events sorted by start time, materialized as AgentCalendarEvent models on every access. Recurring events appear once, at their first occurrence."""
+        with self._lock:
+            self._catch_up()
+            events = self.event_store.events()
+            if self.recurring_events:
+                events.extend(AgentCalendarEvent(**record) for record in self.recurring_events.records())
+                events.sort(key=lambda event: event.dtstart)
+            return events
+
+    def _catch_up(self) -> None:
+        """Applies the changes other instances of the agent's calendar logged since this one last looked. Call with the lock held."""
+        log = self._event_log
+        if log.last_seq == self._log_seq or self.snapshot is not None:
+            # later changes reach snapshot calendars through the next snapshot
+            return
+        if self._log_seq < log.compacted_through:
+            # the missed changes may already be folded into the calendar file and gone from the log
+            self.event_store, self.recurring_events = self._load_calendar_events()
+            self.busy_index = self._load_busy_index()
+            self.booking_counts = DailyBookingCounts(self.working_windows, self.event_store.starts)
+            self._free_busy_changed()
+            return
+        with log.lock:
+            entries = log.entries_since(self.client_id, self.agent_id, self._log_seq)
+            last_seq = log.last_seq
+        for entry in entries:
+            self._apply_change(entry["op"], entry["event"])
+        self._log_seq = last_seq
+
+    def _apply_change(self, op: str, record: dict) -> None:
+        """Applies an upsert or cancel of an event record to the event store and the busy blocks, or to the recurring events, in place."""
+        removed = None if self.recurring_events.remove(record["uid"]) is not None else self.event_store.remove(record["uid"])
+        if removed is not None:
+            start, end, _ = removed
+            self.booking_counts.remove(start)
+            # the busy block the event was part of is rebuilt from the events that remain in it
+            position = self.busy_index.block_containing(start, end)
+            if position >= 0:
+                block_start, block_end = self.busy_index.starts[position], self.busy_index.ends[position]
+                self.busy_index.replace_block(position, self.event_store.between(block_start, block_end))
+        if op == UPSERT and is_recurring(record):
+            self.recurring_events.add(record)
+        elif op == UPSERT:
+            start, end = self.event_store.insert(record)
+            self.busy_index.add(start, end)
+            self.booking_counts.add(start)
+        self._free_busy_changed()
+
+    def _free_busy_changed(self) -> None:
+        if self.materialized_free_busy is not None:
+            self.materialized_free_busy.invalidate()
+
+    def _send_change(self, request: dict) -> AgentCalendarEvent:
+        """Sends a change of a snapshot calendar to the calendar writer, the change shows in the next snapshot."""
+        if not self.writer_socket:
+            # the event log is per process, a change made by one worker would never reach the others
+            raise NotImplementedError("Calendars served from a shared snapshot are read-only without a calendar writer")
+        return send_change(self.writer_socket, {"client_id": self.client_id, "agent_id": self.agent_id, **request})
+
+    def _log_change(self, op: str, record: dict) -> None:
+        """Durably logs a change and then applies it. Call with the lock held."""
+        seq = self._event_log.append(self.client_id, self.agent_id, op, record)
+        self._apply_change(op, record)
+        # entries in between belong to other agents
+        self._log_seq = seq
 
     def _load_tasks(self):
         try:
-            with open(self.todo_json_file, 'r') as f:
-                all_todo_tasks = json.load(f)
-                # Filter tasks for the specific client and agent: Mock query to a database
-                # In a real-world scenario, this would be a database query
-                agent_todos = [task for task in all_todo_tasks if task['client_id'] == self.client_id and task['agent_id'] == self.agent_id]
+            # Look up the agent's tasks in the shared per-agent index of the file: Mock query to a database
+            # In a real-world scenario, this would be a database query
+            agent_todos = get_record_index(self.todo_json_file).records(self.client_id, self.agent_id)
 
-                # Add ids and convert datetime strings to datetime objects
-                for todo in agent_todos:
-                    todo['due_date'] = datetime.fromisoformat(todo['due_date'])
+            # Convert datetime strings to datetime objects, copying the records since the index is shared
+            agent_todos = [{**todo, 'due_date': datetime.fromisoformat(todo['due_date'])} for todo in agent_todos]
 
-                # Sort tasks by due date and priority
-                agent_todos.sort(key=lambda x: (x['due_date'], x['priority']))
+            # Sort tasks by due date and priority
+            agent_todos.sort(key=lambda x: (x['due_date'], priority_rank(x['priority'])))
 
-                # use list comprehension to cast all events to AgentCalendarEvent
-                agent_todos = [ToDo(**task) for task in agent_todos]
+            # use list comprehension to cast all events to AgentCalendarEvent
+            agent_todos = [ToDo(**task) for task in agent_todos]
 
-                return agent_todos
+            return agent_todos
         except Exception as e:
             logger.error(f"Error loading calendar events: {e}", exc_info=True)
             return []
 
     def is_time_available(self, start_time: datetime, end_time: datetime) -> bool:
         """Check if the time slot is available for the agent."""
-        # convert start_time and end_time to time of day check if the start and end times are within the agent's working hours
-        if start_time.time() < self.calendar_settings.working_hours.start or end_time.time() > self.calendar_settings.working_hours.end:
+        start, end = to_epoch_us(start_time), to_epoch_us(end_time)
+        # check if the start and end times are within the agent's working hours on the day of the start time
+        day = self.working_windows.day_of(start)
+        window_start, window_end = self.working_windows.window(day)
+        if start < window_start or end > window_end:
             return False
 
         # check if the start time is before the end time
-        if start_time >= end_time:
+        if start >= end:
             return False
 
-        # Check if the time slot overlaps with any existing events
-        for event in self.events:
-            # check if the event overlaps with the requested time slot
-            if start_time < event.dtend and end_time > event.dtstart:
+        # Check if the day is fully booked or the time slot overlaps with any existing events
+        with self._lock:
+            self._catch_up()
+            bookings = self.booking_counts.count(day)
+            if self.recurring_events:
+                bookings += len(self.recurring_events.starts_between(*self.working_windows.day_bounds(day)))
+            if bookings >= self.calendar_settings.max_bookings_per_day:
                 return False
-
-        return True
+            return self.busy_index.find_overlap(start, end) < 0 and not self.recurring_events.overlaps(start, end)
 
     def find_available_slots(self, time_ranges: List[TimeRange], duration: timedelta, count: int) -> List[datetime]:
-        available = []
-        for interval in time_ranges:
-            current_start = interval.start
+        with self._lock:
+            self._catch_up()
+            view = self.materialized_free_busy.view() if self.materialized_free_busy is not None else None
+            if view is not None and time_ranges and view.covers(*search_window(time_ranges)):
+                # one bisect into the precomputed free intervals per probe
+                return view.find_available_slots(self.working_windows, self.calendar_settings.availability_increment, time_ranges, duration, count)
+            busy_index = self._busy_index_for_search(time_ranges)
+            if self._use_vectorized_search(time_ranges):
+                return find_available_slots_vectorized(
+                    busy_index, self.working_windows, self.calendar_settings.availability_increment, time_ranges, duration, count
+                )
+            # sweep over the busy blocks rather than probing every increment
+            return find_available_slots(busy_index, self.working_windows, self.calendar_settings.availability_increment, time_ranges, duration, count)
+
+    def _busy_index_for_search(self, time_ranges: List[TimeRange]) -> IntervalIndex:
+        # fully booked days are blocked out so the search skips them wholesale
+        if not time_ranges:
+            return self.busy_index
+        window_start, window_end = (to_epoch_us(value) for value in search_window(time_ranges))
+        busy_index = self._with_occurrences(self.busy_index, window_start, window_end)
+        return block_full_days(busy_index, self._full_days(window_start, window_end), window_start, window_end)
+
+    def iter_available_slots(self, time_ranges: List[TimeRange], duration: timedelta, count: int) -> Iterator[datetime]:
+        """Yields the start times of find_available_slots as they are found, searching a copy of the busy blocks in the search window."""
+        if not time_ranges:
+            return iter(())
+        with self._lock:
+            self._catch_up()
+            view = self.materialized_free_busy.view() if self.materialized_free_busy is not None else None
+            if view is not None and view.covers(*search_window(time_ranges)):
+                # the view never changes, later changes build a new one
+                return view.iter_available_slots(self.working_windows, self.calendar_settings.availability_increment, time_ranges, duration, count)
+            window_start, window_end = (to_epoch_us(value) for value in search_window(time_ranges))
+            busy_index = self._blocked_between(window_start, window_end)
+        return iter_available_slots(busy_index, self.working_windows, self.calendar_settings.availability_increment, time_ranges, duration, count)
+
+    def free_busy(self) -> FreeBusyView:
+        """Returns the materialized free/busy view, rebuilding it first if an event changed since it was built."""
+        with self._lock:
+            self._catch_up()
+            view = self.materialized_free_busy.view() if self.materialized_free_busy is not None else None
+            if view is not None:
+                return view
+        if self.materialized_free_busy is not None:
+            return self.materialized_free_busy.refresh()
+        start, end = horizon(self.working_windows)
+        return self._build_free_busy(start, end, 0)
 
-            while current_start + duration <= interval.end and len(available) < count:
-                if self.is_time_available(current_start, current_start + duration):
-                    available.append(current_start)
+    def free_busy_between(self, start_time: datetime, end_time: datetime) -> FreeBusyView:
+        """Returns the materialized free/busy view when it covers the window, a view of just the window otherwise."""
+        with self._lock:
+            self._catch_up()
+            view = self.materialized_free_busy.view() if self.materialized_free_busy is not None else None
+            if view is not None and view.covers(start_time, end_time):
+                return view
+            start, end = to_epoch_us(start_time), to_epoch_us(end_time)
+            busy_index = self._blocked_between(start, end)
+        return FreeBusyView(busy_index, self.working_windows, start, end)
 
-                current_start += timedelta(minutes=self.calendar_settings.availability_increment)
+    def _build_free_busy(self, start: int, end: int, version: int) -> FreeBusyView:
+        with self._lock:
+            self._catch_up()
+            busy_index = self._blocked_between(start, end)
+        return FreeBusyView(busy_index, self.working_windows, start, end, version)
 
-                # if current_start plus duration falls after the calender_settings.working_hours.end, go to beginning of the next date
-                if (current_start + duration).time() > self.calendar_settings.working_hours.end:
-                    current_start = datetime.combine(current_start.date() + timedelta(days=1), self.calendar_settings.working_hours.start).replace(tzinfo=dt.timezone.utc)
+    def _blocked_between(self, start: int, end: int) -> IntervalIndex:
+        """Returns a copy of the busy blocks and fully booked days within [start, end), which outlives the lock. Call with the lock held."""
+        busy_index = self._with_occurrences(self.busy_index.window(start, end), start, end)
+        return block_full_days(busy_index, self._full_days(start, end), start, end)
 
-            if len(available) >= count:
-                break
-        return available
+    def _with_occurrences(self, busy_index: IntervalIndex, start: int, end: int) -> IntervalIndex:
+        """Returns the busy blocks between start and end merged with the occurrences of recurring events, busy_index itself when there are none. Call with the lock held."""
+        if not self.recurring_events:
+            return busy_index
+        return IntervalIndex(chain(busy_index.window(start, end).blocks(), self.recurring_events.between(start, end)))
+
+    def _full_days(self, start: int, end: int) -> Iterable[Tuple[int, int]]:
+        """Yields the bounds of the fully booked days overlapping [start, end), counting occurrences of recurring events. Call with the lock held."""
+        occurrence_starts = ()
+        if self.recurring_events:
+            # the first and last day may reach outside the window
+            days_start = self.working_windows.day_bounds(self.working_windows.day_of(start))[0]
+            days_end = self.working_windows.day_bounds(self.working_windows.day_of(end - 1))[1]
+            occurrence_starts = self.recurring_events.starts_between(days_start, days_end)
+        return self.booking_counts.full_days(start, end, self.calendar_settings.max_bookings_per_day, occurrence_starts)
+
+    def _use_vectorized_search(self, time_ranges: List[TimeRange]) -> bool:
+        if self.vectorized is False or not vectorized_search_supported():
+            return False
+        if self.vectorized:
+            return True
+        increment = timedelta(minutes=self.calendar_settings.availability_increment)
+        candidates = sum(max(time_range.end - time_range.start, timedelta(0)) // increment for time_range in time_ranges)
+        return candidates >= VECTORIZED_MIN_CANDIDATES
 
     def recommend_work_from_todo(self) -> List[str]:
         """
@@ -117,29 +318,82 @@ class JSONAgentCalendar(AgentCalendar):
         Suggest work based on the todo list when the agent is free.
         Add the task description and due date to the suggestion in a conversational manner.
         """
-        suggestions = []
-        today = datetime.now().date()
-        week_start = today + timedelta(days=1)
-        week_end = week_start + timedelta(days=7)
-
-        # Filter tasks that are due in the next week
-        upcoming_tasks = [task for task in self.todo_tasks if task.due_date <= week_end]
-
-        for task in upcoming_tasks:
-            # Check if the agent is free on the day of the task
-            task_date = task.due_date
-            start_of_day = datetime.combine(task_date, self.calendar_settings.working_hours.start).replace(tzinfo=dt.timezone.utc)
-            end_of_day = datetime.combine(task_date, self.calendar_settings.working_hours.end).replace(tzinfo=dt.timezone.utc)
-
-            # find available slots for the task during the day it's due
-            available_slots = self.find_available_slots([TimeRange(start=start_of_day, end=end_of_day)], timedelta(minutes=30), 1)
-            if available_slots:
-                # Suggest the task with available slots
-                for slot in available_slots:
-                    suggestions.append(f"On {task.due_date.strftime('%Y-%m-%d')}, you can work on '{task.task}' at {slot.strftime('%Y-%m-%d %I:%M %p')}.")
-
-            else:
-                # If no slots are available, suggest the task with a general suggestion
-                suggestions.append(f"On {task.due_date.strftime('%Y-%m-%d')}, you have a task: '{task.task}' due. You can work on it during your available time.")
-
-        return suggestions
+        return list(self.iter_work_recommendations())
+
+    def iter_work_recommendations(self) -> Iterator[str]:
+        """
+        Yields the suggestions of recommend_work_from_todo one at a time as they are found.
+
+        The free time of each due date is computed once and the tasks due that day are given distinct slots, High
+        priority tasks first, then Medium and Low.
+        """
+        # Tasks are sorted by due date, so the tasks due in the next week are a prefix of the list
+        upcoming_tasks = self.todo_tasks[: bisect_right(self._todo_due_dates, upcoming_due_date())]
+        return iter_work_recommendations(upcoming_tasks, self.calendar_settings, self._busy_index_between)
+
+    def _busy_index_between(self, start_time: datetime, end_time: datetime) -> IntervalIndex:
+        # the recommendations are consumed lazily, so they get a copy of the day's blocks rather than the live index
+        with self._lock:
+            self._catch_up()
+            start, end = to_epoch_us(start_time), to_epoch_us(end_time)
+            return self._with_occurrences(self.busy_index.window(start, end), start, end)
+
+    def create_event(self, event: AgentCalendarEvent) -> AgentCalendarEvent:
+        """Books an event if the agent is available, updating the busy blocks in place and logging the booking."""
+        if self.snapshot is not None:
+            return self._send_change({"op": CREATE_EVENT, "event": event.model_dump(mode="json")})
+        with self._lock:
+            self._catch_up()
+            if self.event_store.find(event.uid) >= 0 or self.recurring_events.record(event.uid) is not None:
+                raise CalendarConflictError(f"Event {event.uid} already exists")
+            if not self.is_time_available(event.dtstart, event.dtend):
+                raise CalendarConflictError(f"The agent is not available between {event.dtstart} and {event.dtend}")
+            self._log_change(UPSERT, event.model_dump(mode="json"))
+        return event
+
+    def update_event(
+        self, uid: str, start_time: datetime, end_time: datetime, summary: Optional[str] = None, description: Optional[str] = None, location: Optional[str] = None
+    ) -> AgentCalendarEvent:
+        """Moves an event if the agent is available at the new time, updating the busy blocks in place and logging the change."""
+        if self.snapshot is not None:
+            change = {"op": UPDATE_EVENT, "uid": uid, "start_time": start_time.isoformat(), "end_time": end_time.isoformat()}
+            return self._send_change({**change, "summary": summary, "description": description, "location": location})
+        with self._lock:
+            self._catch_up()
+            current = self._find_record(uid)
+            changes = {"dtstart": start_time, "dtend": end_time, "dtstamp": datetime.now(timezone.utc)}
+            for field, value in (("summary", summary), ("description", description), ("location", location)):
+                if value is not None:
+                    changes[field] = value
+            event = AgentCalendarEvent(**{**current, **changes})
+
+            # the event must not conflict with itself, so check the new time with it taken out
+            self._apply_change(CANCEL, current)
+            try:
+                if not self.is_time_available(start_time, end_time):
+                    raise CalendarConflictError(f"The agent is not available between {start_time} and {end_time}")
+                self._log_change(UPSERT, event.model_dump(mode="json"))
+            except Exception:
+                self._apply_change(UPSERT, current)
+                raise
+        return event
+
+    def cancel_event(self, uid: str) -> AgentCalendarEvent:
+        """Removes an event, rebuilding only the busy block it was part of and logging the cancellation."""
+        if self.snapshot is not None:
+            return self._send_change({"op": CANCEL_EVENT, "uid": uid})
+        with self._lock:
+            self._catch_up()
+            record = self._find_record(uid)
+            self._log_change(CANCEL, record)
+        return AgentCalendarEvent(**record)
+
+    def _find_record(self, uid: str) -> dict:
+        """Returns the record of a single or recurring event. Call with the lock held."""
+        position = self.event_store.find(uid)
+        if position >= 0:
+            return self.event_store.record(position)
+        record = self.recurring_events.record(uid)
+        if record is None:
+            raise EventNotFoundError(f"Event {uid} not found")
+        return record
@@ -0,0 +1,234 @@
+# This module indexes the JSON data files by (client_id, agent_id).
+# The files are top-level arrays of records for every client and agent. Each file is read once, the records are
+# grouped per agent and the index is reused for every agent until the file changes on disk.
+#
+# Large files are indexed in streaming mode: the array is decoded one element at a time and only the byte range of
+# each record is kept, so looking up an agent reads and parses just that agent's records.
+#
+# With the parsed cache enabled, the index is read from the file's parsed cache instead, along with the epoch bounds of
+# every agent's calendar events.
+
+import codecs
+import json
+import os
+import re
+import threading
+from array import array
+from collections import defaultdict
+from datetime import datetime
+from functools import partial
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from agent_calendar.interval_index import to_epoch_us
+from agent_calendar.parsed_cache import PARSED_CACHE, load_parsed
+from agent_calendar.recurrence import is_recurring
+
+# smaller files keep every agent's decoded records in memory, larger ones only their byte ranges
+STREAMING_THRESHOLD_BYTES = int(os.environ.get("HW_SCHEDULING_JSON_STREAMING_THRESHOLD_BYTES", str(4 * 1024 * 1024)))
+STREAMING_CHUNK_BYTES = 1024 * 1024
+_JSON_WHITESPACE = re.compile(r"[ \t\r\n]*")
+_JSON_SEPARATORS = re.compile(r"[ \t\r\n,]*")
+
+AgentKey = Tuple[int, int]
+
+
+def iter_json_array(file_path: str, chunk_size: int = STREAMING_CHUNK_BYTES) -> Iterator[Tuple[int, int, dict]]:
+    """
+    Incrementally decodes a file holding a top-level JSON array of objects.
+
+    Args:
+        file_path (str): The path of the JSON file.
+        chunk_size (int): The number of bytes read from the file at a time.
+
+    Yields:
+        Tuple[int, int, dict]: The byte offset and byte length of each object in the file along with the decoded object.
+
+    Raises:
+        ValueError: If the file is not a JSON array of objects.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    with open(file_path, "rb") as file:
+        buffer = ""
+        # the next character of buffer to decode, and its byte offset in the file
+        position = 0
+        offset = 0
+        eof = False
+
+        def fill(size: int) -> None:
+            # the decoded part of the buffer is only dropped here, so each character is copied about once
+            nonlocal buffer, position, eof
+            chunk = file.read(size)
+            eof = not chunk
+            buffer = buffer[position:] + text_decoder.decode(chunk, final=eof)
+            position = 0
+
+        def skip(pattern: re.Pattern) -> None:
+            # the skipped characters are ASCII, so the number of characters equals the number of bytes
+            nonlocal position, offset
+            while True:
+                end = pattern.match(buffer, position).end()
+                offset += end - position
+                position = end
+                if position < len(buffer) or eof:
+                    return
+                fill(chunk_size)
+
+        fill(chunk_size)
+        skip(_JSON_WHITESPACE)
+        if not buffer.startswith("[", position):
+            raise ValueError(f"Expected a JSON array in {file_path}")
+        position += 1
+        offset += 1
+
+        while True:
+            skip(_JSON_SEPARATORS)
+            if position >= len(buffer):
+                raise ValueError(f"Unterminated JSON array in {file_path}")
+            if buffer[position] == "]":
+                return
+            if buffer[position] != "{":
+                raise ValueError(f"Expected a JSON object at byte {offset} of {file_path}")
+
+            while True:
+                try:
+                    record, end = decoder.raw_decode(buffer, position)
+                    break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    # the object continues past the buffer, read at least as much again
+                    fill(max(chunk_size, len(buffer) - position))
+
+            length = len(buffer[position:end].encode("utf-8"))
+            yield offset, length, record
+            offset += length
+            position = end
+
+
+class JSONRecordIndex:
+    """
+    Records of a JSON data file grouped by (client_id, agent_id).
+
+    In the default mode the decoded records are kept in memory. In streaming mode only the byte range of each record
+    is kept and records are decoded from the file on lookup.
+    """
+
+    def __init__(self, file_path: str, streaming: Optional[bool] = None, parsed_cache: Optional[bool] = None):
+        self.file_path: str = file_path
+        if streaming is None:
+            streaming = os.path.getsize(file_path) > STREAMING_THRESHOLD_BYTES
+        self.streaming: bool = streaming
+        if parsed_cache is None:
+            parsed_cache = PARSED_CACHE
+        self._records: Dict[AgentKey, List[dict]] = {}
+        self._ranges: Dict[AgentKey, List[Tuple[int, int]]] = {}
+        # (client_id, agent_id) -> the packed starts and ends of the agent's single events, only with the parsed cache
+        self._event_bounds: Dict[AgentKey, bytes] = {}
+
+        # the bounds are only worth computing up front when they are cached for later loads
+        if streaming:
+            self._ranges, self._event_bounds = load_parsed(file_path, partial(_scan_file, event_bounds=parsed_cache), parsed_cache)
+        else:
+            self._records, self._event_bounds = load_parsed(file_path, partial(_read_file, event_bounds=parsed_cache), parsed_cache)
+
+    def records(self, client_id: int, agent_id: int) -> List[dict]:
+        """
+        Returns the records for the given client and agent in file order.
+
+        The returned records may be shared with other callers and must not be mutated.
+        """
+        key = (client_id, agent_id)
+        if not self.streaming:
+            return self._records.get(key, [])
+
+        records = []
+        with open(self.file_path, "rb") as f:
+            for offset, length in self._ranges.get(key, []):
+                f.seek(offset)
+                records.append(json.loads(f.read(length)))
+        return records
+
+    def keys(self) -> List[AgentKey]:
+        """Returns the (client_id, agent_id) pairs that have records in the file."""
+        return list(self._ranges if self.streaming else self._records)
+
+    def event_bounds(self, client_id: int, agent_id: int) -> Optional[Tuple[array, array]]:
+        """
+        Returns the epoch microsecond starts and ends of the agent's calendar events, in file order and leaving out
+        recurring events, or None when the index was not built with them.
+        """
+        packed = self._event_bounds.get((client_id, agent_id))
+        if packed is None:
+            return None
+        bounds = array("q")
+        bounds.frombytes(packed)
+        middle = len(bounds) // 2
+        return bounds[:middle], bounds[middle:]
+
+
+def _read_file(file_path: str, event_bounds: bool = False) -> Tuple[Dict[AgentKey, List[dict]], Dict[AgentKey, bytes]]:
+    with open(file_path, "r", encoding="utf-8") as f:
+        all_records = json.load(f)
+    records = defaultdict(list)
+    for record in all_records:
+        records[(record["client_id"], record["agent_id"])].append(record)
+    return dict(records), _pack_event_bounds(records) if event_bounds else {}
+
+
+def _scan_file(file_path: str, event_bounds: bool = False) -> Tuple[Dict[AgentKey, List[Tuple[int, int]]], Dict[AgentKey, bytes]]:
+    ranges = defaultdict(list)
+    bounds = defaultdict(list)
+    for offset, length, record in iter_json_array(file_path):
+        key = (record["client_id"], record["agent_id"])
+        ranges[key].append((offset, length))
+        if event_bounds:
+            # the records themselves are not kept, so their bounds are packed as they are scanned
+            bounds[key].append(_pack_event_bounds({key: [record]})[key])
+    return dict(ranges), {key: _join_packed(packed) for key, packed in bounds.items()}
+
+
+def _pack_event_bounds(records: Dict[AgentKey, List[dict]]) -> Dict[AgentKey, bytes]:
+    packed = {}
+    for key, agent_records in records.items():
+        events = [event for record in agent_records for event in record.get("calendar_events", []) if not is_recurring(event)]
+        starts = array("q", (to_epoch_us(datetime.fromisoformat(event["dtstart"])) for event in events))
+        ends = array("q", (to_epoch_us(datetime.fromisoformat(event["dtend"])) for event in events))
+        packed[key] = (starts + ends).tobytes()
+    return packed
+
+
+def _join_packed(packed: List[bytes]) -> bytes:
+    starts, ends = array("q"), array("q")
+    for part in packed:
+        bounds = array("q")
+        bounds.frombytes(part)
+        starts.extend(bounds[:len(bounds) // 2])
+        ends.extend(bounds[len(bounds) // 2:])
+    return (starts + ends).tobytes()
+
+
+_indexes: Dict[str, Tuple[Tuple[int, int], JSONRecordIndex]] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_record_index(file_path: str) -> JSONRecordIndex:
+    """
+    Returns the shared index for file_path, rebuilding it when the file's mtime or size changes.
+
+    Args:
+        file_path (str): The path of the JSON data file.
+
+    Returns:
+        JSONRecordIndex: The index of the file's records.
+    """
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _indexes_lock:
+        cached = _indexes.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        index = JSONRecordIndex(path)
+        _indexes[path] = (stamp, index)
+        return index
@@ -0,0 +1,165 @@
+# This module collects the service's metrics and renders them in the Prometheus text exposition format.
+# Metrics are plain in-process counters and histograms, so recording one costs a lock and a few additions and the
+# service does not depend on a metrics client library. The /metrics route serves render().
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+# latency buckets in seconds, from 100 microseconds to 10 seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# buckets for the amount of work done by one query
+COUNT_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """A monotonically increasing count, one per combination of label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        with self._lock:
+            values = list(self._values.items())
+        for labelvalues, value in values:
+            yield self.name + "_total", _format_labels(self.labelnames, labelvalues), value
+
+
+class Histogram:
+    """Counts observations into cumulative buckets, one set of buckets per combination of label values."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+        self.buckets: Tuple[float, ...] = tuple(buckets)
+        # label values -> [count per bucket plus one for +Inf, sum]
+        self._values: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labelvalues)
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1) + [0.0]
+                self._values[labelvalues] = counts
+            counts[position] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, *labelvalues: str) -> Iterator[None]:
+        """Observes the time spent in the with block, in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labelvalues)
+
+    def count(self, *labelvalues: str) -> int:
+        with self._lock:
+            counts = self._values.get(labelvalues)
+            return sum(counts[:-1]) if counts else 0
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        with self._lock:
+            values = [(labelvalues, list(counts)) for labelvalues, counts in self._values.items()]
+        for labelvalues, counts in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                yield self.name + "_bucket", _format_labels(self.labelnames + ("le",), labelvalues + (_format_value(bound),)), cumulative
+            yield self.name + "_sum", _format_labels(self.labelnames, labelvalues), counts[-1]
+            yield self.name + "_count", _format_labels(self.labelnames, labelvalues), cumulative
+
+
+class GaugeCallback:
+    """Gauges read from a callback when the metrics are rendered, for values other modules already keep."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], callback: Callable[[], Dict[LabelValues, float]]):
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+        self.callback = callback
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for labelvalues, value in self.callback().items():
+            yield self.name, _format_labels(self.labelnames, labelvalues), value
+
+
+_registry: List = []
+
+
+def register(metric):
+    """Adds a metric to the ones rendered by render and returns it."""
+    _registry.append(metric)
+    return metric
+
+
+def render() -> str:
+    """Renders every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{labels} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_DURATION = register(Histogram("hw_scheduling_request_duration_seconds", "Latency of HTTP requests.", ["method", "route", "status"]))
+OPERATION_DURATION = register(
+    Histogram("hw_scheduling_operation_duration_seconds", "Time spent in settings lookups, calendar loads and AgentCalendar methods.", ["operation"])
+)
+SLOTS_PROBED = register(Histogram("hw_scheduling_slots_probed", "Candidate start times examined by one slot search.", ["search"], buckets=COUNT_BUCKETS))
+BUSY_BLOCKS_SCANNED = register(
+    Histogram("hw_scheduling_busy_blocks_scanned", "Busy blocks compared against candidates by one slot search.", ["search"], buckets=COUNT_BUCKETS)
+)
+SLOW_REQUESTS = register(Counter("hw_scheduling_slow_requests", "Requests slower than the profiling threshold.", ["route"]))
+
+
+@contextmanager
+def timed(operation: str) -> Iterator[None]:
+    """Records the time spent in the with block as an operation of hw_scheduling_operation_duration_seconds."""
+    with OPERATION_DURATION.time(operation):
+        yield
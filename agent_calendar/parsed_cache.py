@@ -0,0 +1,78 @@
+# This module keeps pre-parsed copies of the JSON data files so that cold starts skip decoding JSON and parsing
+# datetime strings.
+# With HW_SCHEDULING_PARSED_CACHE=1, whatever a loader builds from a data file is also written next to it in Python's
+# binary marshal format, e.g. data/ics_data.json.parsed, stamped with the mtime and size of the JSON file. Later loads,
+# in this or any other process, read the cache instead while the stamp still matches, and rebuild it once the JSON file
+# changes. Calendar files are cached with the epoch microsecond bounds of their events, so loading a calendar does not
+# parse the event times either.
+#
+# marshal's format is only stable within one Python version, so caches also record the interpreter that wrote them and
+# are rebuilt by any other.
+#
+# Layout:
+#     header         magic, the writing interpreter's cache tag and marshal version, mtime_ns and size of the JSON
+#                    file the cache was built from
+#     payload        the marshalled value, only dicts, lists, tuples, bytes, strings and numbers
+
+import logging
+import marshal
+import os
+import struct
+import sys
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+PARSED_CACHE = os.environ.get("HW_SCHEDULING_PARSED_CACHE", "0") == "1"
+
+MAGIC = b"HWPARS02"
+# e.g. cpython-311-4, caches written by another interpreter are rebuilt
+PYTHON_TAG = f"{sys.implementation.cache_tag}-{marshal.version}".encode("ascii")
+_HEADER = struct.Struct("=8s24sqq")
+
+
+def cache_file_of(file_path: str) -> str:
+    """Returns the path of the parsed cache of a data file."""
+    return f"{file_path}.parsed"
+
+
+def load_parsed(file_path: str, parse: Callable[[str], Any], enabled: Optional[bool] = None) -> Any:
+    """
+    Returns parse(file_path), read from the file's parsed cache when the cache was built from the current file.
+
+    Args:
+        file_path (str): The path of the JSON data file.
+        parse (Callable[[str], Any]): Builds the value from the file, it must only return types marshal supports.
+        enabled (Optional[bool]): Whether to use the cache, HW_SCHEDULING_PARSED_CACHE by default.
+
+    Returns:
+        Any: The parsed value.
+    """
+    if not (PARSED_CACHE if enabled is None else enabled):
+        return parse(file_path)
+    stat = os.stat(file_path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cache_file = cache_file_of(file_path)
+    try:
+        with open(cache_file, "rb") as f:
+            data = f.read()
+        magic, python_tag, mtime_ns, size = _HEADER.unpack_from(data)
+        if magic == MAGIC and python_tag.rstrip(b"\0") == PYTHON_TAG and (mtime_ns, size) == stamp:
+            return marshal.loads(memoryview(data)[_HEADER.size:])
+    except FileNotFoundError:
+        pass
+    except (OSError, struct.error, ValueError, EOFError, TypeError) as e:
+        logger.warning(f"Ignoring unreadable parsed cache {cache_file}: {e}")
+
+    value = parse(file_path)
+    try:
+        # written under a name of its own and renamed, readers never see a partial cache
+        temporary_file = f"{cache_file}.{os.getpid()}.building"
+        with open(temporary_file, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, PYTHON_TAG, *stamp))
+            f.write(marshal.dumps(value))
+        os.replace(temporary_file, cache_file)
+    except (OSError, ValueError) as e:
+        # a read-only data directory only costs the speedup
+        logger.warning(f"Could not write parsed cache {cache_file}: {e}")
+    return value
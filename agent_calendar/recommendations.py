@@ -0,0 +1,66 @@
+# This module turns an agent's upcoming todo tasks into work suggestions.
+# It is shared by the AgentCalendar backends, which only differ in how they find the tasks and the busy time.
+
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from typing import Callable, Iterable, Iterator
+
+from agent_calendar.interval_index import IntervalIndex
+from agent_calendar.slot_search import find_distinct_slots
+from agent_calendar.working_windows import day_number, get_working_windows
+from models import AgentCalendarSettings, ToDo
+
+WORK_SLOT_DURATION = timedelta(minutes=30)
+# tasks due the same day get slots in this order, unknown priorities last
+PRIORITY_RANKS = {"High": 0, "Medium": 1, "Low": 2}
+# the same order as an SQL expression over a priority column
+PRIORITY_RANK_SQL = "CASE priority " + " ".join(f"WHEN '{priority}' THEN {rank}" for priority, rank in PRIORITY_RANKS.items()) + f" ELSE {len(PRIORITY_RANKS)} END"
+
+
+def priority_rank(priority: str) -> int:
+    """Returns the sort rank of a task priority, lower ranks first."""
+    return PRIORITY_RANKS.get(priority, len(PRIORITY_RANKS))
+
+
+def upcoming_due_date() -> date:
+    """Returns the last due date of the tasks that are suggested, the end of the coming week."""
+    today = datetime.now().date()
+    week_start = today + timedelta(days=1)
+    return week_start + timedelta(days=7)
+
+
+def iter_work_recommendations(
+    tasks: Iterable[ToDo], calendar_settings: AgentCalendarSettings, busy_index_for: Callable[[datetime, datetime], IntervalIndex]
+) -> Iterator[str]:
+    """
+    Yields a suggestion for each task, in order, as soon as it is found.
+
+    The free time of each due date is computed once and the tasks due that day are given distinct slots, in order.
+
+    Args:
+        tasks (Iterable[ToDo]): The tasks to suggest, sorted by due date and then priority_rank.
+        calendar_settings (AgentCalendarSettings): The agent's calendar settings.
+        busy_index_for (Callable[[datetime, datetime], IntervalIndex]): Returns the agent's busy blocks covering a window.
+
+    Yields:
+        str: A conversational suggestion of when to work on each task.
+    """
+    working_windows = get_working_windows(calendar_settings.working_hours, calendar_settings.timezone)
+    increment = timedelta(minutes=calendar_settings.availability_increment)
+
+    for task_date, day_tasks in groupby(tasks, key=lambda task: task.due_date):
+        day_tasks = list(day_tasks)
+        # the working hours of the due date in the agent's timezone
+        start_of_day, end_of_day = (working_windows.local_time(bound) for bound in working_windows.window(day_number(task_date)))
+
+        # find one free slot per task during the day they're due
+        available_slots = find_distinct_slots(
+            busy_index_for(start_of_day, end_of_day), start_of_day, end_of_day, increment, WORK_SLOT_DURATION, len(day_tasks), working_windows.timezone
+        )
+        for position, task in enumerate(day_tasks):
+            if position < len(available_slots):
+                # Suggest the task with available slots
+                yield f"On {task.due_date.strftime('%Y-%m-%d')}, you can work on '{task.task}' at {available_slots[position].strftime('%Y-%m-%d %I:%M %p')}."
+            else:
+                # If no slots are available, suggest the task with a general suggestion
+                yield f"On {task.due_date.strftime('%Y-%m-%d')}, you have a task: '{task.task}' due. You can work on it during your available time."
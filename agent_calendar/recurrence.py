@@ -0,0 +1,321 @@
+# This module expands recurring events (RFC 5545 RRULE and EXDATE) lazily, only within the windows queries look at.
+# A recurring event is kept as its first occurrence and its rule. Occurrences repeat the wall clock start time of the
+# first one in the agent's timezone, so a weekly 9:00 meeting stays at 9:00 across DST changes, and expanding a
+# window jumps straight to the rule's periods around it instead of stepping from the first occurrence.
+#
+# An agent's occurrences are expanded per week of epoch time and the expanded weeks are memoized, the least recently
+# used ones are evicted once HW_SCHEDULING_RECURRENCE_CACHED_WEEKS weeks are held.
+#
+# Supported rule parts: FREQ=DAILY|WEEKLY|MONTHLY|YEARLY, INTERVAL, COUNT, UNTIL, and BYDAY with plain weekdays for
+# weekly rules. Monthly and yearly rules repeat the day of the month of the first occurrence and skip months that do
+# not have it.
+
+import calendar
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from agent_calendar.interval_index import to_epoch_us
+from agent_calendar.working_windows import DAY_US
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_WEEKS = int(os.environ.get("HW_SCHEDULING_RECURRENCE_CACHED_WEEKS", "64"))
+WEEK_US = 7 * DAY_US
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+# no rule has more occurrences than there are days in the supported date range, larger COUNTs are capped to it
+MAX_COUNT = (date.max - date.min).days + 1
+# the Gregorian calendar, and so which months have a given day, repeats every 400 years
+CALENDAR_CYCLE_MONTHS = 400 * 12
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+
+class RecurrenceRule(NamedTuple):
+    frequency: str
+    interval: int
+    count: Optional[int]
+    # the UNTIL value as written, resolved against the event's timezone by RecurringEvent
+    until: Optional[str]
+    # weekday numbers, Monday is 0
+    weekdays: Tuple[int, ...]
+
+
+@lru_cache(maxsize=1024)
+def parse_rrule(rrule: str) -> RecurrenceRule:
+    """
+    Parses the supported subset of an RFC 5545 RRULE value, e.g. "FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10".
+
+    Raises:
+        ValueError: If the rule is malformed or uses parts that are not supported.
+    """
+    parts = {}
+    for part in rrule.strip().removeprefix("RRULE:").split(";"):
+        name, separator, value = part.partition("=")
+        if not separator:
+            raise ValueError(f"Malformed RRULE part {part!r}")
+        parts[name.upper()] = value.upper()
+
+    frequency = parts.pop("FREQ", None)
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Unsupported RRULE frequency {frequency!r}")
+    interval = int(parts.pop("INTERVAL", "1"))
+    count = min(int(parts.pop("COUNT")), MAX_COUNT) if "COUNT" in parts else None
+    until = parts.pop("UNTIL", None)
+    if interval < 1 or (count is not None and count < 1):
+        raise ValueError(f"Invalid RRULE {rrule!r}")
+    if count is not None and until is not None:
+        raise ValueError("RRULE must not have both COUNT and UNTIL")
+    weekdays = ()
+    if "BYDAY" in parts:
+        if frequency != "WEEKLY":
+            raise ValueError("BYDAY is only supported in weekly rules")
+        try:
+            weekdays = tuple(sorted({WEEKDAYS.index(day) for day in parts.pop("BYDAY").split(",")}))
+        except ValueError:
+            raise ValueError(f"Unsupported BYDAY in RRULE {rrule!r}")
+    if parts.pop("WKST", "MO") != "MO" or parts:
+        raise ValueError(f"Unsupported RRULE parts in {rrule!r}")
+    return RecurrenceRule(frequency, interval, count, until, weekdays)
+
+
+class RecurringEvent:
+    """One recurring event of an agent, expanded on demand."""
+
+    __slots__ = ("record", "rule", "timezone", "first", "start_time", "duration", "exdates", "_last_date", "_until")
+
+    def __init__(self, record: dict, tz: ZoneInfo):
+        self.record: dict = record
+        self.rule: RecurrenceRule = parse_rrule(record["rrule"])
+        self.timezone: ZoneInfo = tz
+        dtstart = datetime.fromisoformat(record["dtstart"])
+        if dtstart.tzinfo is None:
+            dtstart = dtstart.replace(tzinfo=timezone.utc)
+        local_start = dtstart.astimezone(tz)
+        self.first: date = local_start.date()
+        self.start_time = local_start.timetz().replace(tzinfo=None)
+        self.duration: int = to_epoch_us(datetime.fromisoformat(record["dtend"])) - to_epoch_us(dtstart)
+        self.exdates = frozenset(to_epoch_us(datetime.fromisoformat(value)) for value in record.get("exdate") or ())
+        # the date of the last occurrence with COUNT, and the last start allowed by UNTIL, worked out on first use
+        self._last_date: Optional[date] = None
+        self._until: Optional[int] = None
+
+    def occurrences(self, start: int, end: int) -> Iterator[Tuple[int, int]]:
+        """Yields the (start, end) epoch microsecond bounds of the occurrences overlapping or touching [start, end]."""
+        # local dates whose occurrences can reach the window, with a day of slack for timezone offsets
+        first_date = self._local_date(start - self.duration) - timedelta(days=1)
+        last_date = self._local_date(end) + timedelta(days=1)
+        last_date = min(last_date, self._count_last_date()) if self.rule.count is not None else last_date
+        until = self._until_us()
+        for occurrence_date in self._dates(max(first_date, self.first), last_date):
+            occurrence_start = to_epoch_us(datetime.combine(occurrence_date, self.start_time, tzinfo=self.timezone))
+            if until is not None and occurrence_start > until:
+                return
+            occurrence_end = occurrence_start + self.duration
+            if occurrence_start <= end and occurrence_end >= start and occurrence_start not in self.exdates:
+                yield occurrence_start, occurrence_end
+
+    def _local_date(self, instant: int) -> date:
+        return (datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(microseconds=instant)).astimezone(self.timezone).date()
+
+    def _dates(self, first_date: date, last_date: date) -> Iterator[date]:
+        """Yields the dates of the rule between first_date and last_date, inclusive, in order."""
+        rule = self.rule
+        if rule.frequency == "DAILY":
+            period = (first_date - self.first).days // rule.interval
+            occurrence_date = self.first + timedelta(days=period * rule.interval)
+            while occurrence_date <= last_date:
+                if occurrence_date >= first_date:
+                    yield occurrence_date
+                occurrence_date += timedelta(days=rule.interval)
+        elif rule.frequency == "WEEKLY":
+            weekdays = rule.weekdays or (self.first.weekday(),)
+            first_week = self.first - timedelta(days=self.first.weekday())
+            week = first_week + timedelta(weeks=((first_date - first_week).days // 7 // rule.interval) * rule.interval)
+            while week <= last_date:
+                for weekday in weekdays:
+                    occurrence_date = week + timedelta(days=weekday)
+                    if occurrence_date >= self.first and first_date <= occurrence_date <= last_date:
+                        yield occurrence_date
+                week += timedelta(weeks=rule.interval)
+        else:
+            step = rule.interval * (12 if rule.frequency == "YEARLY" else 1)
+            first_month = self.first.year * 12 + self.first.month - 1
+            month = first_month + ((first_date.year * 12 + first_date.month - 1 - first_month) // step) * step
+            while month <= last_date.year * 12 + last_date.month - 1:
+                try:
+                    occurrence_date = date(month // 12, month % 12 + 1, self.first.day)
+                except ValueError:
+                    # e.g. the 31st in a month of 30 days, RFC 5545 skips those
+                    occurrence_date = None
+                if occurrence_date is not None and first_date <= occurrence_date <= last_date:
+                    yield occurrence_date
+                month += step
+
+    def _count_last_date(self) -> date:
+        if self._last_date is None:
+            try:
+                self._last_date = self._nth_date(self.rule.count)
+            except OverflowError:
+                # COUNT runs past the supported date range, the rule does not end before it does
+                self._last_date = date.max
+        return self._last_date
+
+    def _nth_date(self, count: int) -> date:
+        """Returns the date of the count-th occurrence, counting the first as 1, worked out without stepping through them."""
+        rule = self.rule
+        if rule.frequency == "DAILY":
+            return self.first + timedelta(days=(count - 1) * rule.interval)
+        if rule.frequency == "WEEKLY":
+            weekdays = rule.weekdays or (self.first.weekday(),)
+            first_week = self.first - timedelta(days=self.first.weekday())
+            in_first_week = [weekday for weekday in weekdays if weekday >= self.first.weekday()]
+            if count <= len(in_first_week):
+                return first_week + timedelta(days=in_first_week[count - 1])
+            weeks, position = divmod(count - len(in_first_week) - 1, len(weekdays))
+            return first_week + timedelta(weeks=(weeks + 1) * rule.interval, days=weekdays[position])
+        # months without the day are skipped. Which ones repeats with the calendar, so the occurrences of one cycle
+        # of steps are counted and whole cycles are stepped over. The first occurrence is one of them.
+        step = rule.interval * (12 if rule.frequency == "YEARLY" else 1)
+        first_month = self.first.year * 12 + self.first.month - 1
+        cycle = CALENDAR_CYCLE_MONTHS // math.gcd(step, CALENDAR_CYCLE_MONTHS)
+        in_cycle = [number for number in range(cycle) if _has_day(first_month + number * step, self.first.day)]
+        cycles, position = divmod(count - 1, len(in_cycle))
+        month = first_month + (cycles * cycle + in_cycle[position]) * step
+        if month // 12 > date.max.year:
+            raise OverflowError("date value out of range")
+        return date(month // 12, month % 12 + 1, self.first.day)
+
+    def _until_us(self) -> Optional[int]:
+        until = self.rule.until
+        if until is None:
+            return None
+        if self._until is None:
+            if "T" not in until:
+                # a date includes the occurrences starting on it
+                value = datetime.combine(datetime.strptime(until, "%Y%m%d").date() + timedelta(days=1), datetime.min.time(), tzinfo=self.timezone)
+                self._until = to_epoch_us(value) - 1
+            elif until.endswith("Z"):
+                self._until = to_epoch_us(datetime.strptime(until, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc))
+            else:
+                self._until = to_epoch_us(datetime.strptime(until, "%Y%m%dT%H%M%S").replace(tzinfo=self.timezone))
+        return self._until
+
+
+def _has_day(month: int, day: int) -> bool:
+    """Checks if a month, counted from January of year 0, has the given day of the month."""
+    # a year of the same 400 year cycle within the range date supports
+    return day <= calendar.monthrange(2000 + month // 12 % 400, month % 12 + 1)[1]
+
+
+class RecurringEvents:
+    """
+    An agent's recurring events with memoized expansions.
+
+    Expanded weeks are dropped whenever a recurring event is added or removed.
+    """
+
+    def __init__(self, tz: ZoneInfo, records: Iterable[dict] = (), max_cached_weeks: int = MAX_CACHED_WEEKS):
+        self.timezone: ZoneInfo = tz
+        self.max_cached_weeks: int = max_cached_weeks
+        self._events: Dict[str, RecurringEvent] = {}
+        # week number -> the occurrences overlapping or touching that week, sorted
+        self._weeks: "OrderedDict[int, List[Tuple[int, int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        for record in records:
+            self.add(record)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def add(self, record: dict) -> None:
+        """Adds or replaces the recurring event with the record's uid."""
+        event = RecurringEvent(record, self.timezone)
+        with self._lock:
+            self._events[record["uid"]] = event
+            self._weeks.clear()
+
+    def remove(self, uid: str) -> Optional[dict]:
+        """Removes the recurring event with uid and returns its record, or None if there is no such event."""
+        with self._lock:
+            event = self._events.pop(uid, None)
+            if event is None:
+                return None
+            self._weeks.clear()
+            return event.record
+
+    def record(self, uid: str) -> Optional[dict]:
+        """Returns the record of the recurring event with uid, or None if there is no such event."""
+        event = self._events.get(uid)
+        return event.record if event is not None else None
+
+    def records(self) -> List[dict]:
+        return [event.record for event in self._events.values()]
+
+    def between(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """Returns the occurrences overlapping or touching [start, end], possibly with duplicates."""
+        return [(occurrence_start, occurrence_end) for week in self._weeks_between(start, end) for occurrence_start, occurrence_end in week if occurrence_start <= end and occurrence_end >= start]
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """Checks if an occurrence overlaps [start, end), with the same rules as IntervalIndex.find_overlap."""
+        return any(occurrence_start < end and occurrence_end > start for occurrence_start, occurrence_end in self.between(start, end))
+
+    def starts_between(self, start: int, end: int) -> List[int]:
+        """Returns the start of each occurrence that starts within [start, end)."""
+        starts = []
+        first_week = start // WEEK_US
+        for week_number, week in enumerate(self._weeks_between(start, end), first_week):
+            # an occurrence is listed in every week it reaches, count it in the week it starts in
+            low, high = max(start, week_number * WEEK_US), min(end, (week_number + 1) * WEEK_US)
+            starts.extend(occurrence_start for occurrence_start, _ in week if low <= occurrence_start < high)
+        return starts
+
+    def _weeks_between(self, start: int, end: int) -> List[List[Tuple[int, int]]]:
+        return [self._week(week_number) for week_number in range(start // WEEK_US, end // WEEK_US + 1)]
+
+    def _week(self, week_number: int) -> List[Tuple[int, int]]:
+        with self._lock:
+            occurrences = self._weeks.get(week_number)
+            if occurrences is not None:
+                self._weeks.move_to_end(week_number)
+                return occurrences
+            events = list(self._events.values())
+        week_start = week_number * WEEK_US
+        occurrences = sorted(occurrence for event in events for occurrence in event.occurrences(week_start, week_start + WEEK_US))
+        with self._lock:
+            self._weeks[week_number] = occurrences
+            while len(self._weeks) > self.max_cached_weeks:
+                self._weeks.popitem(last=False)
+        return occurrences
+
+
+def is_recurring(record: dict) -> bool:
+    """
+    Checks if an event record has a recurrence rule that can be expanded.
+
+    Records with a rule that cannot be expanded are logged and treated as single events, so at least their first
+    occurrence is busy.
+    """
+    if not record.get("rrule"):
+        return False
+    try:
+        parse_rrule(record["rrule"])
+        return True
+    except ValueError as e:
+        logger.warning(f"Treating event {record.get('uid')} as a single event: {e}")
+        return False
+
+
+def split_recurring(records: Iterable[dict]) -> Tuple[List[dict], List[dict]]:
+    """Separates an agent's event records into single events and recurring events."""
+    single = []
+    recurring = []
+    for record in records:
+        (recurring if is_recurring(record) else single).append(record)
+    return single, recurring
@@ -0,0 +1,110 @@
+# This module provides an optional sampling profiler for slow requests.
+# While requests are in flight a background thread samples the stack of every thread at a fixed interval. When a
+# request turns out slower than the threshold, the samples taken during it are aggregated and the hottest stacks are
+# logged, which shows whether the time went to loading calendars or to searching them.
+#
+# Enable it by setting HW_SCHEDULING_PROFILE_SLOW_REQUESTS_MS to the threshold in milliseconds.
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# requests slower than this are profiled, 0 disables the profiler
+SLOW_REQUEST_THRESHOLD_MS = float(os.environ.get("HW_SCHEDULING_PROFILE_SLOW_REQUESTS_MS", "0"))
+SAMPLE_INTERVAL_MS = float(os.environ.get("HW_SCHEDULING_PROFILE_SAMPLE_INTERVAL_MS", "5"))
+# stacks logged per slow request
+TOP_STACKS = 5
+MAX_STACK_DEPTH = 40
+# samples kept, enough for about a minute of requests at the default interval
+MAX_SAMPLES = 12_000
+
+Frame = Tuple[str, int, str]
+Stack = Tuple[Frame, ...]
+
+# modules whose frames at the top of a stack mean the thread is idle, waiting for work or I/O
+IDLE_MODULES = ("threading.py", "selectors.py", "queue.py", "thread.py")
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of all threads while at least one request is in flight.
+
+    Samples are kept in a bounded buffer with the time they were taken, so the stacks of one request are the samples
+    taken between its start and end. Concurrent requests see each other's samples.
+    """
+
+    def __init__(self, interval_seconds: float, max_samples: int = MAX_SAMPLES):
+        self.interval_seconds: float = interval_seconds
+        self._samples: "deque[Tuple[float, Stack]]" = deque(maxlen=max_samples)
+        self._active: int = 0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def request_started(self) -> float:
+        """Starts sampling if needed and returns the start time to pass to request_finished."""
+        with self._condition:
+            self._active += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return time.perf_counter()
+
+    def request_finished(self, started: float) -> List[Tuple[Stack, int]]:
+        """Stops sampling once no request is in flight and returns the hottest stacks sampled since started."""
+        finished = time.perf_counter()
+        with self._condition:
+            self._active -= 1
+            samples = [stack for taken, stack in self._samples if started <= taken <= finished]
+        return Counter(samples).most_common(TOP_STACKS)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while True:
+            with self._condition:
+                while self._active == 0:
+                    self._condition.wait()
+            taken = time.perf_counter()
+            batch = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = _stack(frame)
+                if stack and not stack[-1][0].endswith(IDLE_MODULES):
+                    batch.append((taken, stack))
+            # request_finished reads the samples under the same lock
+            with self._condition:
+                self._samples.extend(batch)
+            time.sleep(self.interval_seconds)
+
+
+def _stack(frame) -> Stack:
+    frames = []
+    while frame is not None and len(frames) < MAX_STACK_DEPTH:
+        frames.append((frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name))
+        frame = frame.f_back
+    # outermost call first
+    return tuple(reversed(frames))
+
+
+def format_stacks(stacks: List[Tuple[Stack, int]]) -> str:
+    """Formats the hottest stacks of a request, innermost call last."""
+    lines = []
+    for stack, samples in stacks:
+        lines.append(f"{samples} samples:")
+        lines.extend(f"    {os.path.basename(filename)}:{lineno} {function}" for filename, lineno, function in stack)
+    return "\n".join(lines)
+
+
+_profiler: Optional[SamplingProfiler] = SamplingProfiler(SAMPLE_INTERVAL_MS / 1000) if SLOW_REQUEST_THRESHOLD_MS > 0 else None
+
+
+def get_profiler() -> Optional[SamplingProfiler]:
+    """Returns the slow request profiler, or None when HW_SCHEDULING_PROFILE_SLOW_REQUESTS_MS is not set."""
+    return _profiler
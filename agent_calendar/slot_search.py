@@ -0,0 +1,139 @@
+# This module implements the slot search shared by the AgentCalendar backends.
+# Candidate start times follow the same grid as stepping by availability_increment from the start of each time range
+# and rolling over to the start of the next working day, but the sweep jumps straight past busy blocks and
+# non-working hours instead of probing every increment. Times are compared as epoch microseconds against the
+# agent's precomputed working windows.
+
+import datetime as dt
+from datetime import datetime, timedelta
+from typing import Iterator, List, Tuple
+
+from agent_calendar.interval_index import IntervalIndex, MICROSECOND, from_epoch_us, to_epoch_us
+from agent_calendar.metrics import BUSY_BLOCKS_SCANNED, SLOTS_PROBED
+from agent_calendar.working_windows import WorkingWindows
+from models import TimeRange
+
+
+def next_candidate(current: int, target: int, increment: int, last_start_of_day: int) -> int:
+    """
+    Moves the search forward from current towards target along the grid of candidate start times.
+
+    The move stops early at the first candidate after last_start_of_day, the last start whose slot ends within the
+    day's working hours, since the search rolls over to the next working day there. All values are epoch microseconds
+    and current must not be after last_start_of_day.
+    """
+    if target > last_start_of_day:
+        return min(target, current + ((last_start_of_day - current) // increment + 1) * increment)
+    return target
+
+
+def search_window(time_ranges: List[TimeRange]) -> Tuple[datetime, datetime]:
+    """Returns the span of time that find_available_slots can look at while searching the non-empty time_ranges."""
+    return min(time_range.start for time_range in time_ranges), max(time_range.end for time_range in time_ranges)
+
+
+def find_available_slots(
+    busy_index: IntervalIndex, working_windows: WorkingWindows, availability_increment: int, time_ranges: List[TimeRange], duration: timedelta, count: int
+) -> List[datetime]:
+    """
+    Finds up to count available start times of the given duration within time_ranges.
+
+    Candidate start times are spaced by availability_increment from the start of each time range. When a candidate's
+    slot would end after the working hours of its local day, the search rolls over to the start of the next day's
+    working hours and continues from there.
+
+    Args:
+        busy_index (IntervalIndex): The agent's merged busy blocks.
+        working_windows (WorkingWindows): The agent's working hours.
+        availability_increment (int): The spacing of candidate start times in minutes.
+        time_ranges (List[TimeRange]): The time ranges to search, in order.
+        duration (timedelta): The duration of the slot.
+        count (int): The maximum number of start times to return.
+
+    Returns:
+        List[datetime]: The available start times in the order they were found, in the timezone of their time range.
+    """
+    return list(iter_available_slots(busy_index, working_windows, availability_increment, time_ranges, duration, count))
+
+
+def iter_available_slots(
+    busy_index: IntervalIndex, working_windows: WorkingWindows, availability_increment: int, time_ranges: List[TimeRange], duration: timedelta, count: int
+) -> Iterator[datetime]:
+    """
+    Yields the start times of find_available_slots one at a time as they are found.
+
+    The search runs as the start times are consumed, so busy_index must not change until the iterator is exhausted
+    or closed.
+    """
+    increment = timedelta(minutes=availability_increment) // MICROSECOND
+    duration_us = duration // MICROSECOND
+    if duration_us <= 0:
+        return
+    found = probed = scanned = 0
+    try:
+        for interval in time_ranges:
+            tzinfo = interval.start.tzinfo or dt.timezone.utc
+            current = to_epoch_us(interval.start)
+            last_start = to_epoch_us(interval.end) - duration_us
+
+            while current <= last_start and found < count:
+                probed += 1
+                day = working_windows.day_of(current)
+                window_start, window_end = working_windows.window(day)
+                last_start_of_day = window_end - duration_us
+                if current > last_start_of_day:
+                    # roll over to the next working day
+                    current = working_windows.window(day + 1)[0]
+                    continue
+
+                if current < window_start:
+                    # every start before the beginning of working hours is unavailable
+                    target = current + -(-(window_start - current) // increment) * increment
+                else:
+                    position = busy_index.find_overlap(current, current + duration_us)
+                    if position < 0:
+                        found += 1
+                        yield from_epoch_us(current, tzinfo)
+                        target = current + increment
+                    else:
+                        scanned += 1
+                        # every start before the end of the overlapping busy block overlaps it as well
+                        target = current + max(1, -(-(busy_index.ends[position] - current) // increment)) * increment
+                current = next_candidate(current, target, increment, last_start_of_day)
+
+            if found >= count:
+                break
+    finally:
+        # also recorded when the consumer stops early
+        SLOTS_PROBED.observe(probed, "sweep")
+        BUSY_BLOCKS_SCANNED.observe(scanned, "sweep")
+
+
+def find_distinct_slots(
+    busy_index: IntervalIndex, window_start: datetime, window_end: datetime, increment: timedelta, duration: timedelta, count: int, tzinfo: dt.tzinfo = dt.timezone.utc
+) -> List[datetime]:
+    """
+    Finds up to count non-overlapping free slots of the given duration within a single window.
+
+    Start times are aligned to increment from window_start and each slot starts at or after the end of the previous
+    one, so every slot can be handed to a different piece of work.
+
+    Returns:
+        List[datetime]: The start times of the slots, in tzinfo.
+    """
+    origin = to_epoch_us(window_start)
+    increment_us = increment // MICROSECOND
+    duration_us = duration // MICROSECOND
+
+    def align(value: int) -> int:
+        return origin - ((origin - value) // increment_us) * increment_us
+
+    slots = []
+    for free_start, free_end in busy_index.free_intervals(origin, to_epoch_us(window_end)):
+        start = align(free_start)
+        while start + duration_us <= free_end and len(slots) < count:
+            slots.append(from_epoch_us(start, tzinfo))
+            start = align(start + duration_us)
+        if len(slots) >= count:
+            break
+    return slots
@@ -0,0 +1,394 @@
+# This module implements an AgentCalendar backed by a SQLite database.
+# Events and todos live in tables indexed by (client_id, agent_id) and time, so each query loads only the events in
+# the window it looks at instead of the agent's whole history. Event times are stored as epoch microseconds, the same
+# representation the interval index uses.
+# An event overlaps [start, end) if it starts before end and ends after start. Only one of the two bounds can use an
+# index, so event_durations keeps the longest event of each agent, kept up to date by triggers, and overlap queries
+# also require events to start at most that long before start. They scan the dtstart index between those bounds.
+#
+# Import the JSON data files into a database with:
+#     python -m agent_calendar.sqlite_agent_calendar data/calendar.db data/ics_data.json data/todo.json
+
+import argparse
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from agent_calendar.agent_calendar import AgentCalendar, CalendarConflictError, EventNotFoundError
+from agent_calendar.booking_counts import DailyBookingCounts, block_full_days
+from agent_calendar.free_busy import FreeBusyView, horizon
+from agent_calendar.interval_index import IntervalIndex, from_epoch_us, to_epoch_us
+from agent_calendar.json_record_index import iter_json_array
+from agent_calendar.recommendations import PRIORITY_RANK_SQL, iter_work_recommendations, upcoming_due_date
+from agent_calendar.slot_search import iter_available_slots, search_window
+from agent_calendar.working_windows import WorkingWindows, get_working_windows
+from models import AgentCalendarEvent, AgentCalendarSettings, TimeRange, ToDo
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calendar_events (
+    client_id INTEGER NOT NULL,
+    agent_id INTEGER NOT NULL,
+    uid TEXT NOT NULL,
+    dtstamp TEXT NOT NULL,
+    dtstart INTEGER NOT NULL,
+    dtend INTEGER NOT NULL,
+    summary TEXT NOT NULL,
+    description TEXT,
+    location TEXT,
+    PRIMARY KEY (client_id, agent_id, uid)
+);
+CREATE INDEX IF NOT EXISTS calendar_events_by_start ON calendar_events (client_id, agent_id, dtstart);
+CREATE INDEX IF NOT EXISTS calendar_events_by_end ON calendar_events (client_id, agent_id, dtend);
+CREATE TABLE IF NOT EXISTS event_durations (
+    client_id INTEGER NOT NULL,
+    agent_id INTEGER NOT NULL,
+    max_duration INTEGER NOT NULL,
+    PRIMARY KEY (client_id, agent_id)
+);
+CREATE TRIGGER IF NOT EXISTS calendar_events_duration_on_insert AFTER INSERT ON calendar_events BEGIN
+    INSERT INTO event_durations VALUES (NEW.client_id, NEW.agent_id, NEW.dtend - NEW.dtstart)
+    ON CONFLICT (client_id, agent_id) DO UPDATE SET max_duration = max(max_duration, excluded.max_duration);
+END;
+CREATE TRIGGER IF NOT EXISTS calendar_events_duration_on_update AFTER UPDATE OF dtstart, dtend ON calendar_events BEGIN
+    INSERT INTO event_durations VALUES (NEW.client_id, NEW.agent_id, NEW.dtend - NEW.dtstart)
+    ON CONFLICT (client_id, agent_id) DO UPDATE SET max_duration = max(max_duration, excluded.max_duration);
+END;
+CREATE TABLE IF NOT EXISTS todos (
+    id INTEGER NOT NULL,
+    client_id INTEGER NOT NULL,
+    agent_id INTEGER NOT NULL,
+    task TEXT NOT NULL,
+    due_date TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    status TEXT NOT NULL,
+    PRIMARY KEY (client_id, agent_id, id)
+);
+CREATE INDEX IF NOT EXISTS todos_by_due_date ON todos (client_id, agent_id, due_date);
+"""
+
+# rows written per executemany call by the importer
+IMPORT_BATCH_SIZE = 10_000
+
+# events overlapping [?, ?), the earliest start an overlapping event can have is looked up in event_durations.
+# Durations only ever grow, a cancelled long event leaves the bound wider than needed but never too narrow.
+# The unary + keeps the planner on the dtstart index, the dtend index is bounded on one side only.
+OVERLAPPING_EVENTS = (
+    "client_id = ? AND agent_id = ? AND dtstart < ? AND +dtend > ? "
+    "AND dtstart >= ? - (SELECT max_duration FROM event_durations WHERE client_id = ? AND agent_id = ?)"
+)
+
+
+class SQLiteConnectionPool:
+    """
+    A pool of reusable connections to one SQLite database.
+
+    Connections are handed out to one thread at a time and returned to the pool afterwards, keeping at most max_idle
+    idle connections open.
+    """
+
+    def __init__(self, db_path: str, max_idle: int = 8):
+        self.db_path: str = db_path
+        self.max_idle: int = max_idle
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        try:
+            yield connection
+        finally:
+            if self._idle.qsize() < self.max_idle:
+                self._idle.put(connection)
+            else:
+                connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        # readers do not block the writer and vice versa
+        connection.execute("PRAGMA journal_mode=WAL")
+        (has_durations,) = connection.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'event_durations'").fetchone()
+        connection.executescript(SCHEMA)
+        if not has_durations:
+            # databases created before event_durations existed
+            with connection:
+                connection.execute(
+                    "INSERT OR IGNORE INTO event_durations SELECT client_id, agent_id, MAX(dtend - dtstart) FROM calendar_events GROUP BY client_id, agent_id"
+                )
+        return connection
+
+
+_pools: Dict[str, SQLiteConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(db_path: str) -> SQLiteConnectionPool:
+    """Returns the shared connection pool for db_path."""
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = SQLiteConnectionPool(db_path)
+            _pools[db_path] = pool
+        return pool
+
+
+class SQLiteAgentCalendar(AgentCalendar):
+    def __init__(self, db_path: str, client_id: int, agent_id: int, calendar_settings: AgentCalendarSettings):
+        self.db_path: str = db_path
+        self.client_id: int = client_id
+        self.agent_id: int = agent_id
+        self.calendar_settings: AgentCalendarSettings = calendar_settings
+        self.working_windows: WorkingWindows = get_working_windows(calendar_settings.working_hours, calendar_settings.timezone)
+        self.pool: SQLiteConnectionPool = get_connection_pool(db_path)
+
+    def busy_index_between(self, start_time: datetime, end_time: datetime) -> IntervalIndex:
+        """Builds the busy blocks of the events that overlap [start_time, end_time)."""
+        with self.pool.connection() as connection:
+            rows = connection.execute(
+                f"SELECT dtstart, dtend FROM calendar_events WHERE {OVERLAPPING_EVENTS}", self._overlapping_events_parameters(start_time, end_time)
+            ).fetchall()
+        return IntervalIndex(rows)
+
+    def is_time_available(self, start_time: datetime, end_time: datetime) -> bool:
+        """Check if the time slot is available for the agent."""
+        if not self.working_windows.contains(to_epoch_us(start_time), to_epoch_us(end_time)):
+            return False
+
+        # check if the start time is before the end time
+        if start_time >= end_time:
+            return False
+
+        # Check if the day is fully booked or any event overlaps the requested time slot
+        with self.pool.connection() as connection:
+            return not self._day_is_full(connection, start_time) and not self._overlaps(connection, start_time, end_time)
+
+    def _day_is_full(self, connection: sqlite3.Connection, start_time: datetime, exclude_uid: Optional[str] = None) -> bool:
+        # the count is a range scan of the (client_id, agent_id, dtstart) index
+        day_start, day_end = self.working_windows.day_bounds(self.working_windows.day_of(to_epoch_us(start_time)))
+        (bookings,) = connection.execute(
+            "SELECT COUNT(*) FROM calendar_events WHERE client_id = ? AND agent_id = ? AND dtstart >= ? AND dtstart < ? AND uid IS NOT ?",
+            (self.client_id, self.agent_id, day_start, day_end, exclude_uid),
+        ).fetchone()
+        return bookings >= self.calendar_settings.max_bookings_per_day
+
+    def _full_days_between(self, start_time: datetime, end_time: datetime) -> List[Tuple[int, int]]:
+        """Returns the [start, end) epoch microsecond bounds of the fully booked days between start_time and end_time."""
+        start, end = to_epoch_us(start_time), to_epoch_us(end_time)
+        first_day_start, _ = self.working_windows.day_bounds(self.working_windows.day_of(start))
+        with self.pool.connection() as connection:
+            rows = connection.execute(
+                "SELECT dtstart FROM calendar_events WHERE client_id = ? AND agent_id = ? AND dtstart >= ? AND dtstart < ?",
+                (self.client_id, self.agent_id, first_day_start, end),
+            ).fetchall()
+        # days follow the agent's timezone, so the events are counted per day here rather than grouped in SQL
+        booking_counts = DailyBookingCounts(self.working_windows, (dtstart for (dtstart,) in rows))
+        return list(booking_counts.full_days(start, end, self.calendar_settings.max_bookings_per_day))
+
+    def _overlaps(self, connection: sqlite3.Connection, start_time: datetime, end_time: datetime, exclude_uid: Optional[str] = None) -> bool:
+        overlapping = connection.execute(
+            f"SELECT 1 FROM calendar_events WHERE {OVERLAPPING_EVENTS} AND uid IS NOT ? LIMIT 1",
+            (*self._overlapping_events_parameters(start_time, end_time), exclude_uid),
+        ).fetchone()
+        return overlapping is not None
+
+    def _overlapping_events_parameters(self, start_time: datetime, end_time: datetime) -> tuple:
+        start = to_epoch_us(start_time)
+        return (self.client_id, self.agent_id, to_epoch_us(end_time), start, start, self.client_id, self.agent_id)
+
+    def find_available_slots(self, time_ranges: List[TimeRange], duration: timedelta, count: int) -> List[datetime]:
+        return list(self.iter_available_slots(time_ranges, duration, count))
+
+    def iter_available_slots(self, time_ranges: List[TimeRange], duration: timedelta, count: int) -> Iterator[datetime]:
+        """Yields the start times of find_available_slots as they are found, searching the busy blocks queried up front."""
+        if not time_ranges:
+            return iter(())
+        window_start, window_end = search_window(time_ranges)
+        busy_index = self.busy_index_between(window_start, window_end)
+        # fully booked days are blocked out so the search skips them wholesale
+        full_days = self._full_days_between(window_start, window_end)
+        busy_index = block_full_days(busy_index, full_days, to_epoch_us(window_start), to_epoch_us(window_end))
+        return iter_available_slots(busy_index, self.working_windows, self.calendar_settings.availability_increment, time_ranges, duration, count)
+
+    def free_busy(self) -> FreeBusyView:
+        """Builds the free/busy view from the database on every call, since other processes may change the events."""
+        start, end = horizon(self.working_windows)
+        return self.free_busy_between(from_epoch_us(start), from_epoch_us(end))
+
+    def free_busy_between(self, start_time: datetime, end_time: datetime) -> FreeBusyView:
+        start, end = to_epoch_us(start_time), to_epoch_us(end_time)
+        busy_index = block_full_days(self.busy_index_between(start_time, end_time), self._full_days_between(start_time, end_time), start, end)
+        return FreeBusyView(busy_index, self.working_windows, start, end)
+
+    def _check_bookable(self, connection: sqlite3.Connection, start_time: datetime, end_time: datetime, exclude_uid: Optional[str] = None) -> None:
+        if (
+            start_time >= end_time
+            or not self.working_windows.contains(to_epoch_us(start_time), to_epoch_us(end_time))
+            or self._day_is_full(connection, start_time, exclude_uid)
+            or self._overlaps(connection, start_time, end_time, exclude_uid)
+        ):
+            raise CalendarConflictError(f"The agent is not available between {start_time} and {end_time}")
+
+    def _select_event(self, connection: sqlite3.Connection, uid: str) -> AgentCalendarEvent:
+        row = connection.execute(
+            "SELECT uid, dtstamp, dtstart, dtend, summary, description, location FROM calendar_events WHERE client_id = ? AND agent_id = ? AND uid = ?",
+            (self.client_id, self.agent_id, uid),
+        ).fetchone()
+        if row is None:
+            raise EventNotFoundError(f"Event {uid} not found")
+        uid, dtstamp, dtstart, dtend, summary, description, location = row
+        return AgentCalendarEvent(
+            uid=uid, dtstamp=dtstamp, dtstart=from_epoch_us(dtstart), dtend=from_epoch_us(dtend), summary=summary, description=description, location=location
+        )
+
+    def create_event(self, event: AgentCalendarEvent) -> AgentCalendarEvent:
+        """Books an event if the agent is available, checking and inserting in one write transaction."""
+        with self.pool.connection() as connection:
+            with connection:
+                # take the write lock before the check so concurrent bookings cannot both pass it
+                connection.execute("BEGIN IMMEDIATE")
+                self._check_bookable(connection, event.dtstart, event.dtend)
+                try:
+                    connection.execute("INSERT INTO calendar_events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", self._event_row(event))
+                except sqlite3.IntegrityError:
+                    raise CalendarConflictError(f"Event {event.uid} already exists")
+        return event
+
+    def update_event(
+        self, uid: str, start_time: datetime, end_time: datetime, summary: Optional[str] = None, description: Optional[str] = None, location: Optional[str] = None
+    ) -> AgentCalendarEvent:
+        """Moves an event if the agent is available at the new time, checking and updating in one write transaction."""
+        with self.pool.connection() as connection:
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                current = self._select_event(connection, uid)
+                self._check_bookable(connection, start_time, end_time, exclude_uid=uid)
+                changes = {"dtstart": start_time, "dtend": end_time, "dtstamp": datetime.now(timezone.utc)}
+                for field, value in (("summary", summary), ("description", description), ("location", location)):
+                    if value is not None:
+                        changes[field] = value
+                event = current.model_copy(update=changes)
+                connection.execute("INSERT OR REPLACE INTO calendar_events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", self._event_row(event))
+        return event
+
+    def cancel_event(self, uid: str) -> AgentCalendarEvent:
+        """Removes an event from the agent's calendar."""
+        with self.pool.connection() as connection:
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                event = self._select_event(connection, uid)
+                connection.execute("DELETE FROM calendar_events WHERE client_id = ? AND agent_id = ? AND uid = ?", (self.client_id, self.agent_id, uid))
+        return event
+
+    def _event_row(self, event: AgentCalendarEvent) -> tuple:
+        return (
+            self.client_id,
+            self.agent_id,
+            event.uid,
+            event.model_dump(mode="json")["dtstamp"],
+            to_epoch_us(event.dtstart),
+            to_epoch_us(event.dtend),
+            event.summary,
+            event.description,
+            event.location,
+        )
+
+    def _load_upcoming_tasks(self, due_by: date) -> List[ToDo]:
+        with self.pool.connection() as connection:
+            rows = connection.execute(
+                f"SELECT id, task, due_date, priority, status FROM todos WHERE client_id = ? AND agent_id = ? AND due_date <= ? ORDER BY due_date, {PRIORITY_RANK_SQL}",
+                (self.client_id, self.agent_id, due_by.isoformat()),
+            ).fetchall()
+        return [
+            ToDo(id=id, task=task, due_date=due_date, priority=priority, status=status, client_id=self.client_id, agent_id=self.agent_id)
+            for id, task, due_date, priority, status in rows
+        ]
+
+    def recommend_work_from_todo(self) -> List[str]:
+        """Suggests work from the todo list for the free time on the days the upcoming tasks are due."""
+        return list(self.iter_work_recommendations())
+
+    def iter_work_recommendations(self) -> Iterator[str]:
+        """Yields the suggestions of recommend_work_from_todo one at a time as they are found."""
+        return iter_work_recommendations(self._load_upcoming_tasks(upcoming_due_date()), self.calendar_settings, self.busy_index_between)
+
+
+def import_json_data(db_path: str, calendar_json_file: Optional[str] = None, todo_json_file: Optional[str] = None) -> Dict[str, int]:
+    """
+    Bulk imports the JSON data files into a SQLite database, replacing rows with the same keys.
+
+    The files are decoded one record at a time, so they are never fully loaded into memory.
+
+    Returns:
+        Dict[str, int]: The number of events and todos imported.
+    """
+    counts = {"events": 0, "todos": 0}
+    with get_connection_pool(db_path).connection() as connection:
+        with connection:
+            if calendar_json_file:
+                batch = []
+                for _, _, calendar in iter_json_array(calendar_json_file):
+                    for event in calendar.get("calendar_events", []):
+                        batch.append(
+                            (
+                                calendar["client_id"],
+                                calendar["agent_id"],
+                                event["uid"],
+                                event["dtstamp"],
+                                to_epoch_us(datetime.fromisoformat(event["dtstart"])),
+                                to_epoch_us(datetime.fromisoformat(event["dtend"])),
+                                event["summary"],
+                                event.get("description"),
+                                event.get("location"),
+                            )
+                        )
+                    if len(batch) >= IMPORT_BATCH_SIZE:
+                        counts["events"] += _insert(connection, "calendar_events", batch)
+                counts["events"] += _insert(connection, "calendar_events", batch)
+
+            if todo_json_file:
+                batch = []
+                for _, _, todo in iter_json_array(todo_json_file):
+                    batch.append(
+                        (
+                            todo["id"],
+                            todo["client_id"],
+                            todo["agent_id"],
+                            todo["task"],
+                            date.fromisoformat(todo["due_date"][:10]).isoformat(),
+                            todo["priority"],
+                            todo["status"],
+                        )
+                    )
+                    if len(batch) >= IMPORT_BATCH_SIZE:
+                        counts["todos"] += _insert(connection, "todos", batch)
+                counts["todos"] += _insert(connection, "todos", batch)
+    return counts
+
+
+def _insert(connection: sqlite3.Connection, table: str, rows: list) -> int:
+    if not rows:
+        return 0
+    placeholders = ", ".join("?" * len(rows[0]))
+    connection.executemany(f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})", rows)
+    inserted = len(rows)
+    rows.clear()
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import the JSON calendar and todo files into a SQLite database.")
+    parser.add_argument("db_path")
+    parser.add_argument("calendar_json_file")
+    parser.add_argument("todo_json_file")
+    args = parser.parse_args()
+    counts = import_json_data(args.db_path, args.calendar_json_file, args.todo_json_file)
+    print(f"Imported {counts['events']} events and {counts['todos']} todos into {args.db_path}")
+
+
+if __name__ == "__main__":
+    main()
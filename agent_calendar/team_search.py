@@ -0,0 +1,114 @@
+# This module finds time that several agents have free together, e.g. a showing agent and a lender.
+# Each agent's free working time in the search window comes from its free/busy view, with its own working hours,
+# timezone and fully booked days already taken out. One sweep over the start and end of every agent's free intervals
+# then finds the time all of them are free, however many agents there are, instead of intersecting start times
+# agent by agent.
+
+import datetime as dt
+import math
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, List, Sequence, Tuple
+
+from agent_calendar.agent_calendar import AgentCalendar
+from agent_calendar.interval_index import MICROSECOND, IntervalIndex, from_epoch_us, to_epoch_us
+from agent_calendar.slot_search import search_window
+from models import TimeRange
+
+Interval = Tuple[int, int]
+
+
+def common_free_intervals(free_intervals: Sequence[Sequence[Interval]]) -> List[Interval]:
+    """
+    Returns the epoch microsecond intervals in which every list of free intervals is free.
+
+    An interval ending where the next one of the same agent starts, around a zero length event, is not treated as
+    continuous, so common intervals may touch but a slot never spans such a boundary.
+    """
+    if not free_intervals:
+        return []
+    # ends sort before starts at the same instant
+    edges = sorted((edge, kind) for intervals in free_intervals for start, end in intervals for edge, kind in ((start, 1), (end, 0)))
+    required = len(free_intervals)
+    common = []
+    free = 0
+    common_start = 0
+    for edge, kind in edges:
+        if kind:
+            free += 1
+            if free == required:
+                common_start = edge
+        else:
+            if free == required and edge > common_start:
+                common.append((common_start, edge))
+            free -= 1
+    return common
+
+
+class TeamSchedule:
+    """
+    The free working time of a team of agents within the time ranges of a search.
+
+    Candidate start times are spaced by the greatest common divisor of the agents' availability increments from the
+    start of each time range. A coarser common grid, such as the least common multiple, can miss every time the team
+    is free together: increments of 7 and 15 minutes would only try every 105 minutes.
+    """
+
+    def __init__(self, calendars: Dict[int, AgentCalendar], time_ranges: List[TimeRange]):
+        self.time_ranges: List[TimeRange] = time_ranges
+        self.increment: timedelta = timedelta(minutes=math.gcd(*(calendar.calendar_settings.availability_increment for calendar in calendars.values())))
+        # agent id -> the agent's free intervals within the search window
+        self.free_intervals: Dict[int, List[Interval]] = {}
+        if time_ranges:
+            window_start, window_end = search_window(time_ranges)
+            for agent_id, calendar in calendars.items():
+                self.free_intervals[agent_id] = calendar.free_busy_between(window_start, window_end).free_intervals()
+
+    def common_slots(self, duration: timedelta, count: int) -> List[datetime]:
+        """Returns up to count start times at which every agent is free for duration, in the timezone of their time range."""
+        common = common_free_intervals(list(self.free_intervals.values()))
+        common_ends = [end for _, end in common]
+        increment = self.increment // MICROSECOND
+        duration_us = duration // MICROSECOND
+        slots = []
+        if duration_us <= 0:
+            return slots
+        for time_range in self.time_ranges:
+            tzinfo = time_range.start.tzinfo or dt.timezone.utc
+            origin, range_end = to_epoch_us(time_range.start), to_epoch_us(time_range.end)
+            # the first common interval that ends late enough to hold a slot starting at the range start
+            position = bisect_right(common_ends, origin + duration_us - 1)
+            while position < len(common) and len(slots) < count:
+                free_start, free_end = common[position]
+                if free_start >= range_end:
+                    break
+                start = origin + max(0, -(-(free_start - origin) // increment)) * increment
+                while start + duration_us <= min(free_end, range_end) and len(slots) < count:
+                    slots.append(from_epoch_us(start, tzinfo))
+                    start += increment
+                position += 1
+            if len(slots) >= count:
+                break
+        return slots
+
+    def top_agents(self, duration: timedelta, k: int) -> List[Tuple[int, timedelta]]:
+        """
+        Returns the k agents whose free time overlaps the most with the rest of the team, most first.
+
+        An agent's score adds up the time they share with each other agent within the time ranges, counting only
+        shared stretches long enough for a slot of duration. An agent free all day but never when the others are scores
+        nothing.
+        """
+        duration_us = duration // MICROSECOND
+        ranges = IntervalIndex((to_epoch_us(time_range.start), to_epoch_us(time_range.end)) for time_range in self.time_ranges)
+        ranges = list(zip(ranges.starts, ranges.ends))
+        free_intervals = {agent_id: common_free_intervals([intervals, ranges]) for agent_id, intervals in self.free_intervals.items()}
+        shared = dict.fromkeys(free_intervals, 0)
+        agent_ids = list(free_intervals)
+        for position, agent_id in enumerate(agent_ids):
+            for other_id in agent_ids[position + 1:]:
+                overlap = sum(end - start for start, end in common_free_intervals([free_intervals[agent_id], free_intervals[other_id]]) if end - start >= duration_us)
+                shared[agent_id] += overlap
+                shared[other_id] += overlap
+        ranked = sorted(shared.items(), key=lambda agent: -agent[1])
+        return [(agent_id, timedelta(microseconds=total)) for agent_id, total in ranked[:k]]
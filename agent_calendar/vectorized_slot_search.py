@@ -0,0 +1,110 @@
+# This module implements a NumPy version of the slot search for wide searches.
+# The candidates of each working day of a search are laid out as an array of start times at the agent's
+# availability_increment, within the day's precomputed working window. Busy blocks are marked in bulk with a difference
+# array and a cumulative sum, so the free candidates of a whole day are found without a Python loop over the increments.
+# Results are identical to agent_calendar.slot_search.find_available_slots.
+# Only find_available_slots uses it. Work recommendations hand out distinct slots within single working days with
+# agent_calendar.slot_search.find_distinct_slots, which walks the day's free intervals and has no candidates to lay out.
+#
+# NumPy is optional. When it is not installed, callers fall back to the sweep in agent_calendar.slot_search.
+
+import datetime as dt
+from datetime import datetime, timedelta
+from typing import List
+
+from agent_calendar.interval_index import IntervalIndex, MICROSECOND, from_epoch_us, to_epoch_us
+from agent_calendar.metrics import BUSY_BLOCKS_SCANNED, SLOTS_PROBED
+from agent_calendar.slot_search import next_candidate
+from agent_calendar.working_windows import WorkingWindows
+from models import TimeRange
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy installed
+    np = None
+
+# upper bound on the number of candidates laid out at once for a single working day
+MAX_SEGMENT_CANDIDATES = 1 << 16
+
+
+def is_supported() -> bool:
+    """Checks if the vectorized search can be used, which needs NumPy."""
+    return np is not None
+
+
+def _free_candidates(busy_starts, busy_ends, first_start: int, steps: int, increment: int, duration: int):
+    """
+    Marks which of steps candidates, starting at first_start and spaced by increment, do not overlap a busy block.
+
+    All values are in microseconds. Returns the marks and the number of busy blocks they were checked against.
+    """
+    free = np.ones(steps, dtype=bool)
+
+    # busy blocks that can overlap any candidate slot of this segment
+    last_end = first_start + (steps - 1) * increment + duration
+    low = np.searchsorted(busy_ends, first_start, side="right")
+    high = np.searchsorted(busy_starts, last_end, side="left")
+    if low < high:
+        block_starts = busy_starts[low:high]
+        block_ends = busy_ends[low:high]
+        # a candidate overlaps a block when it starts before the block ends and ends after the block starts
+        first_blocked = np.clip((block_starts - duration - first_start) // increment + 1, 0, steps)
+        last_blocked = np.clip(-((first_start - block_ends) // increment), 0, steps)
+        blocking = first_blocked < last_blocked
+        marks = np.zeros(steps + 1, dtype=np.int32)
+        np.add.at(marks, first_blocked[blocking], 1)
+        np.add.at(marks, last_blocked[blocking], -1)
+        free &= np.cumsum(marks[:steps]) == 0
+    return free, max(0, int(high - low))
+
+
+def find_available_slots_vectorized(
+    busy_index: IntervalIndex, working_windows: WorkingWindows, availability_increment: int, time_ranges: List[TimeRange], duration: timedelta, count: int
+) -> List[datetime]:
+    """
+    Finds up to count available start times of the given duration within time_ranges using array operations.
+
+    Takes the same arguments and returns the same start times as agent_calendar.slot_search.find_available_slots.
+    Callers must check is_supported first.
+    """
+    increment = timedelta(minutes=availability_increment) // MICROSECOND
+    duration_us = duration // MICROSECOND
+    busy_starts = np.frombuffer(busy_index.starts, dtype=np.int64) if len(busy_index) else np.zeros(0, dtype=np.int64)
+    busy_ends = np.frombuffer(busy_index.ends, dtype=np.int64) if len(busy_index) else np.zeros(0, dtype=np.int64)
+
+    available = []
+    if duration_us <= 0:
+        return available
+    probed = scanned = 0
+    for interval in time_ranges:
+        tzinfo = interval.start.tzinfo or dt.timezone.utc
+        current = to_epoch_us(interval.start)
+        last_start = to_epoch_us(interval.end) - duration_us
+
+        while current <= last_start and len(available) < count:
+            day = working_windows.day_of(current)
+            window_start, window_end = working_windows.window(day)
+            last_start_of_day = window_end - duration_us
+            if current > last_start_of_day:
+                # roll over to the next working day
+                current = working_windows.window(day + 1)[0]
+                continue
+            if current < window_start:
+                target = current + -(-(window_start - current) // increment) * increment
+                current = next_candidate(current, target, increment, last_start_of_day)
+                continue
+
+            # every candidate up to the day's last start, or the range's, is within working hours
+            steps = min((min(last_start_of_day, last_start) - current) // increment + 1, MAX_SEGMENT_CANDIDATES)
+            free, blocks = _free_candidates(busy_starts, busy_ends, current, steps, increment, duration_us)
+            probed += steps
+            scanned += blocks
+            for step in np.flatnonzero(free)[: count - len(available)]:
+                available.append(from_epoch_us(current + int(step) * increment, tzinfo))
+            current += steps * increment
+
+        if len(available) >= count:
+            break
+    SLOTS_PROBED.observe(probed, "vectorized")
+    BUSY_BLOCKS_SCANNED.observe(scanned, "vectorized")
+    return available
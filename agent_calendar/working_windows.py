@@ -0,0 +1,104 @@
+# This module turns an agent's working hours into UTC time windows.
+# Working hours are wall clock times in the agent's IANA timezone. Each local day's window is converted to epoch
+# microseconds once, with the timezone's DST rules applied, and cached, so availability checks and slot searches
+# compare integers instead of converting datetimes on every probe.
+#
+# Days are numbered from 1970-01-01 in the agent's timezone. Working hours that start or end at a wall clock time
+# skipped by a DST change use the offset from before the change, as datetime does for fold=0.
+
+import threading
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Dict, Tuple
+from zoneinfo import ZoneInfo
+
+from agent_calendar.interval_index import from_epoch_us, to_epoch_us
+from models import WorkingHours
+
+DAY_US = 86_400_000_000
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# windows kept per agent timezone and working hours, a little over ten years of days
+MAX_CACHED_DAYS = 4096
+
+
+def day_number(value: date) -> int:
+    """Returns the number of a calendar date, counted in days from 1970-01-01."""
+    return value.toordinal() - EPOCH_ORDINAL
+
+
+class WorkingWindows:
+    """
+    The working hours of an agent as [start, end] epoch microsecond windows, one per local day.
+
+    A day's entry holds the bounds of the local day itself and of its working window. Entries are computed on first
+    use and shared by every calendar with the same working hours and timezone.
+    """
+
+    def __init__(self, working_hours: WorkingHours, timezone: str = "UTC"):
+        self.working_hours: WorkingHours = working_hours
+        self.timezone: ZoneInfo = ZoneInfo(timezone)
+        # day number -> (local midnight, next local midnight, working start, working end)
+        self._days: Dict[int, Tuple[int, int, int, int]] = {}
+        self._lock = threading.Lock()
+        # UTC offset used to guess the day of an instant before checking it against the day bounds
+        self._offset_hint: int = self.timezone.utcoffset(datetime(2000, 1, 1)) // timedelta(microseconds=1)
+
+    def _day(self, day: int) -> Tuple[int, int, int, int]:
+        entry = self._days.get(day)
+        if entry is None:
+            local_date = date.fromordinal(day + EPOCH_ORDINAL)
+            entry = (
+                self._epoch_us(local_date, time(0)),
+                self._epoch_us(local_date + timedelta(days=1), time(0)),
+                self._epoch_us(local_date, self.working_hours.start),
+                self._epoch_us(local_date, self.working_hours.end),
+            )
+            with self._lock:
+                if len(self._days) >= MAX_CACHED_DAYS:
+                    self._days.clear()
+                self._days[day] = entry
+        return entry
+
+    def _epoch_us(self, local_date: date, local_time: time) -> int:
+        return to_epoch_us(datetime.combine(local_date, local_time, tzinfo=self.timezone))
+
+    def day_of(self, instant: int) -> int:
+        """Returns the number of the local day that the epoch microsecond instant falls on."""
+        day = (instant + self._offset_hint) // DAY_US
+        entry = self._day(day)
+        if entry[0] <= instant < entry[1]:
+            return day
+        while instant < self._day(day)[0]:
+            day -= 1
+        while instant >= self._day(day)[1]:
+            day += 1
+        return day
+
+    def day_bounds(self, day: int) -> Tuple[int, int]:
+        """Returns the [start, end) epoch microsecond bounds of a local day."""
+        midnight, next_midnight, _, _ = self._day(day)
+        return midnight, next_midnight
+
+    def window(self, day: int) -> Tuple[int, int]:
+        """Returns the [start, end] epoch microsecond bounds of the working hours on a local day."""
+        _, _, start, end = self._day(day)
+        return start, end
+
+    def contains(self, start: int, end: int) -> bool:
+        """Checks if [start, end] lies within the working hours of the local day start falls on."""
+        window_start, window_end = self.window(self.day_of(start))
+        return window_start <= start and end <= window_end
+
+    def local_time(self, instant: int) -> datetime:
+        """Converts an epoch microsecond instant to an aware datetime in the agent's timezone."""
+        return from_epoch_us(instant, self.timezone)
+
+
+@lru_cache(maxsize=1024)
+def _working_windows(start: time, end: time, timezone: str) -> WorkingWindows:
+    return WorkingWindows(WorkingHours(start=start, end=end), timezone)
+
+
+def get_working_windows(working_hours: WorkingHours, timezone: str = "UTC") -> WorkingWindows:
+    """Returns the shared working windows of the given working hours and IANA timezone."""
+    return _working_windows(working_hours.start, working_hours.end, timezone)
@@ -0,0 +1,126 @@
+"""
+In-process ASGI load driver for the scheduling endpoints.
+
+Requests are sent straight to the ASGI app, without a server or socket in between, from a fixed number of concurrent
+clients. Reports p50/p99 latency and throughput per route. The app must be imported after HW_SCHEDULING_DATA_DIR
+points at the data set to benchmark.
+"""
+
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+
+async def asgi_request(app, method: str, path: str, payload: dict) -> Tuple[int, bytes]:
+    """Sends a single JSON request to an ASGI app and returns the response status and body."""
+    body = json.dumps(payload).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    request_sent = False
+    response_complete = asyncio.Event()
+    status = 0
+    chunks = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # the client only disconnects once the whole response has been sent
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_complete.set()
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def drive(app, path: str, payloads: Callable[[random.Random], dict], requests: int, concurrency: int, seed: int = 0) -> Dict[str, float]:
+    """
+    Sends requests POST requests to path from concurrency concurrent clients.
+
+    Returns:
+        Dict[str, float]: p50 and p99 latency in milliseconds, throughput in requests per second and the error count.
+    """
+    rng = random.Random(seed)
+    queue = [payloads(rng) for _ in range(requests)]
+    latencies = []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        while queue:
+            payload = queue.pop()
+            started = time.perf_counter()
+            status, _ = await asgi_request(app, "POST", path, payload)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status >= 500:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"p50_ms": percentile(latencies, 0.5), "p99_ms": percentile(latencies, 0.99), "rps": requests / elapsed, "errors": errors}
+
+
+def run(agents: List[Tuple[int, int]], start_date: datetime, requests: int = 2000, concurrency: int = 32) -> Dict[str, float]:
+    """
+    Drives the three scheduling routes with random agents and windows.
+
+    Returns:
+        Dict[str, float]: The results of each route, keyed by "api.<route>.<metric>".
+    """
+    from app import app
+
+    def window(rng: random.Random, hours: int) -> Tuple[str, str]:
+        start = start_date + timedelta(days=rng.randrange(60), hours=rng.randrange(8, 16))
+        return start.isoformat(), (start + timedelta(hours=hours)).isoformat()
+
+    def check(rng):
+        client_id, agent_id = rng.choice(agents)
+        start, end = window(rng, 1)
+        return {"client_id": client_id, "agent_id": agent_id, "start_date_time": start, "end_date_time": end}
+
+    def available(rng):
+        client_id, agent_id = rng.choice(agents)
+        start, end = window(rng, 24 * 14)
+        return {"client_id": client_id, "agent_id": agent_id, "time_ranges": [{"start": start, "end": end}], "duration_minutes": 60, "count": 10}
+
+    def recommend(rng):
+        client_id, agent_id = rng.choice(agents)
+        return {"client_id": client_id, "agent_id": agent_id}
+
+    results = {}
+    for route, payloads in [("check", check), ("available", available), ("recommend", recommend)]:
+        route_results = asyncio.run(drive(app, f"/scheduling/{route}", payloads, requests, concurrency))
+        for metric, value in route_results.items():
+            results[f"api.{route}.{metric}"] = value
+    return results
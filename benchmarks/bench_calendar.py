@@ -0,0 +1,80 @@
+"""
+Micro-benchmarks for the calendar engine.
+
+Times calendar loads, is_time_available, find_available_slots over narrow and wide windows (with the sweep and, when
+NumPy is installed, the vectorized search) and recommend_work_from_todo against a generated data set.
+"""
+
+import itertools
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict
+
+from agent_calendar.agent_calendar_settings import AgentCalendarSettingsIndex, load_agent_calendar_settings
+from agent_calendar.json_agent_calendar import JSONAgentCalendar
+from agent_calendar.vectorized_slot_search import np
+from models import TimeRange
+
+
+def time_per_call(func: Callable[[], object], min_seconds: float = 0.2, max_calls: int = 100_000) -> float:
+    """Calls func repeatedly for at least min_seconds and returns the mean time per call in microseconds."""
+    calls = 0
+    started = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds and calls < max_calls:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - started
+    return elapsed / calls * 1_000_000
+
+
+def run(data_dir: str, start_date: datetime, seed: int = 0) -> Dict[str, float]:
+    """
+    Runs the calendar micro-benchmarks against the data set in data_dir.
+
+    Returns:
+        Dict[str, float]: Mean microseconds per call, keyed by benchmark name.
+    """
+    rng = random.Random(seed)
+    settings_index = AgentCalendarSettingsIndex(load_agent_calendar_settings(os.path.join(data_dir, "agent_calendar_settings.json")))
+    settings = settings_index.get(1, 1)
+
+    def load(vectorized=None) -> JSONAgentCalendar:
+        return JSONAgentCalendar(
+            calendar_json_file=os.path.join(data_dir, "ics_data.json"),
+            todo_json_file=os.path.join(data_dir, "todo.json"),
+            client_id=1,
+            agent_id=1,
+            calendar_settings=settings,
+            vectorized=vectorized,
+        )
+
+    results = {"calendar.load_us": time_per_call(load, max_calls=200)}
+
+    calendar = load(vectorized=False)
+    probes = []
+    for _ in range(1000):
+        start = start_date + timedelta(days=rng.randrange(60), hours=settings.working_hours.start.hour, minutes=15 * rng.randrange(32))
+        probes.append((start, start + timedelta(minutes=30)))
+    probe_cycle = itertools.cycle(probes)
+    results["calendar.is_time_available_us"] = time_per_call(lambda: calendar.is_time_available(*next(probe_cycle)))
+
+    narrow = [TimeRange(start=start_date + timedelta(days=3), end=start_date + timedelta(days=4))]
+    wide = [TimeRange(start=start_date, end=start_date + timedelta(days=60))]
+    results["calendar.find_available_slots.narrow_us"] = time_per_call(lambda: calendar.find_available_slots(narrow, timedelta(minutes=30), 5))
+    results["calendar.find_available_slots.wide_us"] = time_per_call(lambda: calendar.find_available_slots(wide, timedelta(minutes=60), 500))
+    if np is not None:
+        vectorized = load(vectorized=True)
+        results["calendar.find_available_slots.wide_vectorized_us"] = time_per_call(lambda: vectorized.find_available_slots(wide, timedelta(minutes=60), 500))
+
+    results["calendar.recommend_work_from_todo_us"] = time_per_call(calendar.recommend_work_from_todo)
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    for name, value in run(sys.argv[1], datetime(2025, 4, 1, tzinfo=timezone.utc)).items():
+        print(f"{name:55s} {value:12.1f}")
@@ -0,0 +1,146 @@
+"""
+Synthetic data generator for the scheduling benchmarks.
+
+Writes ics_data.json, todo.json and agent_calendar_settings.json in the same shape as the files in data/, at a
+configurable scale. Events are spread over working hours starting at --start-date and todos are due over the next
+week, so recommend_work_from_todo has work to do whenever the benchmarks run. Records are written as they are
+generated, so data sets with millions of events do not have to fit in memory.
+
+Usage:
+    python -m benchmarks.generate_data --out /tmp/hw-bench --clients 10 --agents-per-client 1000 --events-per-agent 100
+"""
+
+import argparse
+import json
+import os
+import random
+from contextlib import ExitStack, closing
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict
+
+PRIORITIES = ["High", "Medium", "Low"]
+STATUSES = ["Pending", "In Progress"]
+SUMMARIES = ["Showing", "Client Call", "Open House", "Inspection", "Closing", "Team Meeting"]
+
+
+class JSONArrayWriter:
+    """Writes a JSON array to a file one element at a time, formatted like json.dump."""
+
+    def __init__(self, path: str):
+        self.file = open(path, "w", encoding="utf-8")
+        self.file.write("[")
+        self.length = 0
+
+    def append(self, record: dict) -> None:
+        if self.length:
+            self.file.write(", ")
+        self.file.write(json.dumps(record))
+        self.length += 1
+
+    def close(self) -> None:
+        self.file.write("]")
+        self.file.close()
+
+
+def generate(
+    out_dir: str,
+    clients: int = 2,
+    agents_per_client: int = 100,
+    events_per_agent: int = 200,
+    todos_per_agent: int = 10,
+    start_date: date = date(2025, 4, 1),
+    days: int = 90,
+    seed: int = 0,
+) -> Dict[str, int]:
+    """
+    Generates a synthetic data set in out_dir.
+
+    Returns:
+        Dict[str, int]: The number of agents, events and todos written.
+    """
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    today = datetime.now().date()
+
+    todo_id = 0
+    with ExitStack() as stack:
+        settings, calendars, todos = (
+            stack.enter_context(closing(JSONArrayWriter(os.path.join(out_dir, file_name))))
+            for file_name in ["agent_calendar_settings.json", "ics_data.json", "todo.json"]
+        )
+        for client_id in range(1, clients + 1):
+            for agent_id in range(1, agents_per_client + 1):
+                start_hour = rng.choice([7, 8, 9])
+                end_hour = rng.choice([17, 18, 20])
+                settings.append(
+                    {
+                        "client_id": client_id,
+                        "agent_id": agent_id,
+                        "calendar_type": "json",
+                        "availability_increment": rng.choice([15, 30]),
+                        "working_hours": {"start": f"{start_hour:02d}:00", "end": f"{end_hour:02d}:00"},
+                    }
+                )
+
+                events = []
+                for _ in range(events_per_agent):
+                    day = start_date + timedelta(days=rng.randrange(days))
+                    start = datetime.combine(day, time(start_hour), tzinfo=timezone.utc) + timedelta(minutes=15 * rng.randrange((end_hour - start_hour) * 4))
+                    end = start + timedelta(minutes=rng.choice([30, 60, 90, 120]))
+                    events.append(
+                        {
+                            "uid": f"{client_id}-{agent_id}-{len(events)}@example.com",
+                            "dtstamp": datetime.combine(start_date, time(12), tzinfo=timezone.utc).isoformat().replace("+00:00", "Z"),
+                            "dtstart": start.isoformat().replace("+00:00", "Z"),
+                            "dtend": end.isoformat().replace("+00:00", "Z"),
+                            "summary": rng.choice(SUMMARIES),
+                            "description": "Synthetic benchmark event",
+                            "location": f"{rng.randrange(1, 9999)} Main St.",
+                        }
+                    )
+                calendars.append({"client_id": client_id, "agent_id": agent_id, "calendar_events": events})
+
+                for _ in range(todos_per_agent):
+                    todo_id += 1
+                    todos.append(
+                        {
+                            "id": todo_id,
+                            "task": f"Follow up on listing {rng.randrange(1, 9999)}",
+                            "due_date": (today + timedelta(days=rng.randrange(1, 8))).isoformat(),
+                            "priority": rng.choice(PRIORITIES),
+                            "status": rng.choice(STATUSES),
+                            "client_id": client_id,
+                            "agent_id": agent_id,
+                        }
+                    )
+
+    return {"agents": settings.length, "events": settings.length * events_per_agent, "todos": todos.length}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic scheduling data for the benchmarks.")
+    parser.add_argument("--out", required=True, help="directory to write the JSON files to")
+    parser.add_argument("--clients", type=int, default=2)
+    parser.add_argument("--agents-per-client", type=int, default=100)
+    parser.add_argument("--events-per-agent", type=int, default=200)
+    parser.add_argument("--todos-per-agent", type=int, default=10)
+    parser.add_argument("--start-date", type=date.fromisoformat, default=date(2025, 4, 1))
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    counts = generate(
+        args.out,
+        clients=args.clients,
+        agents_per_client=args.agents_per_client,
+        events_per_agent=args.events_per_agent,
+        todos_per_agent=args.todos_per_agent,
+        start_date=args.start_date,
+        days=args.days,
+        seed=args.seed,
+    )
+    print(f"Wrote {counts['agents']} agents, {counts['events']} events and {counts['todos']} todos to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Runs the scheduling benchmarks and checks them against a recorded baseline.
+
+Generates a synthetic data set, runs the calendar micro-benchmarks and the in-process ASGI load driver, and compares
+the results with benchmarks/baseline.json. Timings that are slower than the baseline by more than --tolerance, or
+throughput that is lower by more than --tolerance, are reported as regressions and make the run exit with status 1.
+When no baseline exists yet, or with --save-baseline, the results are recorded as the new baseline.
+
+Usage:
+    python -m benchmarks.run [--agents-per-client 5000 --events-per-agent 100] [--save-baseline]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+from benchmarks.generate_data import generate
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+START_DATE = datetime(2025, 4, 1, tzinfo=timezone.utc)
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Returns a description of every metric that regressed by more than tolerance compared to baseline."""
+    regressions = []
+    for name, value in results.items():
+        expected = baseline.get(name)
+        if expected is None or name.endswith(".errors"):
+            continue
+        if name.endswith(".rps"):
+            if value < expected * (1 - tolerance):
+                regressions.append(f"{name}: {value:.1f} req/s, baseline {expected:.1f} req/s")
+        elif value > expected * (1 + tolerance):
+            regressions.append(f"{name}: {value:.1f}, baseline {expected:.1f}")
+    return regressions
+
+
+def run_benchmarks(args: argparse.Namespace, data_dir: str) -> dict:
+    """Generates the data set in data_dir and returns the results of the calendar and API benchmarks."""
+    counts = generate(
+        data_dir,
+        clients=args.clients,
+        agents_per_client=args.agents_per_client,
+        events_per_agent=args.events_per_agent,
+        todos_per_agent=args.todos_per_agent,
+        start_date=START_DATE.date(),
+    )
+    print(f"Generated {counts['agents']} agents, {counts['events']} events and {counts['todos']} todos in {data_dir}")
+
+    # the app reads its data directory on import
+    os.environ["HW_SCHEDULING_DATA_DIR"] = data_dir
+    from benchmarks import bench_api, bench_calendar
+
+    results = bench_calendar.run(data_dir, START_DATE)
+    agents = [(client_id, agent_id) for client_id in range(1, args.clients + 1) for agent_id in range(1, args.agents_per_client + 1)]
+    results.update(bench_api.run(agents, START_DATE, requests=args.requests, concurrency=args.concurrency))
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the scheduling benchmarks.")
+    parser.add_argument("--data-dir", help="directory for the generated data set, by default a temporary directory that is removed afterwards")
+    parser.add_argument("--clients", type=int, default=2)
+    parser.add_argument("--agents-per-client", type=int, default=100)
+    parser.add_argument("--events-per-agent", type=int, default=200)
+    parser.add_argument("--todos-per-agent", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=2000, help="requests sent to each route")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients of the load driver")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="record the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression before failing")
+    args = parser.parse_args()
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="hw-scheduling-bench-")
+    try:
+        results = run_benchmarks(args, data_dir)
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    for name, value in results.items():
+        print(f"{name:55s} {value:12.1f}")
+
+    if args.save_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Recorded baseline in {args.baseline}")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"No regressions against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
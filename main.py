@@ -1,4 +1,53 @@
+import argparse
+import os
+import tempfile
+
 import uvicorn
 
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the scheduling API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("HW_SCHEDULING_WORKERS", "1")),
+        help="Worker processes. More than one serves JSON calendars from a shared snapshot of the calendar file, with changes applied by the launcher.",
+    )
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        # development mode, reloads on code changes
+        uvicorn.run("app:app", host=args.host, port=args.port, log_level="info", reload=True)
+        return
+
+    from agent_calendar.agent_calendar_factory import CALENDAR_JSON_FILE, DATA_DIR, TODO_JSON_FILE
+    from agent_calendar.calendar_snapshot import SnapshotPublisher
+    from agent_calendar.calendar_writer import CalendarWriter
+    from agent_calendar.json_agent_calendar import JSONAgentCalendar
+
+    # index the calendar file once here, the workers map the snapshot instead of loading the file each
+    snapshot_file = os.path.abspath(os.environ.get("HW_SCHEDULING_SNAPSHOT_FILE") or os.path.join(DATA_DIR, "calendar.snapshot"))
+    publisher = SnapshotPublisher(CALENDAR_JSON_FILE, snapshot_file)
+    publisher.publish()
+    os.environ["HW_SCHEDULING_SNAPSHOT_FILE"] = snapshot_file
+    publisher.start()
+
+    # the launcher owns the calendar file and its log, the workers send their bookings here
+    writer_socket = os.environ.get("HW_SCHEDULING_WRITER_SOCKET") or os.path.join(tempfile.gettempdir(), f"hw-scheduling-{os.getpid()}.sock")
+    writer = CalendarWriter(
+        writer_socket,
+        lambda client_id, agent_id, settings: JSONAgentCalendar(CALENDAR_JSON_FILE, TODO_JSON_FILE, client_id, agent_id, settings),
+        on_change=publisher.wake,
+    )
+    writer.start()
+    os.environ["HW_SCHEDULING_WRITER_SOCKET"] = writer_socket
+    try:
+        uvicorn.run("app:app", host=args.host, port=args.port, log_level="info", workers=args.workers)
+    finally:
+        writer.stop()
+
+
 if __name__ == "__main__":
-    uvicorn.run("app:app", port=8000, log_level="info", reload=True)
+    main()
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime, time, date
 from typing import List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 
 class CheckAvailabilityRequest(BaseModel):
@@ -31,6 +32,75 @@ class FindAvailableTimesResponse(BaseModel):
     available_times: List[datetime]
 
 
+class AgentAvailabilityQuery(BaseModel):
+    client_id: int
+    agent_id: int
+    time_ranges: List[TimeRange]
+
+
+class BatchCheckAvailabilityRequest(BaseModel):
+    queries: List[AgentAvailabilityQuery]
+
+
+class AgentAvailabilityResult(BaseModel):
+    client_id: int
+    agent_id: int
+    available: Optional[List[bool]] = None
+    error: Optional[str] = None
+
+
+class BatchCheckAvailabilityResponse(BaseModel):
+    results: List[AgentAvailabilityResult]
+
+
+class BatchFindAvailableTimesRequest(BaseModel):
+    queries: List[FindAvailableTimesRequest]
+
+
+class AgentAvailableTimesResult(BaseModel):
+    client_id: int
+    agent_id: int
+    available_times: Optional[List[datetime]] = None
+    error: Optional[str] = None
+
+
+class BatchFindAvailableTimesResponse(BaseModel):
+    results: List[AgentAvailableTimesResult]
+
+
+class TeamAvailabilityRequest(BaseModel):
+    client_id: int
+    agent_ids: List[int]
+    start_date_time: datetime
+    end_date_time: datetime
+    count: int = Field(gt=0)
+
+
+class TeamAvailabilityResponse(BaseModel):
+    agent_ids: List[int]
+
+
+class TeamAvailableTimesRequest(BaseModel):
+    client_id: int
+    agent_ids: List[int] = Field(min_length=1)
+    time_ranges: List[TimeRange]
+    duration_minutes: int = Field(gt=0)
+    count: int = Field(gt=0)
+    # also rank the agents by the free time they share with the rest of the team and return the top_k
+    top_k: Optional[int] = Field(default=None, gt=0)
+
+
+class AgentFreeTime(BaseModel):
+    agent_id: int
+    # summed over every other agent in the team
+    shared_free_minutes: int
+
+
+class TeamAvailableTimesResponse(BaseModel):
+    available_times: List[datetime]
+    top_agents: List[AgentFreeTime] = []
+
+
 class SuggestWorkRequest(BaseModel):
     client_id: int
     agent_id: int
@@ -52,6 +122,17 @@ class AgentCalendarSettings(BaseModel):
     working_hours: WorkingHours
     availability_increment: int = Field(default=15)
     max_bookings_per_day: int = Field(default=3)
+    # IANA timezone the working hours are given in
+    timezone: str = Field(default="UTC")
+
+    @field_validator("timezone")
+    @classmethod
+    def check_timezone(cls, value: str) -> str:
+        try:
+            ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown timezone {value!r}")
+        return value
 
 
 class AgentCalendarEvent(BaseModel):
@@ -62,6 +143,10 @@ class AgentCalendarEvent(BaseModel):
     summary: str
     description: Optional[str] = None
     location: Optional[str] = None
+    # RFC 5545 recurrence rule, e.g. "FREQ=WEEKLY;BYDAY=MO", repeating dtstart to dtend
+    rrule: Optional[str] = None
+    # starts of occurrences left out of the rule
+    exdate: List[datetime] = []
 
 
 class ICSEvent(BaseModel):
@@ -84,3 +169,47 @@ class ToDo(BaseModel):
     status: str
     client_id: int
     agent_id: int
+
+
+class BookEventRequest(BaseModel):
+    client_id: int
+    agent_id: int
+    uid: Optional[str] = None
+    start_date_time: datetime
+    end_date_time: datetime
+    summary: str
+    description: Optional[str] = None
+    location: Optional[str] = None
+
+
+class UpdateEventRequest(BaseModel):
+    client_id: int
+    agent_id: int
+    uid: str
+    start_date_time: datetime
+    end_date_time: datetime
+    summary: Optional[str] = None
+    description: Optional[str] = None
+    location: Optional[str] = None
+
+
+class CancelEventRequest(BaseModel):
+    client_id: int
+    agent_id: int
+    uid: str
+
+
+class EventResponse(BaseModel):
+    event: AgentCalendarEvent
+
+
+class FreeBusyRequest(BaseModel):
+    client_id: int
+    agent_id: int
+
+
+class FreeBusyResponse(BaseModel):
+    start: datetime
+    end: datetime
+    busy: List[TimeRange]
+    free: List[TimeRange]
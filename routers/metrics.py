@@ -0,0 +1,59 @@
+import logging
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from agent_calendar.metrics import REQUEST_DURATION, SLOW_REQUESTS, render
+from agent_calendar.sampling_profiler import SLOW_REQUEST_THRESHOLD_MS, format_stacks, get_profiler
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Returns the service metrics in the Prometheus text exposition format."""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency of every HTTP request by method, route and status.
+
+    When the slow request profiler is enabled, requests slower than its threshold are counted and their hottest
+    stacks are logged.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profiler = get_profiler()
+        started = profiler.request_started() if profiler else time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            # the route template rather than the path, so every request to a route shares its histogram
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            REQUEST_DURATION.observe(elapsed, scope["method"], route_path, str(status))
+            if profiler:
+                stacks = profiler.request_finished(started)
+                if elapsed * 1000 >= SLOW_REQUEST_THRESHOLD_MS:
+                    SLOW_REQUESTS.inc(route_path)
+                    logger.warning(f"Slow request {scope['method']} {route_path} took {elapsed * 1000:.1f} ms, hottest stacks:\n{format_stacks(stacks)}")
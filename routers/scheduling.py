@@ -1,16 +1,45 @@
+import asyncio
 import logging
+import uuid
+from collections import defaultdict
 
-from fastapi import APIRouter, HTTPException
-from datetime import timedelta
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from datetime import datetime, timedelta, timezone
+from pydantic_core import to_json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
 
+from agent_calendar.agent_calendar import AgentCalendar, CalendarConflictError, EventNotFoundError
 from agent_calendar.agent_calendar_factory import AgentCalendarFactory
+from agent_calendar.async_io import run_blocking
+from agent_calendar.interval_index import from_epoch_us
+from agent_calendar.team_search import TeamSchedule
 from models import (
+    AgentAvailabilityResult,
+    AgentAvailableTimesResult,
+    AgentFreeTime,
+    AgentCalendarEvent,
+    BatchCheckAvailabilityRequest,
+    BatchCheckAvailabilityResponse,
+    BatchFindAvailableTimesRequest,
+    BatchFindAvailableTimesResponse,
+    BookEventRequest,
+    CancelEventRequest,
     CheckAvailabilityRequest,
     CheckAvailabilityResponse,
+    EventResponse,
     FindAvailableTimesRequest,
     FindAvailableTimesResponse,
+    FreeBusyRequest,
+    FreeBusyResponse,
     SuggestWorkRequest,
     SuggestWorkResponse,
+    TeamAvailabilityRequest,
+    TeamAvailabilityResponse,
+    TeamAvailableTimesRequest,
+    TeamAvailableTimesResponse,
+    TimeRange,
+    UpdateEventRequest,
 )
 
 logger = logging.getLogger(__name__)
@@ -21,10 +50,10 @@ router = APIRouter(prefix="/scheduling", tags=["scheduling"])
 @router.post("/check", response_model=CheckAvailabilityResponse)
 async def check_availability(request: CheckAvailabilityRequest):
     try:
-        agent_calendar = AgentCalendarFactory.create_calendar(client_id=request.client_id, agent_id=request.agent_id)
+        agent_calendar = await AgentCalendarFactory.create_calendar_async(client_id=request.client_id, agent_id=request.agent_id)
         if not agent_calendar:
             raise HTTPException(status_code=404, detail="Agent calendar not found")
-        available = agent_calendar.is_time_available(start_time=request.start_date_time, end_time=request.end_date_time)
+        available = await agent_calendar.is_time_available_async(start_time=request.start_date_time, end_time=request.end_date_time)
         return CheckAvailabilityResponse(available=available)
     except ValueError as e:
         logger.error(f"Error checking availability: {e}", exc_info=True)
@@ -37,12 +66,12 @@ async def check_availability(request: CheckAvailabilityRequest):
 @router.post("/available", response_model=FindAvailableTimesResponse)
 async def find_available_times(request: FindAvailableTimesRequest):
     try:
-        agent_calendar = AgentCalendarFactory.create_calendar(client_id=request.client_id, agent_id=request.agent_id)
+        agent_calendar = await AgentCalendarFactory.create_calendar_async(client_id=request.client_id, agent_id=request.agent_id)
         if not agent_calendar:
             raise HTTPException(status_code=404, detail="Agent calendar not found")
 
         duration = timedelta(minutes=request.duration_minutes)
-        available_times = agent_calendar.find_available_slots(request.time_ranges, duration, request.count)
+        available_times = await agent_calendar.find_available_slots_async(request.time_ranges, duration, request.count)
         if not available_times:
             raise HTTPException(status_code=404, detail="No available time slots found")
         return FindAvailableTimesResponse(available_times=available_times)
@@ -57,11 +86,11 @@ async def find_available_times(request: FindAvailableTimesRequest):
 @router.post("/recommend", response_model=SuggestWorkResponse)
 async def recommend_work(request: SuggestWorkRequest):
     try:
-        agent_calendar = AgentCalendarFactory.create_calendar(client_id=request.client_id, agent_id=request.agent_id)
+        agent_calendar = await AgentCalendarFactory.create_calendar_async(client_id=request.client_id, agent_id=request.agent_id)
         if not agent_calendar:
             raise HTTPException(status_code=404, detail="Agent calendar not found")
 
-        suggestions = agent_calendar.recommend_work_from_todo()
+        suggestions = await agent_calendar.recommend_work_from_todo_async()
         return SuggestWorkResponse(suggestions=suggestions)
     except ValueError as e:
         logger.error(f"Error recommending work: {e}", exc_info=True)
@@ -69,3 +98,259 @@ async def recommend_work(request: SuggestWorkRequest):
     except Exception as e:
         logger.error(f"Error recommending work: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
+
+
+async def _stream_calendar(client_id: int, agent_id: int) -> AgentCalendar:
+    """Loads an agent's calendar before a streamed response starts, while errors can still change the status code."""
+    try:
+        agent_calendar = await AgentCalendarFactory.create_calendar_async(client_id=client_id, agent_id=agent_id)
+    except ValueError as e:
+        logger.error(f"Error loading agent calendar: {e}", exc_info=True)
+        raise HTTPException(status_code=404, detail="Agent calendar not found")
+    except Exception as e:
+        logger.error(f"Error loading agent calendar: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+    if not agent_calendar:
+        raise HTTPException(status_code=404, detail="Agent calendar not found")
+    return agent_calendar
+
+
+async def _ndjson_lines(http_request: Request, chunks: AsyncIterator[List[Any]], field: str) -> AsyncIterator[bytes]:
+    """
+    Encodes each item as a {field: item} JSON line, sending every chunk as soon as it is found.
+
+    The search stops once the client disconnects. Errors after the response started are sent as an {"error": ...} line.
+    """
+    try:
+        async for chunk in chunks:
+            yield b"".join(to_json({field: item}) + b"\n" for item in chunk)
+            if await http_request.is_disconnected():
+                break
+    except Exception as e:
+        logger.error(f"Error streaming results: {e}", exc_info=True)
+        yield to_json({"error": "Internal server error"}) + b"\n"
+    finally:
+        await chunks.aclose()
+
+
+@router.post("/available/stream")
+async def stream_available_times(request: FindAvailableTimesRequest, http_request: Request):
+    """Streams the available start times of /available as newline delimited JSON, {"available_time": ...} per line."""
+    agent_calendar = await _stream_calendar(request.client_id, request.agent_id)
+    chunks = agent_calendar.iter_available_slots_async(request.time_ranges, timedelta(minutes=request.duration_minutes), request.count)
+    return StreamingResponse(_ndjson_lines(http_request, chunks, "available_time"), media_type="application/x-ndjson")
+
+
+@router.post("/recommend/stream")
+async def stream_recommended_work(request: SuggestWorkRequest, http_request: Request):
+    """Streams the suggestions of /recommend as newline delimited JSON, {"suggestion": ...} per line."""
+    agent_calendar = await _stream_calendar(request.client_id, request.agent_id)
+    chunks = agent_calendar.iter_work_recommendations_async()
+    return StreamingResponse(_ndjson_lines(http_request, chunks, "suggestion"), media_type="application/x-ndjson")
+
+
+@router.post("/freebusy", response_model=FreeBusyResponse)
+async def free_busy(request: FreeBusyRequest):
+    """Returns the agent's busy blocks and free working time from today to the end of the free/busy horizon."""
+    try:
+        agent_calendar = await AgentCalendarFactory.create_calendar_async(client_id=request.client_id, agent_id=request.agent_id)
+        if not agent_calendar:
+            raise HTTPException(status_code=404, detail="Agent calendar not found")
+
+        view = await agent_calendar.free_busy_async()
+        tzinfo = agent_calendar.working_windows.timezone
+        return FreeBusyResponse(
+            start=from_epoch_us(view.start, tzinfo),
+            end=from_epoch_us(view.end, tzinfo),
+            busy=[TimeRange(start=from_epoch_us(start, tzinfo), end=from_epoch_us(end, tzinfo)) for start, end in view.busy_blocks()],
+            free=[TimeRange(start=from_epoch_us(start, tzinfo), end=from_epoch_us(end, tzinfo)) for start, end in view.free_intervals()],
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        logger.error(f"Error looking up free/busy: {e}", exc_info=True)
+        raise HTTPException(status_code=404, detail="Agent calendar not found")
+    except Exception as e:
+        logger.error(f"Error looking up free/busy: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+async def _load_calendar(client_id: int, agent_id: int) -> Tuple[Optional[AgentCalendar], Optional[str]]:
+    """Loads an agent's calendar, returning the error message for the batch result instead of raising."""
+    try:
+        agent_calendar = await AgentCalendarFactory.create_calendar_async(client_id=client_id, agent_id=agent_id)
+        if not agent_calendar:
+            return None, "Agent calendar not found"
+        return agent_calendar, None
+    except ValueError as e:
+        logger.error(f"Error loading agent calendar: {e}", exc_info=True)
+        return None, "Agent calendar not found"
+    except Exception as e:
+        logger.error(f"Error loading agent calendar: {e}", exc_info=True)
+        return None, "Internal server error"
+
+
+async def _load_calendars(keys: Iterable[Tuple[int, int]]) -> Tuple[Dict[Tuple[int, int], AgentCalendar], Dict[Tuple[int, int], str]]:
+    """Loads each distinct agent's calendar once, collecting per agent errors instead of failing the whole batch."""
+    keys = list(dict.fromkeys(keys))
+    loaded = await asyncio.gather(*(_load_calendar(client_id, agent_id) for client_id, agent_id in keys))
+    calendars = {}
+    errors = {}
+    for key, (agent_calendar, error) in zip(keys, loaded):
+        if agent_calendar is None:
+            errors[key] = error
+        else:
+            calendars[key] = agent_calendar
+    return calendars, errors
+
+
+@router.post("/batch/check", response_model=BatchCheckAvailabilityResponse)
+async def check_availability_batch(request: BatchCheckAvailabilityRequest):
+    calendars, errors = await _load_calendars((query.client_id, query.agent_id) for query in request.queries)
+
+    results = []
+    for query in request.queries:
+        result = AgentAvailabilityResult(client_id=query.client_id, agent_id=query.agent_id)
+        agent_calendar = calendars.get((query.client_id, query.agent_id))
+        if agent_calendar is None:
+            result.error = errors[(query.client_id, query.agent_id)]
+        else:
+            try:
+                result.available = await agent_calendar.check_availability_batch_async(query.time_ranges)
+            except Exception as e:
+                logger.error(f"Error checking availability: {e}", exc_info=True)
+                result.error = "Internal server error"
+        results.append(result)
+    return BatchCheckAvailabilityResponse(results=results)
+
+
+@router.post("/batch/available", response_model=BatchFindAvailableTimesResponse)
+async def find_available_times_batch(request: BatchFindAvailableTimesRequest):
+    calendars, errors = await _load_calendars((query.client_id, query.agent_id) for query in request.queries)
+
+    # group the queries per agent so each calendar answers all of its searches in one call
+    positions: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for position, query in enumerate(request.queries):
+        positions[(query.client_id, query.agent_id)].append(position)
+
+    results: List[AgentAvailableTimesResult] = [AgentAvailableTimesResult(client_id=query.client_id, agent_id=query.agent_id) for query in request.queries]
+    for key, agent_positions in positions.items():
+        agent_calendar = calendars.get(key)
+        if agent_calendar is None:
+            for position in agent_positions:
+                results[position].error = errors[key]
+            continue
+
+        searches = [(request.queries[position].time_ranges, timedelta(minutes=request.queries[position].duration_minutes), request.queries[position].count) for position in agent_positions]
+        try:
+            available_times = await agent_calendar.find_available_slots_batch_async(searches)
+        except Exception as e:
+            logger.error(f"Error finding available times: {e}", exc_info=True)
+            for position in agent_positions:
+                results[position].error = "Internal server error"
+            continue
+        for position, times in zip(agent_positions, available_times):
+            results[position].available_times = times
+    return BatchFindAvailableTimesResponse(results=results)
+
+
+@router.post("/team/check", response_model=TeamAvailabilityResponse)
+async def find_available_team_members(request: TeamAvailabilityRequest):
+    """Returns the first count agents, in the requested order, that are free for the whole window."""
+    try:
+        available_agent_ids = []
+        for agent_id in dict.fromkeys(request.agent_ids):
+            agent_calendar, _ = await _load_calendar(request.client_id, agent_id)
+            if agent_calendar is None:
+                # agents without a calendar cannot take the appointment, keep looking
+                continue
+            if await agent_calendar.is_time_available_async(start_time=request.start_date_time, end_time=request.end_date_time):
+                available_agent_ids.append(agent_id)
+                if len(available_agent_ids) >= request.count:
+                    break
+        return TeamAvailabilityResponse(agent_ids=available_agent_ids)
+    except Exception as e:
+        logger.error(f"Error finding available team members: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.post("/team/available", response_model=TeamAvailableTimesResponse)
+async def find_team_available_times(request: TeamAvailableTimesRequest):
+    """Returns the first count start times at which every agent is free, and optionally the top_k agents sharing the most free time with the rest of the team."""
+    agent_ids = list(dict.fromkeys(request.agent_ids))
+    calendars, errors = await _load_calendars((request.client_id, agent_id) for agent_id in agent_ids)
+    for (_, agent_id), error in errors.items():
+        # every agent has to attend, so a missing calendar fails the whole search
+        raise HTTPException(status_code=404 if error == "Agent calendar not found" else 500, detail=f"{error} for agent {agent_id}")
+
+    duration = timedelta(minutes=request.duration_minutes)
+
+    def search() -> TeamAvailableTimesResponse:
+        team = TeamSchedule({agent_id: calendars[(request.client_id, agent_id)] for agent_id in agent_ids}, request.time_ranges)
+        top_agents = team.top_agents(duration, request.top_k) if request.top_k else []
+        return TeamAvailableTimesResponse(
+            available_times=team.common_slots(duration, request.count),
+            top_agents=[AgentFreeTime(agent_id=agent_id, shared_free_minutes=free_time // timedelta(minutes=1)) for agent_id, free_time in top_agents],
+        )
+
+    try:
+        return await run_blocking(search)
+    except Exception as e:
+        logger.error(f"Error finding team available times: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+async def _change_event(client_id: int, agent_id: int, change: Callable[[AgentCalendar], Awaitable[AgentCalendarEvent]]) -> EventResponse:
+    """Applies a change to an agent's calendar, mapping booking errors to HTTP errors."""
+    try:
+        agent_calendar = await AgentCalendarFactory.create_calendar_async(client_id=client_id, agent_id=agent_id)
+    except ValueError as e:
+        logger.error(f"Error loading agent calendar: {e}", exc_info=True)
+        raise HTTPException(status_code=404, detail="Agent calendar not found")
+    if not agent_calendar:
+        raise HTTPException(status_code=404, detail="Agent calendar not found")
+
+    try:
+        return EventResponse(event=await change(agent_calendar))
+    except CalendarConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except EventNotFoundError:
+        raise HTTPException(status_code=404, detail="Event not found")
+    except NotImplementedError:
+        raise HTTPException(status_code=501, detail="The calendar does not support changes")
+    except Exception as e:
+        logger.error(f"Error changing calendar event: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.post("/events/book", response_model=EventResponse)
+async def book_event(request: BookEventRequest):
+    """Books an event if the agent is available for the whole of it."""
+    event = AgentCalendarEvent(
+        uid=request.uid or f"{uuid.uuid4()}@hw-scheduling",
+        dtstamp=datetime.now(timezone.utc),
+        dtstart=request.start_date_time,
+        dtend=request.end_date_time,
+        summary=request.summary,
+        description=request.description,
+        location=request.location,
+    )
+    return await _change_event(request.client_id, request.agent_id, lambda agent_calendar: agent_calendar.create_event_async(event))
+
+
+@router.post("/events/update", response_model=EventResponse)
+async def update_event(request: UpdateEventRequest):
+    """Moves an event, and optionally changes its details, if the agent is available at the new time."""
+    return await _change_event(
+        request.client_id,
+        request.agent_id,
+        lambda agent_calendar: agent_calendar.update_event_async(
+            request.uid, request.start_date_time, request.end_date_time, summary=request.summary, description=request.description, location=request.location
+        ),
+    )
+
+
+@router.post("/events/cancel", response_model=EventResponse)
+async def cancel_event(request: CancelEventRequest):
+    """Removes an event from the agent's calendar."""
+    return await _change_event(request.client_id, request.agent_id, lambda agent_calendar: agent_calendar.cancel_event_async(request.uid))
@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import datetime as dt
+import shutil
+from datetime import datetime
+from typing import Optional
+
+import pytest
+
+from agent_calendar.agent_calendar_settings import get_agent_calendar_settings
+from agent_calendar.json_agent_calendar import JSONAgentCalendar
+from models import AgentCalendarEvent, AgentCalendarSettings
+
+
+def utc(value: str) -> datetime:
+    return datetime.fromisoformat(value).replace(tzinfo=dt.timezone.utc)
+
+
+def create_calendar(
+    calendar_json_file: str, agent_id: int = 1, snapshot=None, settings: Optional[AgentCalendarSettings] = None, **options
+) -> JSONAgentCalendar:
+    """A JSON calendar of client 1, with the agent's settings from data/agent_calendar_settings.json unless given."""
+    if settings is None:
+        settings = get_agent_calendar_settings(client_id=1, agent_id=agent_id)
+    return JSONAgentCalendar(
+        calendar_json_file=calendar_json_file,
+        todo_json_file="data/todo.json",
+        client_id=1,
+        agent_id=agent_id,
+        calendar_settings=settings,
+        snapshot=snapshot,
+        **options,
+    )
+
+
+def booking(uid: str, start: str, end: str) -> AgentCalendarEvent:
+    return AgentCalendarEvent(uid=uid, dtstamp=utc("2025-04-01T00:00:00"), dtstart=utc(start), dtend=utc(end), summary="Booked")
+
+
+@pytest.fixture
+def calendar_json_file(tmp_path):
+    """A copy of data/ics_data.json that tests may book into."""
+    path = tmp_path / "ics_data.json"
+    shutil.copy("data/ics_data.json", path)
+    return str(path)
@@ -1,9 +1,12 @@
 import sys
+import json
 from pathlib import Path
 
+import pytest
+
 sys.path.append(str(Path(__file__).parent.parent))
 
-from agent_calendar.agent_calendar_settings import get_agent_calendar_settings
+from agent_calendar.agent_calendar_settings import AgentCalendarSettingsIndex, get_agent_calendar_settings, reload_agent_calendar_settings
 
 
 def test_get_agent_calendar_settings():
@@ -13,3 +16,60 @@ def test_get_agent_calendar_settings():
     assert settings.client_id == client_id
     assert settings.agent_id == agent_id
     assert settings.calendar_type == "json"
+
+
+def test_get_agent_calendar_settings_is_cached():
+    first = get_agent_calendar_settings(1, 1)
+    second = get_agent_calendar_settings(1, 1)
+    assert first is second
+
+
+def test_agent_calendar_settings_index_duplicates_and_missing():
+    settings = [
+        {"client_id": 1, "agent_id": 1, "calendar_type": "json", "working_hours": {"start": "09:00", "end": "17:00"}},
+        {"client_id": 1, "agent_id": 2, "calendar_type": "json", "working_hours": {"start": "09:00", "end": "17:00"}},
+        {"client_id": 1, "agent_id": 2, "calendar_type": "json", "working_hours": {"start": "10:00", "end": "18:00"}},
+    ]
+    index = AgentCalendarSettingsIndex(settings)
+    assert index.get(1, 1).working_hours.end.hour == 17
+    with pytest.raises(ValueError, match="Multiple settings"):
+        index.get(1, 2)
+    with pytest.raises(ValueError, match="No settings"):
+        index.get(2, 1)
+
+
+def test_reload_agent_calendar_settings_swaps_index(tmp_path):
+    path = tmp_path / "agent_calendar_settings.json"
+    path.write_text(json.dumps([{"client_id": 7, "agent_id": 7, "calendar_type": "json", "working_hours": {"start": "08:00", "end": "16:00"}}]))
+    try:
+        reload_agent_calendar_settings(str(path))
+        assert get_agent_calendar_settings(7, 7).working_hours.start.hour == 8
+        with pytest.raises(ValueError):
+            get_agent_calendar_settings(1, 1)
+    finally:
+        reload_agent_calendar_settings()
+    assert get_agent_calendar_settings(1, 1).agent_id == 1
+
+
+def test_failed_hot_reload_keeps_the_previous_settings(tmp_path, monkeypatch):
+    import agent_calendar.agent_calendar_settings as agent_calendar_settings
+
+    path = tmp_path / "agent_calendar_settings.json"
+    path.write_text(json.dumps([{"client_id": 7, "agent_id": 7, "calendar_type": "json", "working_hours": {"start": "08:00", "end": "16:00"}}]))
+    monkeypatch.setattr(agent_calendar_settings, "RELOAD_CHECK_INTERVAL_SECONDS", 0)
+    try:
+        reload_agent_calendar_settings(str(path))
+        # a record without its key and a file that is not a list of records
+        for content in ['[{"agent_id": 7}]', "7"]:
+            path.write_text(content)
+            assert get_agent_calendar_settings(7, 7).working_hours.start.hour == 8
+    finally:
+        reload_agent_calendar_settings()
+
+
+def test_settings_load_on_first_lookup():
+    import subprocess
+
+    # a fresh interpreter, so the module is imported without any earlier lookup
+    script = "import agent_calendar.agent_calendar_settings as s; assert s._settings_index is None; s.get_agent_calendar_settings(1, 1); assert s._settings_index is not None"
+    subprocess.run([sys.executable, "-c", script], cwd=Path(__file__).parent.parent, check=True)
@@ -14,6 +14,7 @@ sys.path.append(str(Path(__file__).parent.parent))
 from agent_calendar.agent_calendar_settings import get_agent_calendar_settings
 from agent_calendar.json_agent_calendar import JSONAgentCalendar
 import datetime as dt
+import json
 from datetime import datetime
 
 
@@ -114,3 +115,58 @@ def test_recommend_work_from_todo():
     suggestions = calendar.recommend_work_from_todo()
     assert len(suggestions) > 0
     assert isinstance(suggestions[0], str)
+
+
+def test_agent_json_calendar_event_store():
+    # get calendar settings
+    settings = get_agent_calendar_settings(client_id=1, agent_id=1)
+
+    # create a JSONAgentCalendar instance
+    calendar = JSONAgentCalendar(
+        calendar_json_file="data/ics_data.json",
+        todo_json_file="data/todo.json",
+        client_id=1,
+        agent_id=1,
+        calendar_settings=settings,
+    )
+
+    # availability works off the compact arrays, the models are only built on access
+    events = calendar.events
+    assert len(calendar.event_store) == len(events)
+    assert [event.dtstart for event in events] == sorted(event.dtstart for event in events)
+    assert calendar.event_store.event(0) == events[0]
+
+
+def test_working_hours_follow_the_agent_timezone():
+    settings = get_agent_calendar_settings(client_id=1, agent_id=1).model_copy(update={"timezone": "America/New_York"})
+    calendar = JSONAgentCalendar(
+        calendar_json_file="data/ics_data.json",
+        todo_json_file="data/todo.json",
+        client_id=1,
+        agent_id=1,
+        calendar_settings=settings,
+    )
+
+    # working hours start at 09:00 in New York, 13:00 UTC during daylight saving time
+    start_time = datetime.fromisoformat("2025-04-03T13:00:00").replace(tzinfo=dt.timezone.utc)
+    assert calendar.is_time_available(start_time=start_time, end_time=start_time + dt.timedelta(hours=1)) is True
+    start_time = datetime.fromisoformat("2025-04-03T09:00:00").replace(tzinfo=dt.timezone.utc)
+    assert calendar.is_time_available(start_time=start_time, end_time=start_time + dt.timedelta(hours=1)) is False
+
+
+def test_todo_tasks_are_sorted_by_priority_rank(tmp_path):
+    due_date = dt.date.today().isoformat()
+    todos = [
+        {"id": number, "task": f"{priority} task", "due_date": due_date, "priority": priority, "status": "Pending", "client_id": 1, "agent_id": 1}
+        for number, priority in enumerate(["Low", "High", "Medium"])
+    ]
+    todo_json_file = tmp_path / "todo.json"
+    todo_json_file.write_text(json.dumps(todos))
+    calendar = JSONAgentCalendar(
+        calendar_json_file="data/ics_data.json",
+        todo_json_file=str(todo_json_file),
+        client_id=1,
+        agent_id=1,
+        calendar_settings=get_agent_calendar_settings(client_id=1, agent_id=1),
+    )
+    assert [task.priority for task in calendar.todo_tasks] == ["High", "Medium", "Low"]
@@ -0,0 +1,57 @@
+import sys
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agent_calendar.agent_calendar_factory import AgentCalendarFactory
+from agent_calendar.async_io import RequestCoalescer
+
+
+def test_request_coalescer_shares_in_flight_call():
+    coalescer = RequestCoalescer(max_concurrency=4)
+    calls = []
+
+    def load(key):
+        calls.append(key)
+        time.sleep(0.05)
+        return object()
+
+    async def run():
+        return await asyncio.gather(coalescer.run("a", load, "a"), coalescer.run("a", load, "a"), coalescer.run("b", load, "b"))
+
+    first, second, third = asyncio.run(run())
+    assert first is second
+    assert third is not first
+    assert sorted(calls) == ["a", "b"]
+
+
+def test_request_coalescer_limits_concurrency():
+    coalescer = RequestCoalescer(max_concurrency=2)
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def load():
+        with lock:
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    async def run():
+        await asyncio.gather(*(coalescer.run(key, load) for key in range(6)))
+
+    asyncio.run(run())
+    assert running[1] == 2
+
+
+def test_create_calendar_async():
+    async def run():
+        return await AgentCalendarFactory.create_calendar_async(client_id=1, agent_id=1)
+
+    agent_calendar = asyncio.run(run())
+    assert agent_calendar.agent_id == 1
+    assert asyncio.run(agent_calendar.recommend_work_from_todo_async()) == agent_calendar.recommend_work_from_todo()
@@ -0,0 +1,83 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import datetime as dt
+
+import pytest
+
+from agent_calendar.agent_calendar import CalendarConflictError
+from agent_calendar.agent_calendar_settings import get_agent_calendar_settings
+from agent_calendar.booking_counts import DailyBookingCounts
+from agent_calendar.interval_index import to_epoch_us
+from agent_calendar.sqlite_agent_calendar import SQLiteAgentCalendar, import_json_data
+from agent_calendar.working_windows import DAY_US, get_working_windows
+from conftest import booking, create_calendar, utc
+from models import AgentCalendarSettings, TimeRange, WorkingHours
+
+
+def capped_settings(max_bookings_per_day: int) -> AgentCalendarSettings:
+    # agent 1 has two events on 2025-04-05 and one on 2025-04-01
+    return get_agent_calendar_settings(client_id=1, agent_id=1).model_copy(update={"max_bookings_per_day": max_bookings_per_day})
+
+
+def test_daily_booking_counts():
+    counts = DailyBookingCounts(get_working_windows(WorkingHours(start=dt.time(9), end=dt.time(17))), [0, DAY_US - 1, DAY_US, 5 * DAY_US])
+    assert counts.count(0) == 2 and counts.count(1) == 1 and counts.count(2) == 0
+    assert list(counts.full_days(0, 10 * DAY_US, 1)) == [(0, DAY_US), (DAY_US, 2 * DAY_US), (5 * DAY_US, 6 * DAY_US)]
+    assert list(counts.full_days(DAY_US, 5 * DAY_US, 1)) == [(DAY_US, 2 * DAY_US)]
+
+    counts.remove(0)
+    counts.add(3 * DAY_US)
+    assert list(counts.full_days(0, 1000 * DAY_US, 1)) == [(0, DAY_US), (DAY_US, 2 * DAY_US), (3 * DAY_US, 4 * DAY_US), (5 * DAY_US, 6 * DAY_US)]
+    assert counts.count(0) == 1
+
+
+def test_daily_booking_counts_follow_the_agent_timezone():
+    # 2025-04-01T23:30 UTC is already 2025-04-02 in Tokyo
+    windows = get_working_windows(WorkingHours(start=dt.time(9), end=dt.time(17)), "Asia/Tokyo")
+    counts = DailyBookingCounts(windows, [to_epoch_us(utc("2025-04-01T23:30:00")), to_epoch_us(utc("2025-04-02T02:00:00"))])
+    assert list(counts.full_days(to_epoch_us(utc("2025-03-30T00:00:00")), to_epoch_us(utc("2025-04-05T00:00:00")), 2)) == [
+        (to_epoch_us(utc("2025-04-01T15:00:00")), to_epoch_us(utc("2025-04-02T15:00:00")))
+    ]
+
+
+def test_full_days_are_unavailable(calendar_json_file):
+    calendar = create_calendar(calendar_json_file, settings=capped_settings(2))
+    assert calendar.is_time_available(utc("2025-04-05T09:00:00"), utc("2025-04-05T09:30:00")) is False
+    assert calendar.is_time_available(utc("2025-04-01T18:00:00"), utc("2025-04-01T18:30:00")) is True
+
+    uncapped = create_calendar(calendar_json_file, settings=capped_settings(100))
+    time_ranges = [TimeRange(start=utc("2025-04-01T00:00:00"), end=utc("2025-04-08T00:00:00"))]
+    expected = [slot for slot in uncapped.find_available_slots(time_ranges, dt.timedelta(minutes=45), 1000) if slot.date() != dt.date(2025, 4, 5)]
+    for vectorized in [False, True]:
+        capped = create_calendar(calendar_json_file, settings=capped_settings(2), vectorized=vectorized)
+        assert capped.find_available_slots(time_ranges, dt.timedelta(minutes=45), 1000) == expected
+
+
+def test_bookings_update_the_counts(calendar_json_file):
+    calendar = create_calendar(calendar_json_file, settings=capped_settings(2))
+    event = booking("booked-1", "2025-04-01T18:00:00", "2025-04-01T18:30:00")
+    calendar.create_event(event)
+    assert calendar.booking_counts.count(to_epoch_us(utc("2025-04-01T00:00:00")) // DAY_US) == 2
+    assert calendar.is_time_available(utc("2025-04-01T19:00:00"), utc("2025-04-01T19:30:00")) is False
+    with pytest.raises(CalendarConflictError):
+        calendar.create_event(event.model_copy(update={"uid": "booked-2", "dtstart": utc("2025-04-01T19:00:00"), "dtend": utc("2025-04-01T19:30:00")}))
+
+    # moving the booking within its day does not count it twice
+    calendar.update_event("booked-1", utc("2025-04-01T19:00:00"), utc("2025-04-01T19:30:00"))
+    calendar.cancel_event("booked-1")
+    assert calendar.is_time_available(utc("2025-04-01T19:00:00"), utc("2025-04-01T19:30:00")) is True
+
+
+def test_sqlite_honours_the_cap(tmp_path, calendar_json_file):
+    db_path = str(tmp_path / "calendar.db")
+    import_json_data(db_path, calendar_json_file, "data/todo.json")
+    json_calendar = create_calendar(calendar_json_file, settings=capped_settings(2))
+    sqlite_calendar = SQLiteAgentCalendar(db_path=db_path, client_id=1, agent_id=1, calendar_settings=json_calendar.calendar_settings)
+
+    assert sqlite_calendar.is_time_available(utc("2025-04-05T09:00:00"), utc("2025-04-05T09:30:00")) is False
+    time_ranges = [TimeRange(start=utc("2025-04-01T00:00:00"), end=utc("2025-04-08T00:00:00"))]
+    expected = json_calendar.find_available_slots(time_ranges, dt.timedelta(minutes=45), 1000)
+    assert sqlite_calendar.find_available_slots(time_ranges, dt.timedelta(minutes=45), 1000) == expected
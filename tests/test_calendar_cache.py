@@ -0,0 +1,74 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agent_calendar.agent_calendar_factory import AgentCalendarFactory
+from agent_calendar.calendar_cache import CalendarCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_calendar_cache_hit_and_miss():
+    cache = CalendarCache(max_size=2)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return object()
+
+    first = cache.get_or_load((1, 1), "stamp", loader)
+    second = cache.get_or_load((1, 1), "stamp", loader)
+
+    assert first is second
+    assert len(loads) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_calendar_cache_reloads_on_stamp_or_version_change():
+    cache = CalendarCache(max_size=2)
+    first = cache.get_or_load((1, 1), "v1", object)
+    second = cache.get_or_load((1, 1), "v2", object)
+    assert first is not second
+
+    cache.bump_version()
+    third = cache.get_or_load((1, 1), "v2", object)
+    assert third is not second
+    assert cache.stats()["misses"] == 3
+
+
+def test_calendar_cache_evicts_least_recently_used():
+    cache = CalendarCache(max_size=2)
+    first = cache.get_or_load((1, 1), "stamp", object)
+    cache.get_or_load((1, 2), "stamp", object)
+    # touch (1, 1) so (1, 2) becomes the least recently used entry
+    cache.get_or_load((1, 1), "stamp", object)
+    cache.get_or_load((1, 3), "stamp", object)
+
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+    assert cache.get_or_load((1, 1), "stamp", object) is first
+
+
+def test_calendar_cache_ttl_expiry():
+    clock = FakeClock()
+    cache = CalendarCache(max_size=2, ttl_seconds=10, clock=clock)
+    first = cache.get_or_load((1, 1), "stamp", object)
+    clock.now = 5
+    assert cache.get_or_load((1, 1), "stamp", object) is first
+    clock.now = 20
+    assert cache.get_or_load((1, 1), "stamp", object) is not first
+
+
+def test_factory_reuses_cached_calendar():
+    first = AgentCalendarFactory.create_calendar(client_id=1, agent_id=1)
+    second = AgentCalendarFactory.create_calendar(client_id=1, agent_id=1)
+    assert first is second
+    assert AgentCalendarFactory.cache_stats()["hits"] >= 1
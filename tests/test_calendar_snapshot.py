@@ -0,0 +1,91 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from datetime import timedelta
+
+import pytest
+
+from agent_calendar.agent_calendar import CalendarConflictError, EventNotFoundError
+from agent_calendar.calendar_snapshot import build_snapshot, get_snapshot
+from agent_calendar.calendar_writer import CalendarWriter
+from conftest import booking, create_calendar, utc
+from models import TimeRange
+
+
+def test_snapshot_matches_the_calendar_file(calendar_json_file, tmp_path):
+    # logged changes are part of the snapshot
+    create_calendar(calendar_json_file, 1).create_event(booking("snapshot-1", "2025-04-03T09:00:00", "2025-04-03T10:00:00"))
+    snapshot_file = str(tmp_path / "calendar.snapshot")
+    build_snapshot(calendar_json_file, snapshot_file)
+    snapshot = get_snapshot(snapshot_file)
+
+    time_ranges = [TimeRange(start=utc("2025-04-01T00:00:00"), end=utc("2025-04-15T00:00:00"))]
+    for client_id, agent_id in snapshot.keys():
+        if client_id != 1:
+            continue
+        loaded = create_calendar(calendar_json_file, agent_id)
+        shared = create_calendar(calendar_json_file, agent_id, snapshot)
+        assert list(shared.event_store.intervals()) == list(loaded.event_store.intervals())
+        assert shared.busy_index.blocks() == loaded.busy_index.blocks()
+        assert shared.events == loaded.events
+        assert shared.find_available_slots(time_ranges, timedelta(minutes=30), 20) == loaded.find_available_slots(time_ranges, timedelta(minutes=30), 20)
+    assert any(event.uid == "snapshot-1" for event in create_calendar(calendar_json_file, 1, snapshot).events)
+
+
+def test_snapshot_calendars_are_read_only(calendar_json_file, tmp_path):
+    snapshot_file = str(tmp_path / "calendar.snapshot")
+    build_snapshot(calendar_json_file, snapshot_file)
+    calendar = create_calendar(calendar_json_file, 1, get_snapshot(snapshot_file))
+    with pytest.raises(NotImplementedError):
+        calendar.create_event(booking("snapshot-2", "2025-04-03T09:00:00", "2025-04-03T10:00:00"))
+    with pytest.raises(NotImplementedError):
+        calendar.cancel_event(calendar.events[0].uid)
+
+
+def test_workers_move_to_a_replaced_snapshot(calendar_json_file, tmp_path):
+    snapshot_file = str(tmp_path / "calendar.snapshot")
+    build_snapshot(calendar_json_file, snapshot_file)
+    old_snapshot = get_snapshot(snapshot_file)
+    old_calendar = create_calendar(calendar_json_file, 1, old_snapshot)
+    assert get_snapshot(snapshot_file) is old_snapshot
+
+    create_calendar(calendar_json_file, 1).create_event(booking("snapshot-3", "2025-04-03T09:00:00", "2025-04-03T10:00:00"))
+    build_snapshot(calendar_json_file, snapshot_file)
+    new_snapshot = get_snapshot(snapshot_file)
+    assert new_snapshot is not old_snapshot and new_snapshot.stamp != old_snapshot.stamp
+    assert any(event.uid == "snapshot-3" for event in create_calendar(calendar_json_file, 1, new_snapshot).events)
+    # calendars on the old mapping keep working
+    assert all(event.uid != "snapshot-3" for event in old_calendar.events)
+
+
+def test_snapshot_calendars_send_changes_to_the_writer(calendar_json_file, tmp_path):
+    snapshot_file = str(tmp_path / "calendar.snapshot")
+    build_snapshot(calendar_json_file, snapshot_file)
+    changes = []
+    writer = CalendarWriter(
+        str(tmp_path / "writer.sock"),
+        lambda client_id, agent_id, settings: create_calendar(calendar_json_file, agent_id),
+        on_change=lambda: changes.append(True),
+    )
+    writer.start()
+    try:
+        calendar = create_calendar(calendar_json_file, 1, get_snapshot(snapshot_file), writer_socket=writer.socket_path)
+        created = calendar.create_event(booking("snapshot-4", "2025-04-03T09:00:00", "2025-04-03T10:00:00"))
+        assert created.uid == "snapshot-4"
+        with pytest.raises(CalendarConflictError):
+            calendar.create_event(booking("snapshot-5", "2025-04-03T09:30:00", "2025-04-03T10:30:00"))
+        moved = calendar.update_event("snapshot-4", utc("2025-04-03T11:00:00"), utc("2025-04-03T12:00:00"), summary="Moved")
+        assert moved.dtstart == utc("2025-04-03T11:00:00") and moved.summary == "Moved"
+        with pytest.raises(EventNotFoundError):
+            calendar.cancel_event("missing")
+        assert len(changes) == 2
+
+        # the next snapshot has the changes
+        build_snapshot(calendar_json_file, snapshot_file)
+        shared = create_calendar(calendar_json_file, 1, get_snapshot(snapshot_file))
+        assert not shared.is_time_available(utc("2025-04-03T11:00:00"), utc("2025-04-03T11:30:00"))
+        assert shared.is_time_available(utc("2025-04-03T09:00:00"), utc("2025-04-03T09:30:00"))
+    finally:
+        writer.stop()
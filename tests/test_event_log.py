@@ -0,0 +1,108 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import datetime as dt
+import json
+
+import pytest
+
+from agent_calendar.agent_calendar import CalendarConflictError, EventNotFoundError
+from agent_calendar.event_log import get_event_log
+from agent_calendar.interval_index import IntervalIndex
+from agent_calendar.json_agent_calendar import JSONAgentCalendar
+from conftest import booking, create_calendar, utc
+from models import TimeRange
+
+
+def assert_index_matches_events(calendar: JSONAgentCalendar):
+    rebuilt = IntervalIndex(calendar.event_store.intervals())
+    assert list(calendar.busy_index.blocks()) == list(rebuilt.blocks())
+
+
+def test_book_update_and_cancel(calendar_json_file):
+    calendar = create_calendar(calendar_json_file)
+    calendar.create_event(booking("booked-1", "2025-04-03T09:00:00", "2025-04-03T10:00:00"))
+    assert not calendar.is_time_available(utc("2025-04-03T09:30:00"), utc("2025-04-03T09:45:00"))
+    assert_index_matches_events(calendar)
+
+    with pytest.raises(CalendarConflictError):
+        calendar.create_event(booking("booked-2", "2025-04-03T09:30:00", "2025-04-03T10:30:00"))
+    with pytest.raises(CalendarConflictError):
+        calendar.create_event(booking("booked-1", "2025-04-03T11:00:00", "2025-04-03T12:00:00"))
+
+    # moving an event over its own old time is not a conflict
+    updated = calendar.update_event("booked-1", utc("2025-04-03T09:30:00"), utc("2025-04-03T10:30:00"), summary="Moved")
+    assert updated.summary == "Moved"
+    assert calendar.is_time_available(utc("2025-04-03T09:00:00"), utc("2025-04-03T09:30:00"))
+    assert not calendar.is_time_available(utc("2025-04-03T10:00:00"), utc("2025-04-03T10:30:00"))
+    assert_index_matches_events(calendar)
+
+    calendar.cancel_event("booked-1")
+    assert calendar.is_time_available(utc("2025-04-03T09:00:00"), utc("2025-04-03T10:30:00"))
+    assert_index_matches_events(calendar)
+    with pytest.raises(EventNotFoundError):
+        calendar.cancel_event("booked-1")
+
+
+def test_cancel_existing_event_frees_only_its_time(calendar_json_file):
+    calendar = create_calendar(calendar_json_file)
+    time_ranges = [TimeRange(start=utc("2025-04-01T00:00:00"), end=utc("2025-04-10T00:00:00"))]
+    before = set(calendar.find_available_slots(time_ranges, dt.timedelta(minutes=30), 1000))
+
+    for event in calendar.events[:5]:
+        calendar.cancel_event(event.uid)
+        assert_index_matches_events(calendar)
+    after = set(calendar.find_available_slots(time_ranges, dt.timedelta(minutes=30), 1000))
+    assert before <= after
+
+
+def test_changes_are_replayed_from_the_log(calendar_json_file):
+    calendar = create_calendar(calendar_json_file)
+    first_event = calendar.events[0]
+    calendar.create_event(booking("booked-1", "2025-04-03T09:00:00", "2025-04-03T10:00:00"))
+    calendar.cancel_event(first_event.uid)
+
+    # other instances catch up with the log, new ones replay it on load
+    for other in [create_calendar(calendar_json_file)]:
+        assert other.event_store.find("booked-1") >= 0
+        assert other.event_store.find(first_event.uid) < 0
+        assert list(other.busy_index.blocks()) == list(calendar.busy_index.blocks())
+
+    log = get_event_log(calendar_json_file)
+    assert len(log.entries_since(1, 1, 0)) == 2
+    # the calendar file is untouched until the log is compacted
+    with open(calendar_json_file, "r", encoding="utf-8") as f:
+        assert "booked-1" not in f.read()
+
+
+def test_instances_see_each_others_changes(calendar_json_file):
+    first = create_calendar(calendar_json_file)
+    second = create_calendar(calendar_json_file)
+    first.create_event(booking("booked-1", "2025-04-03T09:00:00", "2025-04-03T10:00:00"))
+    assert not second.is_time_available(utc("2025-04-03T09:00:00"), utc("2025-04-03T10:00:00"))
+    with pytest.raises(CalendarConflictError):
+        second.create_event(booking("booked-2", "2025-04-03T09:00:00", "2025-04-03T10:00:00"))
+
+
+def test_compaction_folds_the_log_into_the_calendar_file(calendar_json_file):
+    calendar = create_calendar(calendar_json_file)
+    calendar.create_event(booking("booked-1", "2025-04-03T09:00:00", "2025-04-03T10:00:00"))
+    other_agent = create_calendar(calendar_json_file, agent_id=2)
+    other_agent.create_event(booking("booked-2", "2025-04-03T09:00:00", "2025-04-03T10:00:00"))
+    blocks = list(calendar.busy_index.blocks())
+
+    log = get_event_log(calendar_json_file)
+    assert log.compact() == 2
+    assert log.entries_since(1, 1, 0) == []
+    with open(calendar_json_file, "r", encoding="utf-8") as f:
+        calendars = json.load(f)
+    uids = {(record["agent_id"], event["uid"]) for record in calendars if record["client_id"] == 1 for event in record["calendar_events"]}
+    assert (1, "booked-1") in uids and (2, "booked-2") in uids
+
+    # instances created before and after compaction agree
+    assert calendar.event_store.find("booked-1") >= 0
+    assert list(create_calendar(calendar_json_file).busy_index.blocks()) == blocks
+    calendar.cancel_event("booked-1")
+    assert calendar.is_time_available(utc("2025-04-03T09:00:00"), utc("2025-04-03T10:00:00"))
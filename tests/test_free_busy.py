@@ -0,0 +1,88 @@
+import sys
+import asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from agent_calendar.agent_calendar_settings import get_agent_calendar_settings
+from agent_calendar.booking_counts import block_full_days
+from agent_calendar.free_busy import FreeBusyView
+from agent_calendar.interval_index import IntervalIndex, from_epoch_us, to_epoch_us
+from agent_calendar.metrics import SLOTS_PROBED
+from agent_calendar.slot_search import find_available_slots, search_window
+from agent_calendar.working_windows import WorkingWindows
+from benchmarks.bench_api import asgi_request
+from conftest import create_calendar
+from models import AgentCalendarEvent, TimeRange
+from test_slot_search import random_searches
+
+
+def test_free_busy_search_matches_sweep():
+    for events, working_hours, tz, increment, time_ranges, duration, count in random_searches(11):
+        working_windows = WorkingWindows(working_hours, tz)
+        window_start, window_end = (to_epoch_us(value) for value in search_window(time_ranges))
+        start = working_windows.day_bounds(working_windows.day_of(window_start))[0]
+        end = working_windows.day_bounds(working_windows.day_of(window_end))[1]
+        busy_index = IntervalIndex((to_epoch_us(event_start), to_epoch_us(event_end)) for event_start, event_end in events)
+        # block out the day of the first event as if it were fully booked
+        full_days = [working_windows.day_bounds(working_windows.day_of(to_epoch_us(events[0][0])))] if events else []
+        busy_index = block_full_days(busy_index, full_days, start, end)
+
+        view = FreeBusyView(busy_index, working_windows, start, end)
+        assert view.covers(*search_window(time_ranges))
+        expected = find_available_slots(busy_index, working_windows, increment, time_ranges, duration, count)
+        assert view.find_available_slots(working_windows, increment, time_ranges, duration, count) == expected
+
+
+def test_free_intervals_are_the_working_hours_left():
+    working_windows = WorkingWindows(get_agent_calendar_settings(client_id=1, agent_id=1).working_hours)
+    day = working_windows.day_of(to_epoch_us(datetime(2025, 4, 3, tzinfo=timezone.utc)))
+    window_start, window_end = working_windows.window(day)
+    hour = 3600 * 1_000_000
+    view = FreeBusyView(IntervalIndex([(window_start + hour, window_start + 2 * hour)]), working_windows, *working_windows.day_bounds(day))
+    assert view.free_intervals() == [(window_start, window_start + hour), (window_start + 2 * hour, window_end)]
+    assert view.busy_blocks() == [(window_start + hour, window_start + 2 * hour)]
+
+
+@pytest.fixture
+def calendar(calendar_json_file):
+    return create_calendar(calendar_json_file)
+
+
+def test_bookings_invalidate_the_view(calendar):
+    working_windows = calendar.working_windows
+    tomorrow = working_windows.day_of(to_epoch_us(datetime.now(timezone.utc))) + 1
+    window_start, window_end = working_windows.window(tomorrow)
+    time_ranges = [TimeRange(start=from_epoch_us(window_start), end=from_epoch_us(window_end))]
+    calendar.materialized_free_busy.refresh()
+    assert calendar.materialized_free_busy.view() is not None
+
+    booked_start = from_epoch_us(window_start)
+    calendar.create_event(
+        AgentCalendarEvent(uid="free-busy-1", dtstamp=booked_start, dtstart=booked_start, dtend=booked_start + timedelta(hours=1), summary="Booked")
+    )
+    # the old view no longer answers searches, the new one includes the booking
+    assert calendar.materialized_free_busy.view() is None
+    view = calendar.free_busy()
+    assert (window_start, window_start + 3600 * 1_000_000) in view.busy_blocks()
+
+    searches_before = SLOTS_PROBED.count("free_busy")
+    slots = calendar.find_available_slots(time_ranges, timedelta(minutes=30), 3)
+    assert SLOTS_PROBED.count("free_busy") == searches_before + 1
+    assert slots[0] == booked_start + timedelta(hours=1)
+    expected = find_available_slots(
+        calendar._busy_index_for_search(time_ranges), working_windows, calendar.calendar_settings.availability_increment, time_ranges, timedelta(minutes=30), 3
+    )
+    assert slots == expected
+
+
+def test_free_busy_endpoint():
+    from app import app
+
+    status, body = asyncio.run(asgi_request(app, "POST", "/scheduling/freebusy", {"client_id": 1, "agent_id": 1}))
+    assert status == 200
+    assert b'"free"' in body and b'"busy"' in body
@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agent_calendar.interval_index import IntervalIndex
+
+
+def test_interval_index_merges_overlapping_and_touching_blocks():
+    index = IntervalIndex([(30, 40), (0, 10), (5, 15), (15, 20), (50, 50)])
+    assert index.blocks() == [(0, 20), (30, 40), (50, 50)]
+
+
+def test_interval_index_find_overlap():
+    index = IntervalIndex([(0, 10), (20, 30)])
+    assert index.find_overlap(10, 20) == -1
+    assert index.find_overlap(-5, 0) == -1
+    assert index.find_overlap(9, 11) == 0
+    assert index.find_overlap(15, 25) == 1
+    assert index.find_overlap(30, 40) == -1
+
+
+def test_interval_index_matches_linear_scan():
+    intervals = [(start, start + length) for start, length in [(3, 4), (10, 1), (12, 6), (25, 2), (26, 5), (40, 0)]]
+    index = IntervalIndex(intervals)
+    for start in range(0, 45):
+        for end in range(start + 1, 46):
+            expected = any(start < event_end and end > event_start for event_start, event_end in intervals)
+            assert (index.find_overlap(start, end) >= 0) == expected
+
+
+def test_interval_index_free_intervals():
+    index = IntervalIndex([(0, 10), (20, 30), (35, 35)])
+    assert index.free_intervals(5, 50) == [(10, 20), (30, 35), (35, 50)]
+    assert index.free_intervals(20, 30) == []
+    assert index.free_intervals(12, 18) == [(12, 18)]
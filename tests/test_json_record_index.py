@@ -0,0 +1,54 @@
+import sys
+import json
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agent_calendar.json_record_index import JSONRecordIndex, get_record_index, iter_json_array
+
+
+def write_records(path):
+    records = [
+        {"client_id": 1, "agent_id": 1, "task": "Café visit ☕"},
+        {"client_id": 1, "agent_id": 2, "task": "Call lender"},
+        {"client_id": 1, "agent_id": 1, "task": "Prepare listing, \"urgent\""},
+    ]
+    path.write_text(json.dumps(records, indent=2, ensure_ascii=False), encoding="utf-8")
+    return records
+
+
+def test_iter_json_array_reports_byte_ranges(tmp_path):
+    path = tmp_path / "records.json"
+    records = write_records(path)
+    data = path.read_bytes()
+
+    # a tiny chunk size forces objects and multi-byte characters to span reads
+    scanned = list(iter_json_array(str(path), chunk_size=7))
+    assert [record for _, _, record in scanned] == records
+    for offset, length, record in scanned:
+        assert json.loads(data[offset:offset + length]) == record
+
+
+def test_record_index_streaming_matches_eager(tmp_path):
+    path = tmp_path / "records.json"
+    records = write_records(path)
+    eager = JSONRecordIndex(str(path), streaming=False)
+    streaming = JSONRecordIndex(str(path), streaming=True)
+
+    for key in [(1, 1), (1, 2), (2, 1)]:
+        expected = [record for record in records if (record["client_id"], record["agent_id"]) == key]
+        assert eager.records(*key) == expected
+        assert streaming.records(*key) == expected
+    assert sorted(streaming.keys()) == [(1, 1), (1, 2)]
+
+
+def test_get_record_index_is_shared_until_file_changes(tmp_path):
+    path = tmp_path / "records.json"
+    write_records(path)
+    first = get_record_index(str(path))
+    assert get_record_index(str(path)) is first
+
+    path.write_text(json.dumps([{"client_id": 3, "agent_id": 3}]), encoding="utf-8")
+    second = get_record_index(str(path))
+    assert second is not first
+    assert second.records(3, 3) == [{"client_id": 3, "agent_id": 3}]
@@ -0,0 +1,102 @@
+import sys
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agent_calendar.metrics import Counter, Histogram, OPERATION_DURATION, REQUEST_DURATION, SLOTS_PROBED, render
+from agent_calendar.sampling_profiler import SamplingProfiler
+from benchmarks.bench_api import asgi_request
+
+
+def test_histogram_samples():
+    histogram = Histogram("test_latency_seconds", "Test latency.", ["route"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+    samples = {(name, labels): value for name, labels, value in histogram.samples()}
+    assert samples[("test_latency_seconds_bucket", '{route="/a",le="0.1"}')] == 1
+    assert samples[("test_latency_seconds_bucket", '{route="/a",le="1"}')] == 2
+    assert samples[("test_latency_seconds_bucket", '{route="/a",le="+Inf"}')] == 3
+    assert samples[("test_latency_seconds_count", '{route="/a"}')] == 3
+    assert samples[("test_latency_seconds_sum", '{route="/a"}')] == 5.55
+
+
+def test_counter_samples():
+    counter = Counter("test_requests", "Test requests.", ["route"])
+    counter.inc("/a")
+    counter.inc("/a", amount=2)
+    assert list(counter.samples()) == [("test_requests_total", '{route="/a"}', 3)]
+
+
+def test_requests_are_measured():
+    from app import app
+
+    payload = {"client_id": 1, "agent_id": 1, "start_date_time": "2025-04-03T09:00:00Z", "end_date_time": "2025-04-03T10:00:00Z"}
+    requests_before = REQUEST_DURATION.count("POST", "/scheduling/check", "200")
+    checks_before = OPERATION_DURATION.count("is_time_available")
+    status, _ = asyncio.run(asgi_request(app, "POST", "/scheduling/check", payload))
+    assert status == 200
+    assert REQUEST_DURATION.count("POST", "/scheduling/check", "200") == requests_before + 1
+    assert OPERATION_DURATION.count("is_time_available") == checks_before + 1
+
+    payload = {"client_id": 1, "agent_id": 1, "time_ranges": [{"start": "2025-04-03T00:00:00Z", "end": "2025-04-04T00:00:00Z"}], "duration_minutes": 30, "count": 3}
+    searches_before = SLOTS_PROBED.count("sweep")
+    status, _ = asyncio.run(asgi_request(app, "POST", "/scheduling/available", payload))
+    assert status == 200
+    assert SLOTS_PROBED.count("sweep") == searches_before + 1
+
+    status, body = asyncio.run(asgi_request(app, "GET", "/metrics", {}))
+    assert status == 200
+    text = body.decode()
+    assert 'hw_scheduling_request_duration_seconds_count{method="POST",route="/scheduling/check",status="200"}' in text
+    assert 'hw_scheduling_operation_duration_seconds_count{operation="settings_lookup"}' in text
+    assert 'hw_scheduling_cache{cache="calendar",stat="hit_ratio"}' in text
+    assert text == text.strip() + "\n" and render().startswith("# HELP")
+
+
+def busy_wait(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_sampling_profiler_finds_hot_stacks():
+    profiler = SamplingProfiler(interval_seconds=0.001)
+    started = profiler.request_started()
+    busy_wait(0.1)
+    stacks = profiler.request_finished(started)
+    assert stacks
+    assert any(function == "busy_wait" for stack, _ in stacks for _, _, function in stack)
+
+
+def sleep_in_deep_stack(depth, stop):
+    if depth:
+        return sleep_in_deep_stack(depth - 1, stop)
+    while not stop.is_set():
+        time.sleep(0.001)
+
+
+def test_sampling_profiler_requests_finish_while_sampling():
+    profiler = SamplingProfiler(interval_seconds=0)
+    stop = threading.Event()
+    # threads with deep stacks make each sampling pass long enough to be interrupted
+    threads = [threading.Thread(target=sleep_in_deep_stack, args=(40, stop)) for _ in range(30)]
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    for thread in threads:
+        thread.start()
+    # a request that keeps the sampler running
+    outer = profiler.request_started()
+    try:
+        for _ in range(300):
+            profiler.request_finished(profiler.request_started())
+            time.sleep(0.0005)
+    finally:
+        sys.setswitchinterval(switch_interval)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        profiler.request_finished(outer)
@@ -0,0 +1,61 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import json
+import os
+import shutil
+
+from agent_calendar import parsed_cache
+from agent_calendar.event_store import EventStore
+from agent_calendar.json_record_index import JSONRecordIndex
+from agent_calendar.parsed_cache import cache_file_of, load_parsed
+
+
+def test_cache_is_rebuilt_when_the_file_changes(tmp_path, monkeypatch):
+    path = tmp_path / "records.json"
+    path.write_text(json.dumps([{"client_id": 1, "agent_id": 1}]))
+    parses = []
+
+    def parse(file_path):
+        parses.append(file_path)
+        with open(file_path) as f:
+            return json.load(f)
+
+    assert load_parsed(str(path), parse, enabled=True) == [{"client_id": 1, "agent_id": 1}]
+    assert load_parsed(str(path), parse, enabled=True) == [{"client_id": 1, "agent_id": 1}]
+    assert len(parses) == 1 and os.path.exists(cache_file_of(str(path)))
+
+    path.write_text(json.dumps([{"client_id": 1, "agent_id": 2}]))
+    assert load_parsed(str(path), parse, enabled=True) == [{"client_id": 1, "agent_id": 2}]
+    assert len(parses) == 2
+
+    # a damaged cache is rebuilt too
+    Path(cache_file_of(str(path))).write_bytes(b"garbage")
+    assert load_parsed(str(path), parse, enabled=True) == [{"client_id": 1, "agent_id": 2}]
+    assert len(parses) == 3
+
+    # and so is one written by another Python version
+    monkeypatch.setattr(parsed_cache, "PYTHON_TAG", b"cpython-399-4")
+    assert load_parsed(str(path), parse, enabled=True) == [{"client_id": 1, "agent_id": 2}]
+    assert load_parsed(str(path), parse, enabled=True) == [{"client_id": 1, "agent_id": 2}]
+    assert len(parses) == 4
+
+
+def test_cached_index_matches_the_json_file(tmp_path):
+    path = tmp_path / "ics_data.json"
+    shutil.copy("data/ics_data.json", path)
+    for streaming in (False, True):
+        plain = JSONRecordIndex(str(path), streaming=streaming, parsed_cache=False)
+        # built once and then read back from the cache
+        for _ in range(2):
+            cached = JSONRecordIndex(str(path), streaming=streaming, parsed_cache=True)
+            assert sorted(cached.keys()) == sorted(plain.keys())
+            for key in plain.keys():
+                assert cached.records(*key) == plain.records(*key)
+                events = [event for record in plain.records(*key) for event in record.get("calendar_events", [])]
+                store = EventStore(events, cached.event_bounds(*key))
+                assert list(store.intervals()) == list(EventStore(events).intervals())
+                assert plain.event_bounds(*key) is None
+        os.remove(cache_file_of(str(path)))
@@ -0,0 +1,180 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import json
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from agent_calendar.agent_calendar import CalendarConflictError
+from agent_calendar.calendar_snapshot import build_snapshot, get_snapshot
+from agent_calendar.interval_index import from_epoch_us, to_epoch_us
+from agent_calendar.recurrence import MAX_COUNT, RecurringEvent, RecurringEvents, parse_rrule, split_recurring
+from conftest import create_calendar
+from models import AgentCalendarEvent, AgentCalendarSettings, TimeRange, WorkingHours
+
+BERLIN = ZoneInfo("Europe/Berlin")
+
+
+def event(uid: str, start: str, end: str, rrule=None, exdate=()) -> dict:
+    record = {"uid": uid, "dtstamp": "2025-03-01T00:00:00Z", "dtstart": start, "dtend": end, "summary": "Meeting"}
+    if rrule:
+        record["rrule"] = rrule
+        record["exdate"] = list(exdate)
+    return record
+
+
+def local_starts(record: dict, start: str, end: str):
+    expanded = RecurringEvent(record, BERLIN).occurrences(to_epoch_us(datetime.fromisoformat(start)), to_epoch_us(datetime.fromisoformat(end)))
+    return [from_epoch_us(occurrence_start, BERLIN).strftime("%Y-%m-%d %H:%M") for occurrence_start, _ in expanded]
+
+
+def test_occurrences_keep_the_local_time_across_dst():
+    record = event("weekly", "2025-03-20T09:00:00+01:00", "2025-03-20T10:00:00+01:00", "FREQ=WEEKLY")
+    assert local_starts(record, "2025-03-24T00:00:00+00:00", "2025-04-04T00:00:00+00:00") == ["2025-03-27 09:00", "2025-04-03 09:00"]
+
+
+def test_rule_parts():
+    start, end = "2025-03-20T09:00:00+01:00", "2025-03-20T10:00:00+01:00"
+    assert local_starts(event("a", start, end, "FREQ=WEEKLY;BYDAY=MO,TH;COUNT=4"), "2025-01-01T00:00:00Z", "2026-01-01T00:00:00Z") == [
+        "2025-03-20 09:00",
+        "2025-03-24 09:00",
+        "2025-03-27 09:00",
+        "2025-03-31 09:00",
+    ]
+    assert local_starts(event("b", start, end, "FREQ=DAILY;INTERVAL=3;UNTIL=20250329"), "2025-01-01T00:00:00Z", "2026-01-01T00:00:00Z") == [
+        "2025-03-20 09:00",
+        "2025-03-23 09:00",
+        "2025-03-26 09:00",
+        "2025-03-29 09:00",
+    ]
+    # months without a 31st are skipped
+    monthly = event("c", "2025-01-31T09:00:00+01:00", "2025-01-31T10:00:00+01:00", "FREQ=MONTHLY;COUNT=3")
+    assert local_starts(monthly, "2025-01-01T00:00:00Z", "2026-01-01T00:00:00Z") == ["2025-01-31 09:00", "2025-03-31 09:00", "2025-05-31 09:00"]
+    excluded = event("d", start, end, "FREQ=WEEKLY;COUNT=3", exdate=["2025-03-27T09:00:00+01:00"])
+    assert local_starts(excluded, "2025-01-01T00:00:00Z", "2026-01-01T00:00:00Z") == ["2025-03-20 09:00", "2025-04-03 09:00"]
+
+
+def test_unsupported_rules_are_single_events():
+    with pytest.raises(ValueError):
+        parse_rrule("FREQ=MONTHLY;BYSETPOS=-1;BYDAY=FR")
+    with pytest.raises(ValueError):
+        parse_rrule("FREQ=HOURLY")
+    single, recurring = split_recurring([event("a", "2025-03-20T09:00:00Z", "2025-03-20T10:00:00Z", "FREQ=SECONDLY"), event("b", "2025-03-20T09:00:00Z", "2025-03-20T10:00:00Z", "FREQ=DAILY")])
+    assert [record["uid"] for record in single] == ["a"] and [record["uid"] for record in recurring] == ["b"]
+
+
+def test_count_finds_the_last_occurrence_without_stepping():
+    # 29 February only exists in leap years, every 400 years there are 97 of them
+    leap_day = event("leap", "2024-02-29T09:00:00+01:00", "2024-02-29T10:00:00+01:00", "FREQ=YEARLY;COUNT=98")
+    assert local_starts(leap_day, "2419-01-01T00:00:00Z", "2500-01-01T00:00:00Z") == ["2420-02-29 09:00", "2424-02-29 09:00"]
+    # seven months a year have a 31st
+    end_of_month = event("monthly", "2025-01-31T09:00:00+01:00", "2025-01-31T10:00:00+01:00", "FREQ=MONTHLY;COUNT=70")
+    assert local_starts(end_of_month, "2034-12-01T00:00:00Z", "2036-01-01T00:00:00Z") == ["2034-12-31 09:00"]
+
+
+def test_count_past_the_supported_dates():
+    assert parse_rrule("FREQ=DAILY;COUNT=99999999999").count == MAX_COUNT
+    for rrule in ("FREQ=MONTHLY;COUNT=100000", "FREQ=YEARLY;COUNT=20000", "FREQ=WEEKLY;COUNT=99999999", "FREQ=DAILY;INTERVAL=50;COUNT=99999999999"):
+        record = event("forever", "2025-01-31T09:00:00+01:00", "2025-01-31T10:00:00+01:00", rrule)
+        assert local_starts(record, "2025-01-01T00:00:00Z", "2025-02-01T00:00:00Z") == ["2025-01-31 09:00"]
+        assert local_starts(record, "9000-01-01T00:00:00Z", "9030-01-01T00:00:00Z")
+
+
+def test_expansion_is_limited_to_the_weeks_queried():
+    # a weekly meeting over five years
+    recurring = RecurringEvents(BERLIN, [event("weekly", "2025-01-06T09:00:00+01:00", "2025-01-06T10:00:00+01:00", "FREQ=WEEKLY;COUNT=260")], max_cached_weeks=4)
+    start = to_epoch_us(datetime(2027, 6, 1, tzinfo=timezone.utc))
+    assert len(recurring.between(start, start + 14 * 24 * 3600 * 1_000_000)) == 2
+    assert len(recurring._weeks) <= 3
+    recurring.between(start + 365 * 24 * 3600 * 1_000_000, start + 400 * 24 * 3600 * 1_000_000)
+    assert len(recurring._weeks) == 4
+    # past the last occurrence
+    assert recurring.between(to_epoch_us(datetime(2030, 6, 1, tzinfo=timezone.utc)), to_epoch_us(datetime(2030, 7, 1, tzinfo=timezone.utc))) == []
+
+
+def write_calendar(path: Path, events) -> str:
+    path.write_text(json.dumps([{"client_id": 1, "agent_id": 1, "calendar_events": events}]))
+    return str(path)
+
+
+BERLIN_SETTINGS = AgentCalendarSettings(
+    client_id=1,
+    agent_id=1,
+    calendar_type="json",
+    working_hours=WorkingHours(start=time(8), end=time(18)),
+    availability_increment=15,
+    max_bookings_per_day=3,
+    timezone="Europe/Berlin",
+)
+
+
+RECURRING = [
+    event("standup", "2025-03-03T09:00:00+01:00", "2025-03-03T09:30:00+01:00", "FREQ=DAILY;COUNT=60", exdate=["2025-03-12T09:00:00+01:00"]),
+    event("review", "2025-03-05T14:00:00+01:00", "2025-03-05T16:00:00+01:00", "FREQ=WEEKLY;BYDAY=WE,FR"),
+    event("lunch", "2025-03-04T12:00:00+01:00", "2025-03-04T13:00:00+01:00", "FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,TH"),
+]
+SINGLE = [event("call", "2025-03-18T11:00:00+01:00", "2025-03-18T11:30:00+01:00"), event("visit", "2025-03-26T10:00:00+01:00", "2025-03-26T12:00:00+01:00")]
+
+
+@pytest.fixture
+def calendars(tmp_path):
+    """A calendar with recurring events and one with the same occurrences stored as single events."""
+    first, last = to_epoch_us(datetime(2025, 2, 1, tzinfo=timezone.utc)), to_epoch_us(datetime(2025, 6, 1, tzinfo=timezone.utc))
+    expanded = list(SINGLE)
+    for record in RECURRING:
+        for number, (start, end) in enumerate(RecurringEvent(record, BERLIN).occurrences(first, last)):
+            expanded.append(event(f"{record['uid']}-{number}", from_epoch_us(start).isoformat(), from_epoch_us(end).isoformat()))
+    recurring = create_calendar(write_calendar(tmp_path / "recurring.json", RECURRING + SINGLE), settings=BERLIN_SETTINGS)
+    return recurring, create_calendar(write_calendar(tmp_path / "expanded.json", expanded), settings=BERLIN_SETTINGS)
+
+
+def test_searches_match_the_expanded_calendar(calendars):
+    recurring, expanded = calendars
+    start = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    for days, length in ((0, 7), (10, 3), (20, 30), (60, 14)):
+        time_ranges = [TimeRange(start=start + timedelta(days=days), end=start + timedelta(days=days + length))]
+        for duration in (timedelta(minutes=30), timedelta(hours=2)):
+            assert recurring.find_available_slots(time_ranges, duration, 500) == expanded.find_available_slots(time_ranges, duration, 500)
+            assert list(recurring.iter_available_slots(time_ranges, duration, 500)) == expanded.find_available_slots(time_ranges, duration, 500)
+        assert recurring.free_busy_between(time_ranges[0].start, time_ranges[0].end).free_intervals() == expanded.free_busy_between(time_ranges[0].start, time_ranges[0].end).free_intervals()
+    for hour in range(8 * 24 * 4):
+        slot = start + timedelta(minutes=15 * hour)
+        assert recurring.is_time_available(slot, slot + timedelta(minutes=30)) == expanded.is_time_available(slot, slot + timedelta(minutes=30))
+
+
+def test_calendar_with_a_count_past_the_supported_dates(tmp_path):
+    records = [event("monthly", "2025-03-03T09:00:00+01:00", "2025-03-03T10:00:00+01:00", "FREQ=MONTHLY;COUNT=100000")]
+    calendar = create_calendar(write_calendar(tmp_path / "calendar.json", records), settings=BERLIN_SETTINGS)
+    slot = datetime(2025, 4, 3, 9, 0, tzinfo=BERLIN)
+    assert not calendar.is_time_available(slot, slot + timedelta(minutes=30))
+    time_ranges = [TimeRange(start=slot - timedelta(hours=1), end=slot + timedelta(hours=2))]
+    slots = calendar.find_available_slots(time_ranges, timedelta(minutes=30), 10)
+    assert slot not in slots and slot + timedelta(hours=1) in slots
+
+
+def test_recurring_events_can_be_cancelled(calendars):
+    recurring, _ = calendars
+    slot = datetime(2025, 3, 19, 14, 0, tzinfo=BERLIN)
+    assert not recurring.is_time_available(slot, slot + timedelta(minutes=30))
+    with pytest.raises(CalendarConflictError):
+        recurring.create_event(AgentCalendarEvent(uid="clash", dtstamp=slot, dtstart=slot, dtend=slot + timedelta(minutes=30), summary="Clash"))
+    recurring.cancel_event("review")
+    assert recurring.is_time_available(slot, slot + timedelta(minutes=30))
+    assert all(event.uid != "review" for event in recurring.events)
+    # the cancellation reaches other instances through the event log
+    assert create_calendar(recurring.calendar_json_file, settings=BERLIN_SETTINGS).is_time_available(slot, slot + timedelta(minutes=30))
+
+
+def test_snapshot_keeps_recurring_events(calendars, tmp_path):
+    recurring, _ = calendars
+    snapshot_file = str(tmp_path / "calendar.snapshot")
+    build_snapshot(recurring.calendar_json_file, snapshot_file)
+    shared = create_calendar(recurring.calendar_json_file, snapshot=get_snapshot(snapshot_file), settings=BERLIN_SETTINGS)
+    assert len(shared.recurring_events) == len(RECURRING)
+    assert shared.events == recurring.events
+    time_ranges = [TimeRange(start=datetime(2025, 3, 10, tzinfo=timezone.utc), end=datetime(2025, 3, 24, tzinfo=timezone.utc))]
+    assert shared.find_available_slots(time_ranges, timedelta(minutes=30), 200) == recurring.find_available_slots(time_ranges, timedelta(minutes=30), 200)
@@ -0,0 +1,65 @@
+import sys
+import asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import datetime as dt
+from datetime import datetime
+
+from models import (
+    AgentAvailabilityQuery,
+    BatchCheckAvailabilityRequest,
+    BatchFindAvailableTimesRequest,
+    FindAvailableTimesRequest,
+    TeamAvailabilityRequest,
+    TimeRange,
+)
+from routers.scheduling import check_availability_batch, find_available_team_members, find_available_times_batch
+
+
+def utc(value):
+    return datetime.fromisoformat(value).replace(tzinfo=dt.timezone.utc)
+
+
+def test_check_availability_batch():
+    request = BatchCheckAvailabilityRequest(
+        queries=[
+            AgentAvailabilityQuery(
+                client_id=1,
+                agent_id=1,
+                time_ranges=[
+                    TimeRange(start=utc("2025-04-03T09:00:00"), end=utc("2025-04-03T10:00:00")),
+                    TimeRange(start=utc("2025-04-05T12:00:00"), end=utc("2025-04-05T12:30:00")),
+                ],
+            ),
+            AgentAvailabilityQuery(client_id=9, agent_id=9, time_ranges=[]),
+        ]
+    )
+    response = asyncio.run(check_availability_batch(request))
+    assert response.results[0].available == [True, False]
+    assert response.results[1].available is None
+    assert response.results[1].error == "Agent calendar not found"
+
+
+def test_find_available_times_batch():
+    time_ranges = [TimeRange(start=utc("2025-04-03T09:00:00"), end=utc("2025-04-03T13:00:00"))]
+    request = BatchFindAvailableTimesRequest(
+        queries=[
+            FindAvailableTimesRequest(client_id=1, agent_id=1, time_ranges=time_ranges, duration_minutes=30, count=3),
+            FindAvailableTimesRequest(client_id=1, agent_id=2, time_ranges=time_ranges, duration_minutes=30, count=1),
+            FindAvailableTimesRequest(client_id=1, agent_id=1, time_ranges=time_ranges, duration_minutes=60, count=1),
+        ]
+    )
+    response = asyncio.run(find_available_times_batch(request))
+    assert [len(result.available_times) for result in response.results] == [3, 1, 1]
+    assert all(result.error is None for result in response.results)
+
+
+def test_find_available_team_members():
+    request = TeamAvailabilityRequest(
+        client_id=1, agent_ids=[9, 1, 2], start_date_time=utc("2025-04-05T12:00:00"), end_date_time=utc("2025-04-05T12:30:00"), count=2
+    )
+    response = asyncio.run(find_available_team_members(request))
+    # agent 9 has no calendar and agent 1 is at an open house
+    assert response.agent_ids == [2]
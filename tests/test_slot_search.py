@@ -0,0 +1,141 @@
+import sys
+import random
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import datetime as dt
+from datetime import datetime, time, timedelta
+
+from zoneinfo import ZoneInfo
+
+from agent_calendar.interval_index import IntervalIndex, to_epoch_us
+from agent_calendar.slot_search import find_available_slots, find_distinct_slots
+from agent_calendar.vectorized_slot_search import find_available_slots_vectorized, is_supported
+from agent_calendar.working_windows import WorkingWindows, day_number
+from models import TimeRange, WorkingHours
+
+
+def stepping_find_available_slots(events, working_hours, timezone, availability_increment, time_ranges, duration, count):
+    """Probes every increment with datetime arithmetic, rolling over once a slot would end after working hours."""
+    tz = ZoneInfo(timezone)
+
+    def working_window(day):
+        return datetime.combine(day, working_hours.start, tzinfo=tz), datetime.combine(day, working_hours.end, tzinfo=tz)
+
+    def is_time_available(start_time, end_time):
+        if start_time >= end_time:
+            return False
+        for event_start, event_end in events:
+            if start_time < event_end and end_time > event_start:
+                return False
+        return True
+
+    available = []
+    for interval in time_ranges:
+        # step in UTC, adding to a local time would add wall clock time across DST changes
+        current_start = interval.start.astimezone(dt.timezone.utc)
+        while current_start + duration <= interval.end and len(available) < count:
+            day = current_start.astimezone(tz).date()
+            window_start, window_end = working_window(day)
+            if current_start + duration > window_end:
+                current_start = working_window(day + timedelta(days=1))[0].astimezone(dt.timezone.utc)
+                continue
+            if current_start >= window_start and is_time_available(current_start, current_start + duration):
+                available.append(current_start.astimezone(interval.start.tzinfo))
+            current_start += timedelta(minutes=availability_increment)
+        if len(available) >= count:
+            break
+    return available
+
+
+def test_find_available_slots_skips_busy_blocks():
+    day = datetime(2025, 4, 3, tzinfo=dt.timezone.utc)
+    events = [(day.replace(hour=9), day.replace(hour=12, minute=10))]
+    busy_index = IntervalIndex((to_epoch_us(start), to_epoch_us(end)) for start, end in events)
+    working_windows = WorkingWindows(WorkingHours(start=time(9), end=time(17)))
+    time_ranges = [TimeRange(start=day.replace(hour=9), end=day.replace(hour=17))]
+
+    slots = find_available_slots(busy_index, working_windows, 15, time_ranges, timedelta(minutes=30), 2)
+    assert slots == [day.replace(hour=12, minute=15), day.replace(hour=12, minute=30)]
+
+
+def test_working_windows_follow_dst():
+    working_windows = WorkingWindows(WorkingHours(start=time(9), end=time(17)), "America/New_York")
+    # EST before the change on 2025-03-09, EDT after it
+    assert working_windows.window(day_number(dt.date(2025, 3, 8))) == (to_epoch_us(datetime(2025, 3, 8, 14, tzinfo=dt.timezone.utc)), to_epoch_us(datetime(2025, 3, 8, 22, tzinfo=dt.timezone.utc)))
+    assert working_windows.window(day_number(dt.date(2025, 3, 10))) == (to_epoch_us(datetime(2025, 3, 10, 13, tzinfo=dt.timezone.utc)), to_epoch_us(datetime(2025, 3, 10, 21, tzinfo=dt.timezone.utc)))
+    # the day of the change is 23 hours long
+    day_start, day_end = working_windows.day_bounds(day_number(dt.date(2025, 3, 9)))
+    assert day_end - day_start == 23 * 3600 * 1_000_000
+    # 02:30 UTC on the 10th is still the evening of the 9th in New York
+    assert working_windows.day_of(to_epoch_us(datetime(2025, 3, 10, 2, 30, tzinfo=dt.timezone.utc))) == day_number(dt.date(2025, 3, 9))
+    assert working_windows.contains(to_epoch_us(datetime(2025, 3, 10, 13, tzinfo=dt.timezone.utc)), to_epoch_us(datetime(2025, 3, 10, 21, tzinfo=dt.timezone.utc)))
+    assert not working_windows.contains(to_epoch_us(datetime(2025, 3, 10, 12, 59, tzinfo=dt.timezone.utc)), to_epoch_us(datetime(2025, 3, 10, 14, tzinfo=dt.timezone.utc)))
+
+
+def test_find_available_slots_rolls_over_in_the_agent_timezone():
+    working_windows = WorkingWindows(WorkingHours(start=time(9), end=time(17)), "Asia/Tokyo")
+    tokyo = ZoneInfo("Asia/Tokyo")
+    # starts after working hours in Tokyo, so the first slot is at 09:00 the next morning there
+    time_ranges = [TimeRange(start=datetime(2025, 4, 3, 16, 50, tzinfo=tokyo), end=datetime(2025, 4, 5, tzinfo=tokyo))]
+    slots = find_available_slots(IntervalIndex(), working_windows, 30, time_ranges, timedelta(minutes=30), 2)
+    assert slots == [datetime(2025, 4, 4, 9, tzinfo=tokyo), datetime(2025, 4, 4, 9, 30, tzinfo=tokyo)]
+    assert slots[0].utcoffset() == timedelta(hours=9)
+
+
+def test_find_distinct_slots_do_not_overlap():
+    day = datetime(2025, 4, 3, tzinfo=dt.timezone.utc)
+    events = [(day.replace(hour=9, minute=40), day.replace(hour=10, minute=5))]
+    busy_index = IntervalIndex((to_epoch_us(start), to_epoch_us(end)) for start, end in events)
+
+    slots = find_distinct_slots(busy_index, day.replace(hour=9), day.replace(hour=11), timedelta(minutes=15), timedelta(minutes=30), 5)
+    assert slots == [day.replace(hour=9), day.replace(hour=10, minute=15)]
+
+
+TIMEZONES = ["UTC", "America/New_York", "Australia/Adelaide", "Asia/Kolkata", "Europe/London"]
+
+
+def random_searches(seed):
+    rng = random.Random(seed)
+    offsets = [dt.timezone.utc, dt.timezone(timedelta(hours=-5)), dt.timezone(timedelta(hours=9, minutes=30)), ZoneInfo("Europe/Berlin")]
+    for _ in range(300):
+        # the searches cross the DST changes of March and April 2025
+        base = datetime(2025, rng.choice([3, 4]), rng.choice([1, 25]), tzinfo=dt.timezone.utc)
+        events = []
+        for _ in range(rng.randint(0, 25)):
+            start = base + timedelta(minutes=rng.randint(0, 6 * 24 * 60))
+            events.append((start, start + timedelta(minutes=rng.randint(0, 600))))
+        working_hours = WorkingHours(start=time(rng.randint(0, 10), rng.choice([0, 15, 20])), end=time(rng.randint(12, 23), rng.choice([0, 30, 59])))
+        timezone = rng.choice(TIMEZONES)
+        increment = rng.choice([5, 7, 15, 30, 60])
+        duration = timedelta(minutes=rng.choice([10, 30, 45, 90, 240]))
+        time_ranges = []
+        for _ in range(rng.randint(1, 3)):
+            start = (base + timedelta(minutes=rng.randint(0, 5 * 24 * 60))).astimezone(rng.choice(offsets))
+            time_ranges.append(TimeRange(start=start, end=start + timedelta(minutes=rng.randint(0, 4 * 24 * 60))))
+        count = rng.randint(1, 40)
+
+        yield events, working_hours, timezone, increment, time_ranges, duration, count
+
+
+def test_find_available_slots_matches_stepping_search():
+    for events, working_hours, timezone, increment, time_ranges, duration, count in random_searches(42):
+        busy_index = IntervalIndex((to_epoch_us(start), to_epoch_us(end)) for start, end in events)
+        expected = stepping_find_available_slots(events, working_hours, timezone, increment, time_ranges, duration, count)
+        actual = find_available_slots(busy_index, WorkingWindows(working_hours, timezone), increment, time_ranges, duration, count)
+        assert actual == expected
+        assert [slot.utcoffset() for slot in actual] == [slot.utcoffset() for slot in expected]
+
+
+def test_vectorized_search_matches_sweep():
+    pytest.importorskip("numpy")
+    assert is_supported()
+    for events, working_hours, timezone, increment, time_ranges, duration, count in random_searches(7):
+        busy_index = IntervalIndex((to_epoch_us(start), to_epoch_us(end)) for start, end in events)
+        working_windows = WorkingWindows(working_hours, timezone)
+        expected = find_available_slots(busy_index, working_windows, increment, time_ranges, duration, count)
+        actual = find_available_slots_vectorized(busy_index, working_windows, increment, time_ranges, duration, count)
+        assert actual == expected
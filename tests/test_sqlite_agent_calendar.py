@@ -0,0 +1,95 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import datetime as dt
+from datetime import datetime
+
+import pytest
+
+from agent_calendar.agent_calendar import CalendarConflictError, EventNotFoundError
+from agent_calendar.agent_calendar_settings import get_agent_calendar_settings
+from agent_calendar.interval_index import to_epoch_us
+from agent_calendar.json_agent_calendar import JSONAgentCalendar
+from agent_calendar.sqlite_agent_calendar import SQLiteAgentCalendar, import_json_data
+from models import AgentCalendarEvent, TimeRange
+
+
+def create_calendars(tmp_path, agent_id=1):
+    db_path = str(tmp_path / "calendar.db")
+    counts = import_json_data(db_path, "data/ics_data.json", "data/todo.json")
+    assert counts["events"] > 0 and counts["todos"] > 0
+
+    settings = get_agent_calendar_settings(client_id=1, agent_id=agent_id)
+    sqlite_calendar = SQLiteAgentCalendar(db_path=db_path, client_id=1, agent_id=agent_id, calendar_settings=settings)
+    json_calendar = JSONAgentCalendar(
+        calendar_json_file="data/ics_data.json", todo_json_file="data/todo.json", client_id=1, agent_id=agent_id, calendar_settings=settings
+    )
+    return sqlite_calendar, json_calendar
+
+
+def test_sqlite_is_time_available(tmp_path):
+    calendar, _ = create_calendars(tmp_path)
+
+    start_time = datetime.fromisoformat("2025-04-03T09:00:00").replace(tzinfo=dt.timezone.utc)
+    end_time = datetime.fromisoformat("2025-04-03T10:00:00").replace(tzinfo=dt.timezone.utc)
+    assert calendar.is_time_available(start_time=start_time, end_time=end_time) is True
+
+    start_time = datetime.fromisoformat("2025-04-05T12:00:00").replace(tzinfo=dt.timezone.utc)
+    end_time = datetime.fromisoformat("2025-04-05T12:30:00").replace(tzinfo=dt.timezone.utc)
+    assert calendar.is_time_available(start_time=start_time, end_time=end_time) is False
+
+
+def test_sqlite_matches_json_calendar(tmp_path):
+    for agent_id in [1, 2]:
+        sqlite_calendar, json_calendar = create_calendars(tmp_path, agent_id=agent_id)
+
+        start_time = datetime.fromisoformat("2025-04-01T00:00:00").replace(tzinfo=dt.timezone.utc)
+        end_time = datetime.fromisoformat("2025-04-10T00:00:00").replace(tzinfo=dt.timezone.utc)
+        time_ranges = [TimeRange(start=start_time, end=end_time)]
+        expected = json_calendar.find_available_slots(time_ranges=time_ranges, duration=dt.timedelta(minutes=45), count=100)
+        assert sqlite_calendar.find_available_slots(time_ranges=time_ranges, duration=dt.timedelta(minutes=45), count=100) == expected
+        assert sqlite_calendar.recommend_work_from_todo() == json_calendar.recommend_work_from_todo()
+
+
+def test_sqlite_book_update_and_cancel(tmp_path):
+    calendar, _ = create_calendars(tmp_path)
+    start_time = datetime.fromisoformat("2025-04-03T09:00:00").replace(tzinfo=dt.timezone.utc)
+    end_time = datetime.fromisoformat("2025-04-03T10:00:00").replace(tzinfo=dt.timezone.utc)
+    event = AgentCalendarEvent(uid="booked-1", dtstamp=start_time, dtstart=start_time, dtend=end_time, summary="Booked")
+
+    calendar.create_event(event)
+    assert calendar.is_time_available(start_time=start_time, end_time=end_time) is False
+    with pytest.raises(CalendarConflictError):
+        calendar.create_event(event.model_copy(update={"uid": "booked-2"}))
+
+    # moving an event over its own old time is not a conflict
+    moved = calendar.update_event("booked-1", start_time + dt.timedelta(minutes=30), end_time + dt.timedelta(minutes=30))
+    assert moved.summary == "Booked"
+    assert calendar.is_time_available(start_time=start_time, end_time=start_time + dt.timedelta(minutes=30)) is True
+
+    assert calendar.cancel_event("booked-1").dtstart == moved.dtstart
+    assert calendar.is_time_available(start_time=start_time, end_time=end_time) is True
+    with pytest.raises(EventNotFoundError):
+        calendar.cancel_event("booked-1")
+
+
+def test_sqlite_finds_long_events_started_before_the_window(tmp_path):
+    calendar, _ = create_calendars(tmp_path)
+    start_time = datetime.fromisoformat("2025-04-20T00:00:00").replace(tzinfo=dt.timezone.utc)
+    with calendar.pool.connection() as connection:
+        with connection:
+            # a week long event, outside working hours so only the direct insert can book it
+            event = AgentCalendarEvent(uid="long", dtstamp=start_time, dtstart=start_time, dtend=start_time + dt.timedelta(days=7), summary="Away")
+            connection.execute("INSERT INTO calendar_events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", calendar._event_row(event))
+    window_start = start_time + dt.timedelta(days=3)
+    busy_index = calendar.busy_index_between(window_start, window_start + dt.timedelta(hours=1))
+    assert list(busy_index.blocks()) == [(to_epoch_us(start_time), to_epoch_us(event.dtend))]
+
+    # the longest duration survives cancelling, it only widens the scan
+    calendar.cancel_event("long")
+    assert list(calendar.busy_index_between(window_start, window_start + dt.timedelta(hours=1)).blocks()) == []
+    with calendar.pool.connection() as connection:
+        (max_duration,) = connection.execute("SELECT max_duration FROM event_durations WHERE client_id = 1 AND agent_id = 1").fetchone()
+    assert max_duration == 7 * 24 * 3600 * 1_000_000
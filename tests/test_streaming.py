@@ -0,0 +1,67 @@
+import sys
+import asyncio
+import json
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agent_calendar.async_io import iterate_blocking
+from benchmarks.bench_api import asgi_request
+
+SEARCH = {"client_id": 1, "agent_id": 1, "time_ranges": [{"start": "2025-04-01T00:00:00Z", "end": "2025-05-01T00:00:00Z"}], "duration_minutes": 30, "count": 250}
+
+
+def test_available_times_stream_matches_response():
+    from app import app
+
+    status, body = asyncio.run(asgi_request(app, "POST", "/scheduling/available", SEARCH))
+    assert status == 200
+    expected = json.loads(body)["available_times"]
+
+    status, body = asyncio.run(asgi_request(app, "POST", "/scheduling/available/stream", SEARCH))
+    assert status == 200
+    lines = [json.loads(line) for line in body.decode().splitlines()]
+    assert [line["available_time"] for line in lines] == expected
+
+
+def test_recommendations_stream_matches_response():
+    from app import app
+
+    status, body = asyncio.run(asgi_request(app, "POST", "/scheduling/recommend", {"client_id": 1, "agent_id": 1}))
+    assert status == 200
+    expected = json.loads(body)["suggestions"]
+
+    status, body = asyncio.run(asgi_request(app, "POST", "/scheduling/recommend/stream", {"client_id": 1, "agent_id": 1}))
+    assert status == 200
+    assert [json.loads(line)["suggestion"] for line in body.decode().splitlines()] == expected
+
+
+def test_stream_for_unknown_agent_is_not_found():
+    from app import app
+
+    status, _ = asyncio.run(asgi_request(app, "POST", "/scheduling/available/stream", {**SEARCH, "agent_id": 999999}))
+    assert status == 404
+
+
+def test_iterate_blocking_closes_the_iterator_when_stopped_early():
+    closed = threading.Event()
+    produced = []
+
+    def numbers():
+        try:
+            for number in range(1_000_000):
+                produced.append(number)
+                yield number
+        finally:
+            closed.set()
+
+    async def first_chunks():
+        chunks = iterate_blocking(numbers(), chunk_size=10)
+        received = [await chunks.__anext__(), await chunks.__anext__()]
+        await chunks.aclose()
+        return received
+
+    assert asyncio.run(first_chunks()) == [[0], list(range(1, 11))]
+    assert closed.wait(5)
+    assert len(produced) < 1_000_000
@@ -0,0 +1,119 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import asyncio
+import datetime as dt
+import json
+import math
+import random
+from datetime import datetime, time, timedelta
+
+from agent_calendar.interval_index import to_epoch_us
+from agent_calendar.json_agent_calendar import JSONAgentCalendar
+from agent_calendar.team_search import TeamSchedule, common_free_intervals
+from benchmarks.bench_api import asgi_request
+from models import AgentCalendarSettings, TimeRange, WorkingHours
+
+# close enough for the working hours of a team to overlap
+TIMEZONES = ["UTC", "Europe/London", "Europe/Berlin", "Africa/Cairo"]
+
+
+def test_common_free_intervals():
+    assert common_free_intervals([[(0, 10), (20, 30)], [(5, 25)]]) == [(5, 10), (20, 25)]
+    # a zero length event splits an agent's free time
+    assert common_free_intervals([[(0, 10), (10, 20)], [(0, 20)]]) == [(0, 10), (10, 20)]
+    assert common_free_intervals([[(0, 10)], [(10, 20)]]) == []
+
+
+def random_team(tmp_path, seed, agents):
+    rng = random.Random(seed)
+    base = datetime(2025, 3, 3, tzinfo=dt.timezone.utc)
+    records = []
+    for agent_id in range(1, agents + 1):
+        events = []
+        for number in range(rng.randint(0, 20)):
+            start = base + timedelta(minutes=rng.randrange(0, 14 * 24 * 60, 5))
+            end = start + timedelta(minutes=rng.choice([0, 15, 30, 60, 120]))
+            events.append({"uid": f"{agent_id}-{number}", "dtstamp": "2025-03-01T00:00:00Z", "dtstart": start.isoformat(), "dtend": end.isoformat(), "summary": "Busy"})
+        records.append({"client_id": 1, "agent_id": agent_id, "calendar_events": events})
+    calendar_json_file = tmp_path / f"team-{seed}.json"
+    calendar_json_file.write_text(json.dumps(records))
+
+    calendars = {}
+    for agent_id in range(1, agents + 1):
+        settings = AgentCalendarSettings(
+            client_id=1,
+            agent_id=agent_id,
+            calendar_type="json",
+            working_hours=WorkingHours(start=time(rng.randint(6, 10)), end=time(rng.randint(15, 21))),
+            availability_increment=rng.choice([7, 10, 15, 30]),
+            max_bookings_per_day=rng.randint(2, 6),
+            timezone=rng.choice(TIMEZONES),
+        )
+        calendars[agent_id] = JSONAgentCalendar(str(calendar_json_file), "data/todo.json", 1, agent_id, settings)
+    start = base + timedelta(minutes=rng.randrange(0, 3 * 24 * 60, 5))
+    return calendars, [TimeRange(start=start, end=start + timedelta(days=rng.randint(1, 10)))]
+
+
+def stepping_common_slots(calendars, time_ranges, duration, count):
+    increment = timedelta(minutes=math.gcd(*(calendar.calendar_settings.availability_increment for calendar in calendars.values())))
+    slots = []
+    for time_range in time_ranges:
+        start = time_range.start
+        while start + duration <= time_range.end and len(slots) < count:
+            if all(calendar.is_time_available(start, start + duration) for calendar in calendars.values()):
+                slots.append(start)
+            start += increment
+    return slots
+
+
+def test_common_slots_match_stepping_search(tmp_path):
+    for seed in range(8):
+        calendars, time_ranges = random_team(tmp_path, seed, agents=2 + seed)
+        team = TeamSchedule(calendars, time_ranges)
+        for duration in (timedelta(minutes=30), timedelta(minutes=90)):
+            assert team.common_slots(duration, 200) == stepping_common_slots(calendars, time_ranges, duration, 200)
+
+
+def test_top_agents_share_the_most_free_time():
+    start = datetime(2025, 3, 3, 9, tzinfo=dt.timezone.utc)
+    team = TeamSchedule({}, [TimeRange(start=start, end=start + timedelta(hours=8))])
+    origin, hour = to_epoch_us(start), 3_600_000_000
+    team.free_intervals = {
+        1: [(origin, origin + 2 * hour)],
+        2: [(origin, origin + 3 * hour)],
+        # the most free time, none of it when the others are free
+        3: [(origin + 3 * hour, origin + 8 * hour)],
+        # shares only 20 minutes, too short for a slot
+        4: [(origin + 2 * hour + 40 * 60_000_000, origin + 3 * hour)],
+    }
+    assert team.top_agents(timedelta(minutes=30), 4) == [(1, timedelta(hours=2)), (2, timedelta(hours=2)), (3, timedelta(0)), (4, timedelta(0))]
+
+
+def test_top_agents_are_ranked(tmp_path):
+    calendars, time_ranges = random_team(tmp_path, 99, agents=6)
+    top_agents = TeamSchedule(calendars, time_ranges).top_agents(timedelta(minutes=30), 6)
+    assert len(top_agents) == 6
+    assert [shared for _, shared in top_agents] == sorted((shared for _, shared in top_agents), reverse=True)
+
+
+def test_team_available_endpoint():
+    from app import app
+
+    payload = {
+        "client_id": 1,
+        "agent_ids": [1, 2],
+        "time_ranges": [{"start": "2025-04-03T00:00:00Z", "end": "2025-04-05T00:00:00Z"}],
+        "duration_minutes": 30,
+        "count": 3,
+        "top_k": 1,
+    }
+    status, body = asyncio.run(asgi_request(app, "POST", "/scheduling/team/available", payload))
+    assert status == 200
+    response = json.loads(body)
+    assert len(response["available_times"]) == 3 and len(response["top_agents"]) == 1
+
+    status, _ = asyncio.run(asgi_request(app, "POST", "/scheduling/team/available", {**payload, "agent_ids": [1, 999999]}))
+    assert status == 404